@@ -0,0 +1,263 @@
+"""
+Static assets: fingerprinted, precompressed and cached for a year.
+
+At startup every file in static/ is read into memory once:
+
+- CSS, JS and images get a second, fingerprinted name with a hash of their
+  contents (css/styles.css -> css/styles.1a2b3c4d5e.css). The contents behind
+  a fingerprinted name never change, so it is served with
+  `Cache-Control: public, max-age=31536000, immutable` and browsers don't even
+  revalidate it on repeat visits.
+- References to those files in the HTML pages are rewritten to the
+  fingerprinted names. The pages keep their own names (they are what people
+  bookmark), so they are served with `no-cache` and revalidated with a cheap
+  ETag check; a changed asset changes the page and so its ETag.
+- Text files are compressed with gzip (and brotli, if the brotli package is
+  installed) once, so requests never pay for compression. The best encoding
+  the client accepts is picked per request, with `Vary: Accept-Encoding`.
+
+The original names are still served (with `no-cache`), so old links and
+bookmarks keep working. Files are only read at startup, so restart the server
+after editing them (`uvicorn --reload --reload-include 'static/*'`).
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import posixpath
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from fastapi import HTTPException, Request, Response
+from starlette import status
+from app.conditional import is_not_modified
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+STATIC_URL = "/static/"
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Files that are worth fingerprinting: everything a page loads
+_FINGERPRINTED = {".css", ".js", ".ico", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".woff", ".woff2"}
+
+# Files that are worth compressing (images and fonts already are)
+_COMPRESSED = {".html", ".css", ".js", ".json", ".svg", ".txt", ".ico"}
+
+# Encodings in order of preference (best compression first)
+_ENCODINGS = ("br", "gzip")
+
+# src="..." and href="..." attributes in the HTML pages
+_REFERENCE = re.compile(r'(\b(?:src|href)=")([^"#?]+)(")')
+
+
+@dataclass(frozen=True)
+class Asset:
+    """One static file, ready to be served.
+
+    Args:
+        body (bytes): The uncompressed contents.
+        media_type (str): The Content-Type.
+        digest (str): A hash of the contents, used in ETags and fingerprints.
+        cache_control (str): The Cache-Control header.
+        encodings (dict[str, bytes]): Compressed copies of the body by
+            Content-Encoding; only those smaller than the body are kept.
+    """
+
+    body: bytes
+    media_type: str
+    digest: str
+    cache_control: str
+    encodings: dict[str, bytes] = field(default_factory=dict)
+
+    def etag(self, encoding: str | None) -> str:
+        # Each encoding is a different representation, so it needs its own tag
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+
+def _digest(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()[:10]
+
+
+def _media_type(name: str) -> str:
+    media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    if media_type.startswith("text/") or media_type in ("application/javascript", "image/svg+xml"):
+        media_type += "; charset=utf-8"
+    return media_type
+
+
+def fingerprinted_name(name: str, digest: str) -> str:
+    """Adds the digest before the extension: js/api.js -> js/api.<digest>.js."""
+
+    stem, dot, suffix = name.rpartition(".")
+    return f"{stem}.{digest}.{suffix}" if dot else f"{name}.{digest}"
+
+
+def compress(name: str, body: bytes) -> dict[str, bytes]:
+    """Precomputes the compressed copies of a file that are worth sending.
+
+    Args:
+        name (str): The file's path, used to tell text from binary files.
+        body (bytes): The file's contents.
+
+    Returns:
+        dict[str, bytes]: Compressed bodies by Content-Encoding.
+    """
+
+    if posixpath.splitext(name)[1] not in _COMPRESSED:
+        return {}
+
+    encodings = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encodings["br"] = brotli.compress(body, quality=11)
+
+    # Tiny files can come out bigger than they went in
+    return {encoding: data for encoding, data in encodings.items() if len(data) < len(body)}
+
+
+def rewrite_references(page: str, html: str, manifest: dict[str, str]) -> str:
+    """Points a page's src/href attributes at the fingerprinted files.
+
+    Args:
+        page (str): The page's path inside static/, to resolve relative links.
+        html (str): The page's contents.
+        manifest (dict[str, str]): Original path -> fingerprinted path.
+
+    Returns:
+        str: The page with every reference to a fingerprinted file rewritten.
+    """
+
+    def replace(match: re.Match) -> str:
+        reference = match.group(2)
+
+        if reference.startswith(STATIC_URL):
+            name = reference[len(STATIC_URL):]
+        elif reference.startswith("/") or ":" in reference:
+            return match.group(0)
+        else:
+            name = posixpath.normpath(posixpath.join(posixpath.dirname(page), reference))
+
+        if name not in manifest:
+            return match.group(0)
+        return f"{match.group(1)}{STATIC_URL}{manifest[name]}{match.group(3)}"
+
+    return _REFERENCE.sub(replace, html)
+
+
+def build_assets(directory: Path) -> dict[str, Asset]:
+    """Reads, fingerprints and compresses every file in a directory.
+
+    Args:
+        directory (Path): The static files directory.
+
+    Returns:
+        dict[str, Asset]: Assets by their path inside the directory, under
+            both their original and (if fingerprinted) their fingerprinted name.
+    """
+
+    files = {
+        path.relative_to(directory).as_posix(): path.read_bytes()
+        for path in sorted(directory.rglob("*"))
+        if path.is_file()
+    }
+
+    assets = {}
+    manifest = {}
+
+    # Fingerprint the assets first, so the pages can point at them
+    for name, body in files.items():
+        if posixpath.splitext(name)[1] not in _FINGERPRINTED:
+            continue
+
+        digest = _digest(body)
+        encodings = compress(name, body)
+        manifest[name] = fingerprinted_name(name, digest)
+        assets[manifest[name]] = Asset(body, _media_type(name), digest, IMMUTABLE, encodings)
+        assets[name] = Asset(body, _media_type(name), digest, REVALIDATE, encodings)
+
+    for name, body in files.items():
+        if name in assets:
+            continue
+
+        if name.endswith(".html"):
+            body = rewrite_references(name, body.decode("utf-8"), manifest).encode("utf-8")
+
+        assets[name] = Asset(body, _media_type(name), _digest(body), REVALIDATE, compress(name, body))
+
+    return assets
+
+
+def accepted_encodings(header: str) -> set[str]:
+    """Parses Accept-Encoding, leaving out encodings sent with q=0."""
+
+    accepted = set()
+
+    for item in header.split(","):
+        coding, _, parameters = item.partition(";")
+        quality = 1.0
+
+        for parameter in parameters.split(";"):
+            key, _, value = parameter.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+
+        coding = coding.strip().lower()
+        if coding and quality > 0:
+            accepted.add(coding)
+
+    return accepted
+
+
+def asset_response(request: Request, name: str, cache_control: str | None = None) -> Response:
+    """Serves a static file in the best encoding the client accepts.
+
+    Args:
+        request (Request): The incoming request.
+        name (str): The file's path inside static/.
+        cache_control (str | None): Overrides the asset's Cache-Control.
+
+    Returns:
+        Response: The file, or a 304 if the client's copy is current.
+
+    Raises:
+        HTTPException(404): If there is no such file.
+    """
+
+    asset = static_assets.get(name)
+    if asset is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+    accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+    encoding = next((coding for coding in _ENCODINGS if coding in asset.encodings and coding in accepted), None)
+
+    headers = {"ETag": asset.etag(encoding), "Cache-Control": cache_control or asset.cache_control}
+    if asset.encodings:
+        headers["Vary"] = "Accept-Encoding"
+
+    if is_not_modified(request, headers["ETag"], None):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+
+    body = asset.encodings[encoding] if encoding else asset.body
+    return Response(content=body, media_type=asset.media_type, headers=headers)
+
+
+def static_path(name: str) -> str:
+    """Maps a /static/ URL path to a file, serving index.html for directories."""
+
+    if name == "" or name.endswith("/"):
+        return name + "index.html"
+    return name
+
+
+static_assets = build_assets(STATIC_DIR)
@@ -0,0 +1,298 @@
+"""
+Read cache for the ticket GET routes.
+
+Reads outnumber writes by far, so the list, search and by-id routes keep the
+page they served in a cache, keyed by the user, the user's generation and the
+normalized query. Every write to a user's tickets bumps that user's
+generation, so all of their cached pages stop matching at once, while other
+users' pages are untouched. Entries also expire after a TTL, which bounds how
+stale a page can get when the database is changed outside the API (e.g. by
+`python -m app.cli import-tickets` while the server runs).
+
+    READ_CACHE        "local", "shared" or "off" (default: "local", or
+                      "shared" when READ_CACHE_URL is set and there are
+                      several workers)
+    READ_CACHE_SIZE   entries kept by the local cache (default: 1000)
+    READ_CACHE_TTL    seconds an entry is kept (default: 30)
+    READ_CACHE_URL    redis:// URL for the shared cache. Needs the redis
+                      package. Without a URL, an in-process stand-in with the
+                      same interface is used (handy for development and tests).
+
+The local cache is per process. With several worker processes, use the
+shared cache so a write in one worker invalidates the others' pages. When
+WEB_CONCURRENCY says there are several workers but no READ_CACHE_URL is set,
+the TTL is cut to MULTI_WORKER_TTL and a warning is logged, since a write in
+one worker would otherwise leave the others serving (and 304-confirming) stale
+pages for the full TTL.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from app.lru import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Longest a per-process cache may keep a page when other workers can write
+MULTI_WORKER_TTL = 1.0
+
+
+class LocalBackend:
+    """Entries in an in-process LRU cache, generations in a plain dict.
+
+    Generations are never evicted: losing one would restart it at 0 and make
+    pages cached before the reset valid again.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.entries = TTLCache(maxsize, ttl)
+        self._generations: dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def generation(self, user_id: int) -> int:
+        return self._generations.get(user_id, 0)
+
+    def bump(self, user_id: int) -> None:
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+    def get(self, key: str):
+        return self.entries.get(key)
+
+    def set(self, key: str, value, ttl: float) -> None:
+        self.entries.set(key, value, ttl)
+
+    def clear(self) -> None:
+        self.entries.clear()
+        with self._lock:
+            self._generations.clear()
+
+    def stats(self) -> dict:
+        return {"backend": "local", **self.entries.stats()}
+
+
+class LocalSharedClient:
+    """An in-process stand-in for the few redis commands SharedBackend uses."""
+
+    def __init__(self):
+        self._values: dict[str, tuple[float | None, str | int]] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key: str):
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._values[key]
+            return None
+
+        return value
+
+    def get(self, key: str):
+        with self._lock:
+            return self._live(key)
+
+    def set(self, key: str, value, ex: float | None = None) -> None:
+        with self._lock:
+            expires_at = time.monotonic() + ex if ex else None
+            self._values[key] = (expires_at, value)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value = int(self._live(key) or 0) + 1
+            self._values[key] = (None, value)
+            return value
+
+    def flushdb(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class SharedBackend:
+    """Entries and generations in a redis-compatible store, shared by every worker.
+
+    Args:
+        client: A redis.Redis client, or a LocalSharedClient.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def generation(self, user_id: int) -> int:
+        return int(self.client.get(f"tickets-gen:{user_id}") or 0)
+
+    def bump(self, user_id: int) -> None:
+        self.client.incr(f"tickets-gen:{user_id}")
+
+    def get(self, key: str):
+        value = self.client.get(key)
+        return None if value is None else json.loads(value)
+
+    def set(self, key: str, value, ttl: float) -> None:
+        self.client.set(key, json.dumps(value), ex=max(1, int(ttl)))
+
+    def clear(self) -> None:
+        self.client.flushdb()
+
+    def stats(self) -> dict:
+        return {"backend": "shared"}
+
+
+class ReadCache:
+    """Caches read results per user, invalidated by a per-user generation.
+
+    Args:
+        backend: LocalBackend or SharedBackend, or None to turn caching off.
+        ttl (float): Seconds an entry is kept.
+    """
+
+    def __init__(self, backend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None and self.ttl > 0
+
+    def key(self, user_id: int, kind: str, **params) -> str | None:
+        """Builds the cache key for a read, from the user's current generation.
+
+        The generation has to be read before the database is queried: if a
+        write lands in between, the result is stored under the old
+        generation, where nobody will look for it again.
+
+        Args:
+            user_id (int): The user the result belongs to.
+            kind (str): What is being read ("list", "search", "ticket").
+            **params: The query parameters. None values are left out, and
+                text is lowercased with its whitespace collapsed.
+
+        Returns:
+            str | None: The key, or None when caching is off.
+        """
+
+        if not self.enabled:
+            return None
+
+        normalized = {}
+        for name, value in params.items():
+            if value is None:
+                continue
+            if hasattr(value, "value"):
+                value = value.value
+            if isinstance(value, str):
+                value = " ".join(value.lower().split())
+            normalized[name] = value
+
+        query = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+        return f"tickets:{user_id}:{self.backend.generation(user_id)}:{kind}:{query}"
+
+    def get(self, key: str | None):
+        """Returns the cached value, or None."""
+
+        if key is None:
+            return None
+
+        value = self.backend.get(key)
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        return value
+
+    def set(self, key: str | None, value) -> None:
+        """Stores a JSON-compatible value under a key from key()."""
+
+        if key is not None:
+            self.backend.set(key, value, self.ttl)
+
+    def invalidate(self, user_id: int) -> None:
+        """Drops every cached read for the user. Call it after each write."""
+
+        if not self.enabled:
+            return
+
+        self.backend.bump(user_id)
+        with self._lock:
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self) -> dict:
+        """Returns hit/miss counts, plus the backend's size and eviction counts."""
+
+        if not self.enabled:
+            return {"backend": "off"}
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            counts = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+        # These replace the local backend's own hit/miss counts, so every
+        # backend reports them the same way
+        return {**self.backend.stats(), **counts}
+
+
+def build_read_cache(environ=os.environ) -> ReadCache:
+    """Builds the read cache from the READ_CACHE* environment variables.
+
+    Raises:
+        RuntimeError: If READ_CACHE is unknown, or a shared cache URL is set
+            without the redis package installed.
+    """
+
+    workers = int(environ.get("WEB_CONCURRENCY", 1))
+    url = environ.get("READ_CACHE_URL")
+    default_kind = "shared" if url and workers > 1 else "local"
+    kind = environ.get("READ_CACHE", default_kind).strip().lower()
+    ttl = float(environ.get("READ_CACHE_TTL", 30))
+
+    if kind == "off":
+        return ReadCache(None, ttl)
+
+    if kind not in ("local", "shared"):
+        raise RuntimeError(f"Unknown READ_CACHE {kind!r}, expected local, shared or off")
+
+    # Both the local cache and the shared stand-in live in this process only,
+    # so other workers don't see this worker's invalidations
+    if (kind == "local" or not url) and workers > 1 and ttl > MULTI_WORKER_TTL:
+        logger.warning(
+            "READ_CACHE=%s is per process but WEB_CONCURRENCY=%d; keeping pages for "
+            "%ss instead of %ss. Set READ_CACHE=shared with READ_CACHE_URL to share it.",
+            kind, workers, MULTI_WORKER_TTL, ttl,
+        )
+        ttl = MULTI_WORKER_TTL
+
+    if kind == "local":
+        return ReadCache(LocalBackend(int(environ.get("READ_CACHE_SIZE", 1000)), ttl), ttl)
+
+    if not url:
+        return ReadCache(SharedBackend(LocalSharedClient()), ttl)
+
+    try:
+        import redis
+    except ImportError:
+        raise RuntimeError("READ_CACHE_URL needs the redis package (pip install redis)")
+
+    return ReadCache(SharedBackend(redis.Redis.from_url(url)), ttl)
+
+
+read_cache = build_read_cache()
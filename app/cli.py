@@ -0,0 +1,123 @@
+"""
+Command line tools for maintaining the Helpdesk database.
+
+Usage:
+    python -m app.cli migrate [--check]
+    python -m app.cli rebuild-search-index
+    python -m app.cli import-tickets FILE --user USERNAME [--format csv] [--chunk-size N]
+"""
+
+import argparse
+import sys
+from sqlmodel import Session, select
+from app.db import engine
+from app.export import ExportFormat
+from app.importer import IMPORT_CHUNK_SIZE, ImportFileError, detect_format, import_tickets, open_text
+from app.migrations import LATEST_VERSION, current_version, migrate
+from app.models import User
+from app.search import rebuild_search_index
+
+
+def migrate_command(args: argparse.Namespace) -> None:
+    """Runs the pending migrations, or with --check only reports the version."""
+
+    with engine.connect() as connection:
+        version = current_version(connection)
+
+    print(f"Schema version: {'none' if version is None else version}, latest: {LATEST_VERSION}")
+
+    if args.check:
+        if version != LATEST_VERSION:
+            sys.exit(1)
+        return
+
+    applied = migrate(engine, on_migration=lambda name: print(f"Running {name}"))
+    print(f"Schema is up to date ({len(applied)} migrations run)")
+
+
+def rebuild_search_index_command(args: argparse.Namespace) -> None:
+    """Rebuilds the full-text search index from the ticket table."""
+
+    with engine.begin() as connection:
+        rebuild_search_index(connection)
+
+    print("Search index rebuilt")
+
+
+def import_tickets_command(args: argparse.Namespace) -> None:
+    """Imports tickets from an NDJSON or CSV file for one user."""
+
+    migrate(engine)
+    file_format = ExportFormat(args.format) if args.format else detect_format(args.file)
+
+    with Session(engine) as session:
+        user = session.exec(select(User).where(User.username == args.user)).first()
+        if user is None:
+            sys.exit(f"No user named {args.user!r}")
+
+        def report(progress) -> None:
+            print(f"{progress.imported} imported, {progress.failed} failed", file=sys.stderr)
+
+        try:
+            with open(args.file, "rb") as binary_file:
+                result = import_tickets(
+                    session, user.id, open_text(binary_file), file_format, args.chunk_size, report
+                )
+        except ImportFileError as error:
+            sys.exit(f"Import stopped: {error}")
+
+    for error in result.errors:
+        print(f"row {error.row}: {error.message}")
+
+    if result.failed > len(result.errors):
+        print(f"... and {result.failed - len(result.errors)} more errors")
+
+    print(f"Read {result.rows} rows: {result.imported} imported, {result.failed} failed")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrator = commands.add_parser(
+        "migrate",
+        help="bring the database schema up to date (run before starting the workers)"
+    )
+    migrator.add_argument(
+        "--check",
+        action="store_true",
+        help="only report the schema version; exit with status 1 if it is behind"
+    )
+    migrator.set_defaults(handler=migrate_command)
+
+    rebuild = commands.add_parser(
+        "rebuild-search-index",
+        help="rebuild the full-text search index for an existing database"
+    )
+    rebuild.set_defaults(handler=rebuild_search_index_command)
+
+    importer = commands.add_parser(
+        "import-tickets",
+        help="import tickets from an NDJSON or CSV file"
+    )
+    importer.add_argument("file", help="the file to import")
+    importer.add_argument("--user", required=True, help="username of the tickets' owner")
+    importer.add_argument(
+        "--format",
+        choices=[file_format.value for file_format in ExportFormat],
+        help="file format (default: from the file name)"
+    )
+    importer.add_argument(
+        "--chunk-size",
+        type=int,
+        default=IMPORT_CHUNK_SIZE,
+        help=f"tickets inserted per transaction (default: {IMPORT_CHUNK_SIZE})"
+    )
+    importer.set_defaults(handler=import_tickets_command)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
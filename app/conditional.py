@@ -0,0 +1,174 @@
+"""
+Conditional requests (ETag / Last-Modified) for tickets.
+
+Every ticket has a version that is bumped on each update, and every user has
+a tickets_version that is bumped whenever one of their tickets is created,
+updated or deleted (however it happens: single, bulk or import). Every write
+runs bump_tickets_version_statement() once, in the same transaction as the
+statement that changes the tickets.
+
+    GET    If-None-Match / If-Modified-Since  ->  304 Not Modified when the
+           version hasn't changed, without loading or serializing any tickets
+    PATCH  If-Match  ->  412 Precondition Failed when someone else changed
+    DELETE           the ticket since the client last read it
+"""
+
+from datetime import datetime, UTC
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import HTTPException, Request, Response
+from sqlmodel import select, update
+from starlette import status
+from app.models import Ticket, User, utc_now
+
+# The row triggers that used to keep tickets_version up to date. Migration
+# m0004 still creates them, as it did when it was released, and m0005 drops
+# them again: a bulk write of n tickets ran n updates of the user.
+TICKETS_VERSION_DDL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS ticket_version_{event_name.lower()} AFTER {event_name} ON ticket BEGIN
+        UPDATE "user"
+        SET tickets_version = tickets_version + 1, tickets_modified = CURRENT_TIMESTAMP
+        WHERE id = {row}.user_id;
+    END
+    """
+    for event_name, row in (("INSERT", "new"), ("UPDATE", "new"), ("DELETE", "old"))
+]
+
+
+def create_version_triggers(connection) -> None:
+    """Creates the old tickets_version triggers; only used by migration m0004."""
+
+    for statement in TICKETS_VERSION_DDL:
+        connection.exec_driver_sql(statement)
+
+
+def collection_validators(row, user_id: int) -> tuple[str, datetime | None]:
+    """Returns the ticket list's ETag and Last-Modified from a tickets_version_statement() row."""
+
+    tickets_version, tickets_modified = row if row is not None else (0, None)
+    return collection_etag(user_id, tickets_version), tickets_modified
+
+
+def ticket_etag(ticket_id: int, version: int) -> str:
+    return f'"t{ticket_id}.{version}"'
+
+
+def collection_etag(user_id: int, tickets_version: int) -> str:
+    return f'"u{user_id}.{tickets_version}"'
+
+
+def http_date(value: datetime) -> str:
+    """Formats a UTC datetime for the Last-Modified header."""
+
+    return format_datetime(value.replace(microsecond=0, tzinfo=UTC), usegmt=True)
+
+
+def _etags(header: str) -> list[str]:
+    # Weak and strong tags compare equal for If-None-Match (RFC 9110 8.8.3.2)
+    return [tag.strip().removeprefix("W/") for tag in header.split(",")]
+
+
+def is_conditional(request: Request) -> bool:
+    """True if a GET carries a validator that could make it a 304."""
+
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime | None) -> bool:
+    """Checks a GET's If-None-Match (or If-Modified-Since) against the current version.
+
+    Args:
+        request (Request): The incoming request.
+        etag (str): The current ETag of the resource.
+        last_modified (datetime | None): When the resource last changed (UTC).
+
+    Returns:
+        bool: True if the client's copy is current and a 304 can be sent.
+    """
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = _etags(if_none_match)
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return last_modified.replace(microsecond=0, tzinfo=UTC) <= since
+
+    return False
+
+
+def not_modified(etag: str, last_modified: datetime | None) -> Response:
+    """Returns an empty 304 response carrying the current validators."""
+
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response: Response, etag: str, last_modified: datetime | None) -> None:
+    """Adds the ETag and Last-Modified headers to a response."""
+
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified)
+    # Responses depend on who is asking, so shared caches must not reuse them
+    response.headers["Cache-Control"] = "private, no-cache"
+
+
+def check_if_match(request: Request, etag: str) -> None:
+    """Rejects a PATCH/DELETE whose If-Match doesn't match the ticket's ETag.
+
+    Args:
+        request (Request): The incoming request.
+        etag (str): The ticket's current ETag.
+
+    Raises:
+        HTTPException(412): If If-Match was sent and the ticket has changed since.
+    """
+
+    if_match = request.headers.get("if-match")
+    if if_match is None:
+        return
+
+    # If-Match uses strong comparison, so weak tags never match
+    tags = [tag.strip() for tag in if_match.split(",")]
+    if "*" not in tags and etag not in tags:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Ticket has been changed since it was read",
+            headers={"ETag": etag}
+        )
+
+
+def tickets_version_statement(user_id: int):
+    """Selects the user's tickets_version and tickets_modified."""
+
+    return select(User.tickets_version, User.tickets_modified).where(User.id == user_id)
+
+
+def bump_tickets_version_statement(user_id: int):
+    """Bumps the user's tickets_version, giving their ticket list a new ETag.
+
+    Run it once per statement that creates, updates or deletes the user's
+    tickets, however many rows that statement touches.
+    """
+
+    return (
+        update(User)
+        .where(User.id == user_id)
+        .values(tickets_version=User.tickets_version + 1, tickets_modified=utc_now())
+    )
+
+
+def ticket_version_statement(ticket_id: int, user_id: int):
+    """Selects a ticket's version and modified time, only if it belongs to the user."""
+
+    return select(Ticket.version, Ticket.modified).where(
+        Ticket.id == ticket_id,
+        Ticket.user_id == user_id
+    )
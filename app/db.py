@@ -1,18 +1,375 @@
-from sqlmodel import Session, SQLModel, create_engine
+"""
+Database engine and session dependency.
+
+The engine is configured from the environment (or .env):
+
+    DATABASE_URL          SQLAlchemy URL (default: sqlite:///database.db)
+    DATABASE_READ_URL     database the read-only routes use, e.g. a replicated
+                          or snapshot copy of the file (default: DATABASE_URL)
+    DB_PROFILE            "default" or "production" (see DB_PROFILES)
+    SQLITE_JOURNAL_MODE   e.g. wal
+    SQLITE_SYNCHRONOUS    off | normal | full | extra
+    SQLITE_BUSY_TIMEOUT   milliseconds to wait for a lock before failing
+    SQLITE_CACHE_SIZE     pages, or KiB when negative
+    SQLITE_MMAP_SIZE      bytes of the database file to memory-map
+    SQLITE_TEMP_STORE     default | file | memory
+    DB_POOL_SIZE          connections kept open in the pool
+    DB_MAX_OVERFLOW       extra connections allowed under load
+    DB_READ_POOL_SIZE     the same, for the read-only engine
+    DB_READ_MAX_OVERFLOW
+    DB_ASYNC              1 to serve the core routes with async handlers
+                          on an AsyncEngine (aiosqlite)
+    MIGRATE_ON_STARTUP    0 to refuse to start on an outdated schema instead
+                          of migrating it (see app/migrations)
+    SLOW_QUERY_MS         log statements slower than this (see app/slow_queries.py)
+    WRITE_BATCH_MS        commit concurrent ticket writes together, waiting up
+                          to this long for a batch (see app/group_commit.py)
+    WRITE_BATCH_MAX       writes committed together at most
+
+Any variable that is set overrides the value from the profile.
+
+There are two engines. `engine` is for writes (and anything that may write),
+while the GET routes read through `read_engine`, whose connections are opened
+with SQLite's mode=ro. Readers then get a pool of their own, sized on its own,
+and never wait for a connection behind writers (SQLite only ever has one
+writer anyway). Routes ask for a ReadSessionDep or a SessionDep to pick one.
+"""
+
+import os
+from dataclasses import dataclass, fields, replace
+from sqlmodel import Session, create_engine
+from sqlalchemy import event, make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 from fastapi import Depends
 from typing import Annotated
+from dotenv import load_dotenv
+from app.metrics import TimedAsyncQueuePool, TimedQueuePool, instrument_engine
+from app.slow_queries import slow_query_log
+
+load_dotenv()
 
 sqlite_file_name = "database.db"
 
 sqlite_url = f"sqlite:///{sqlite_file_name}"
 
-connect_args = {"check_same_thread": False}
 
-engine = create_engine(sqlite_url, connect_args=connect_args)
+@dataclass(frozen=True)
+class DatabaseSettings:
+    url: str = sqlite_url
+    # PRAGMAs applied to every new SQLite connection (None keeps SQLite's default)
+    journal_mode: str | None = None
+    synchronous: str | None = None
+    busy_timeout: int | None = None
+    cache_size: int | None = None
+    mmap_size: int | None = None
+    temp_store: str | None = None
+    # Connection pool
+    pool_size: int = 5
+    max_overflow: int = 10
+    # The read-only engine: its database (None: the same one) and its pool
+    read_url: str | None = None
+    read_pool_size: int = 5
+    read_max_overflow: int = 10
+    # Serve the ticket and auth routes with async handlers and an AsyncEngine
+    async_mode: bool = False
+    # Run pending migrations when a worker starts (see app/migrations)
+    migrate_on_startup: bool = True
+    # Group commit for ticket writes, off when 0 (see app/group_commit.py)
+    write_batch_ms: int = 0
+    write_batch_max: int = 256
+
+
+# Recommended settings. "production" lets readers keep working while a writer
+# commits (WAL), only fsyncs at checkpoints (synchronous=normal is still safe
+# in WAL mode), waits for locks instead of failing with "database is locked",
+# and keeps more of the database in memory.
+DB_PROFILES = {
+    "default": DatabaseSettings(),
+    "production": DatabaseSettings(
+        journal_mode="wal",
+        synchronous="normal",
+        busy_timeout=5000,
+        cache_size=-64000,
+        mmap_size=268435456,
+        temp_store="memory",
+        pool_size=10,
+        max_overflow=20,
+        read_pool_size=20,
+        read_max_overflow=40,
+    ),
+}
+
+# PRAGMA values can't be bound as parameters, so only these are accepted
+_ALLOWED_PRAGMA_VALUES = {
+    "journal_mode": {"delete", "truncate", "persist", "memory", "wal", "off"},
+    "synchronous": {"off", "normal", "full", "extra", "0", "1", "2", "3"},
+    "temp_store": {"default", "file", "memory", "0", "1", "2"},
+}
+
+_ENV_NAMES = {
+    "url": "DATABASE_URL",
+    "journal_mode": "SQLITE_JOURNAL_MODE",
+    "synchronous": "SQLITE_SYNCHRONOUS",
+    "busy_timeout": "SQLITE_BUSY_TIMEOUT",
+    "cache_size": "SQLITE_CACHE_SIZE",
+    "mmap_size": "SQLITE_MMAP_SIZE",
+    "temp_store": "SQLITE_TEMP_STORE",
+    "pool_size": "DB_POOL_SIZE",
+    "max_overflow": "DB_MAX_OVERFLOW",
+    "read_url": "DATABASE_READ_URL",
+    "read_pool_size": "DB_READ_POOL_SIZE",
+    "read_max_overflow": "DB_READ_MAX_OVERFLOW",
+    "async_mode": "DB_ASYNC",
+    "migrate_on_startup": "MIGRATE_ON_STARTUP",
+    "write_batch_ms": "WRITE_BATCH_MS",
+    "write_batch_max": "WRITE_BATCH_MAX",
+}
+
+_TRUE_VALUES = {"1", "true", "yes", "on"}
+
+
+def load_settings(environ=os.environ) -> DatabaseSettings:
+    """Builds the database settings from a profile and environment overrides.
+
+    Args:
+        environ: The environment to read (os.environ by default).
+
+    Returns:
+        DatabaseSettings: The settings to build the engine with.
+
+    Raises:
+        RuntimeError: If the profile is unknown or a value is invalid.
+    """
+
+    profile = environ.get("DB_PROFILE", "default").lower()
+    if profile not in DB_PROFILES:
+        raise RuntimeError(f"Unknown DB_PROFILE {profile!r}, expected one of {sorted(DB_PROFILES)}")
+
+    overrides = {}
+
+    for field in fields(DatabaseSettings):
+        raw = environ.get(_ENV_NAMES[field.name])
+        if raw is None or raw.strip() == "":
+            continue
+
+        raw = raw.strip()
+
+        if field.name in _ALLOWED_PRAGMA_VALUES:
+            if raw.lower() not in _ALLOWED_PRAGMA_VALUES[field.name]:
+                raise RuntimeError(f"{_ENV_NAMES[field.name]} has an invalid value: {raw!r}")
+            overrides[field.name] = raw.lower()
+
+        elif field.name in ("url", "read_url"):
+            overrides[field.name] = raw
+
+        elif field.name in ("async_mode", "migrate_on_startup"):
+            overrides[field.name] = raw.lower() in _TRUE_VALUES
+
+        else:
+            try:
+                overrides[field.name] = int(raw)
+            except ValueError:
+                raise RuntimeError(f"{_ENV_NAMES[field.name]} must be an integer: {raw!r}")
+
+    return replace(DB_PROFILES[profile], **overrides)
+
+
+def sqlite_pragmas(settings: DatabaseSettings) -> list[str]:
+    """Returns the PRAGMA statements to run on each new connection."""
+
+    pragmas = []
+
+    for name in ("journal_mode", "synchronous", "busy_timeout", "cache_size", "mmap_size", "temp_store"):
+        value = getattr(settings, name)
+        if value is not None:
+            pragmas.append(f"PRAGMA {name} = {value}")
+
+    return pragmas
+
+
+def apply_sqlite_pragmas(engine, settings: DatabaseSettings) -> None:
+    """Runs the configured PRAGMAs every time the pool opens a new connection.
+
+    Args:
+        engine: The engine to configure.
+        settings (DatabaseSettings): The settings holding the PRAGMA values.
+    """
+
+    pragmas = sqlite_pragmas(settings)
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def _is_memory_url(url: str) -> bool:
+    database = make_url(url).database
+    return database in (None, "", ":memory:")
+
+
+def read_only_url(url: str) -> str | None:
+    """Turns an SQLite file URL into one that opens the file read-only.
+
+    sqlite:///database.db becomes sqlite:///file:database.db?mode=ro&uri=true,
+    which SQLite opens with mode=ro, so any write fails instead of taking the
+    write lock.
+
+    Args:
+        url (str): An SQLite URL (sqlite:// or sqlite+aiosqlite://).
+
+    Returns:
+        str | None: The read-only URL, or None for an in-memory database,
+            which only exists inside its own connection.
+    """
+
+    if _is_memory_url(url):
+        return None
+
+    parsed = make_url(url)
+    database = parsed.database
+    if not database.startswith("file:"):
+        database = f"file:{database}"
+
+    read_only = parsed.set(database=database).update_query_dict({"mode": "ro", "uri": "true"})
+    return read_only.render_as_string(hide_password=False)
 
 
-def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
+def _read_settings(settings: DatabaseSettings) -> DatabaseSettings:
+    # The journal mode is stored in the database file and set by the writer.
+    # A read-only connection can't change it.
+    return replace(settings, journal_mode=None)
+
+
+def _instrument(engine) -> None:
+    instrument_engine(engine)
+    if slow_query_log is not None:
+        slow_query_log.instrument(engine)
+
+
+def build_engine(settings: DatabaseSettings):
+    """Creates an engine from the settings.
+
+    Args:
+        settings (DatabaseSettings): The database settings.
+
+    Returns:
+        The configured SQLAlchemy engine.
+    """
+
+    kwargs = {}
+
+    # In-memory databases live in a single connection, so they have no pool to size
+    if ":memory:" not in settings.url and settings.url != "sqlite://":
+        kwargs.update(
+            poolclass=TimedQueuePool,
+            pool_size=settings.pool_size,
+            max_overflow=settings.max_overflow
+        )
+
+    engine = create_engine(
+        settings.url,
+        connect_args={"check_same_thread": False},
+        **kwargs
+    )
+    apply_sqlite_pragmas(engine, settings)
+    _instrument(engine)
+    return engine
+
+
+def build_read_engine(settings: DatabaseSettings):
+    """Creates the read-only engine from the settings.
+
+    Args:
+        settings (DatabaseSettings): The database settings.
+
+    Returns:
+        The configured SQLAlchemy engine, or None for an in-memory database
+        (use the write engine for reads then).
+    """
+
+    url = read_only_url(settings.read_url or settings.url)
+    if url is None:
+        return None
+
+    read_engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        poolclass=TimedQueuePool,
+        pool_size=settings.read_pool_size,
+        max_overflow=settings.read_max_overflow
+    )
+    apply_sqlite_pragmas(read_engine, _read_settings(settings))
+    _instrument(read_engine)
+    return read_engine
+
+
+def build_async_engine(settings: DatabaseSettings):
+    """Creates an AsyncEngine (aiosqlite) from the settings.
+
+    Args:
+        settings (DatabaseSettings): The database settings.
+
+    Returns:
+        The configured SQLAlchemy AsyncEngine.
+    """
+
+    url = settings.url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    kwargs = {}
+
+    if ":memory:" not in url and url != "sqlite+aiosqlite://":
+        kwargs.update(
+            poolclass=TimedAsyncQueuePool,
+            pool_size=settings.pool_size,
+            max_overflow=settings.max_overflow
+        )
+
+    async_engine = create_async_engine(url, **kwargs)
+    # Connection events are only available on the sync engine the AsyncEngine wraps
+    apply_sqlite_pragmas(async_engine.sync_engine, settings)
+    _instrument(async_engine.sync_engine)
+    return async_engine
+
+
+def build_async_read_engine(settings: DatabaseSettings):
+    """Creates the read-only AsyncEngine (aiosqlite) from the settings.
+
+    Args:
+        settings (DatabaseSettings): The database settings.
+
+    Returns:
+        The configured SQLAlchemy AsyncEngine, or None for an in-memory database.
+    """
+
+    url = read_only_url(settings.read_url or settings.url)
+    if url is None:
+        return None
+
+    async_read_engine = create_async_engine(
+        url.replace("sqlite://", "sqlite+aiosqlite://", 1),
+        poolclass=TimedAsyncQueuePool,
+        pool_size=settings.read_pool_size,
+        max_overflow=settings.read_max_overflow
+    )
+    apply_sqlite_pragmas(async_read_engine.sync_engine, _read_settings(settings))
+    _instrument(async_read_engine.sync_engine)
+    return async_read_engine
+
+
+settings = load_settings()
+
+engine = build_engine(settings)
+
+read_engine = build_read_engine(settings) or engine
+
+# Only created in async mode, so aiosqlite is not needed otherwise
+async_engine = build_async_engine(settings) if settings.async_mode else None
+async_read_engine = (build_async_read_engine(settings) or async_engine) if settings.async_mode else None
 
 
 def get_session():
@@ -20,8 +377,32 @@ def get_session():
         yield session
 
 
+def get_read_session():
+    with Session(read_engine) as session:
+        yield session
+
+
+async def get_async_session():
+    # expire_on_commit=False so returning a ticket after commit doesn't
+    # trigger a lazy reload, which can't happen implicitly in async code
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
+async def get_async_read_session():
+    async with AsyncSession(async_read_engine, expire_on_commit=False) as session:
+        yield session
+
+
 # SessionDep is a type alias that tells FastAPI:
 # "When a route asks for a SessionDep, create a database Session
 # using get_session(), inject it into the function, and automatically
 # close it after the request finishes.
-SessionDep = Annotated[Session, Depends(get_session)]
\ No newline at end of file
+SessionDep = Annotated[Session, Depends(get_session)]
+
+# The same, with a read-only connection, for routes that only read
+ReadSessionDep = Annotated[Session, Depends(get_read_session)]
+
+# The same two, for the async handlers (see DB_ASYNC)
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_session)]
+AsyncReadSessionDep = Annotated[AsyncSession, Depends(get_async_read_session)]
@@ -0,0 +1,183 @@
+"""
+Group commit: ticket writes from many requests, committed together.
+
+Every commit makes SQLite sync its file to disk, and only one connection can
+write at a time, so under concurrent load ticket creates and updates queue up
+behind each other's fsyncs. With WRITE_BATCH_MS set, POST /api/tickets/ and
+PATCH /api/tickets/{id} hand their write to a single writer thread instead.
+The writer waits up to WRITE_BATCH_MS for more writes to arrive, runs them
+all in one transaction and commits once, so a batch of writes costs one
+fsync instead of one each.
+
+Each write runs in its own savepoint, so a write that fails (a missing ticket,
+an If-Match that no longer matches) only fails its own request. Requests wait
+for the commit before they respond: a 201 or 200 still means the write is on
+disk, exactly as without batching.
+
+    WRITE_BATCH_MS    how long the writer waits to fill a batch (default: 0, off)
+    WRITE_BATCH_MAX   writes committed together at most (default: 256)
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from sqlmodel import Session
+from app.db import engine, settings
+from app.metrics import WRITE_BATCH_SIZE
+
+# Put on the queue to stop the writer thread
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """A thread that commits the writes it is given in batches.
+
+    Args:
+        engine: The engine to write with.
+        window (float): Seconds to wait for more writes after the first one.
+        max_batch (int): Writes committed together at most.
+    """
+
+    def __init__(self, engine, window: float, max_batch: int):
+        self.engine = engine
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self._thread.start()
+
+    def submit(self, write) -> Future:
+        """Queues a write for the next batch.
+
+        Args:
+            write: A function taking a Session. It runs on the writer thread
+                and must flush what it adds, so errors surface in its savepoint.
+
+        Returns:
+            Future: Resolves with write's return value once the batch is
+                committed, or with the exception the write (or commit) raised.
+        """
+
+        future = Future()
+        self._queue.put((write, future))
+        return future
+
+    def shutdown(self) -> None:
+        """Commits the writes already queued, then stops the thread."""
+
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self) -> None:
+        stopping = False
+
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            batch = [item]
+            deadline = time.monotonic() + self.window
+
+            # Collect whatever else arrives before the deadline
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._commit(batch)
+
+    def _commit(self, batch: list) -> None:
+        done = []
+
+        try:
+            # expire_on_commit=False so the results can still be read after
+            # the session is closed
+            with Session(self.engine, expire_on_commit=False) as session:
+                # The sqlite3 module only starts a transaction before the
+                # first INSERT/UPDATE/DELETE, so a SAVEPOINT before that would
+                # commit on release. BEGIN IMMEDIATE also takes the write lock
+                # up front.
+                session.connection().exec_driver_sql("BEGIN IMMEDIATE")
+
+                for write, future in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+
+                    try:
+                        with session.begin_nested():
+                            result = write(session)
+                    except Exception as exc:
+                        future.set_exception(exc)
+                    else:
+                        done.append((future, result))
+
+                session.commit()
+        except Exception as exc:
+            # Nothing in the batch was saved
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        WRITE_BATCH_SIZE.observe(len(batch))
+
+        for future, result in done:
+            future.set_result(result)
+
+
+def run_write(session: Session, write):
+    """Runs a write and commits it, through the group-commit writer when it's on.
+
+    Args:
+        session (Session): The request's session, used when batching is off.
+        write: A function taking a Session, which makes the change and flushes.
+
+    Returns:
+        Whatever write returned, once it has been committed.
+    """
+
+    if group_commit is None:
+        result = write(session)
+        session.commit()
+        return result
+
+    return group_commit.submit(write).result()
+
+
+async def run_write_async(session, write):
+    """The same as run_write(), for the async handlers.
+
+    Args:
+        session (AsyncSession): The request's session, used when batching is off.
+        write: A function taking a (sync) Session.
+
+    Returns:
+        Whatever write returned, once it has been committed.
+    """
+
+    if group_commit is None:
+        result = await session.run_sync(write)
+        await session.commit()
+        return result
+
+    return await asyncio.wrap_future(group_commit.submit(write))
+
+
+group_commit = (
+    GroupCommitWriter(engine, settings.write_batch_ms / 1000, settings.write_batch_max)
+    if settings.write_batch_ms > 0
+    else None
+)
@@ -0,0 +1,190 @@
+"""
+Password hashing off the request thread.
+
+bcrypt is slow on purpose (hundreds of milliseconds of CPU per call). Hashing
+and verifying run in a small process pool, so they spread across every core
+and never hold the web worker's GIL, and a login burst can't starve ticket
+traffic in the same process. The number of jobs waiting for the pool is
+capped: when it is saturated, requests get a 503 instead of piling up.
+
+    HASH_WORKERS       processes in the pool (default: CPU count, at most 4)
+    HASH_QUEUE_LIMIT   jobs allowed to wait for a free process (default: 32)
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from fastapi import HTTPException
+from app.metrics import PASSWORD_HASH_DURATION
+from passlib.context import CryptContext
+from starlette import status
+
+# Use this to hash the user's password
+bcrypt_context = CryptContext(schemes=["bcrypt"])
+
+# How many recent durations are kept to work out percentiles
+_SAMPLE_SIZE = 1000
+
+
+def _hash(password: str) -> str:
+    return bcrypt_context.hash(password)
+
+
+def _verify(password: str, hashed_password: str) -> bool:
+    return bcrypt_context.verify(password, hashed_password)
+
+
+class LatencyStats:
+    """Thread-safe count, mean, percentiles and max of recent durations."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=_SAMPLE_SIZE)
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = sorted(self._samples)
+            count, total, maximum = self.count, self.total_seconds, self.max_seconds
+
+        def percentile(p: float) -> float:
+            if not samples:
+                return 0.0
+            return samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+
+        return {
+            "count": count,
+            "avg_ms": total / count * 1000 if count else 0.0,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": maximum * 1000,
+        }
+
+
+class PasswordHasher:
+    """A size-limited process pool for bcrypt hash/verify calls.
+
+    Args:
+        workers (int): Number of processes in the pool.
+        queue_limit (int): Jobs allowed to wait once every process is busy.
+    """
+
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = max(1, workers)
+        self.queue_limit = max(0, queue_limit)
+        self.rejected = 0
+        self.hash_latency = LatencyStats()
+        self.verify_latency = LatencyStats()
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created on first use, so importing the app never starts processes.
+        # The pool lives as long as the worker and is shut down with the app
+        # (see shutdown below).
+        # "spawn" because forking a process that already runs threads and
+        # holds SQLite connections is not safe.
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def shutdown(self) -> None:
+        """Stops the pool's processes; the next hash starts a new pool.
+
+        concurrent.futures only does this by itself when the interpreter exits
+        normally. uvicorn re-raises SIGTERM once it has shut down, which skips
+        that, so the app calls this on shutdown instead of leaving orphaned
+        processes behind.
+        """
+
+        with self._lock:
+            executor, self._executor = self._executor, None
+
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _submit(self, operation: str, fn, *args) -> Future:
+        """Sends a job to the pool, or raises a 503 if too many are waiting."""
+
+        latency = self.hash_latency if operation == "hash" else self.verify_latency
+
+        with self._lock:
+            if self._in_flight >= self.workers + self.queue_limit:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Server is busy, please try again",
+                    headers={"Retry-After": "1"}
+                )
+            self._in_flight += 1
+
+        started = time.perf_counter()
+
+        def done(_: Future) -> None:
+            elapsed = time.perf_counter() - started
+            latency.record(elapsed)
+            PASSWORD_HASH_DURATION.observe(elapsed, operation)
+            with self._lock:
+                self._in_flight -= 1
+
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            done(None)
+            raise
+
+        future.add_done_callback(done)
+        return future
+
+    async def hash_async(self, password: str) -> str:
+        """Hashes a password without blocking the event loop."""
+
+        return await asyncio.wrap_future(self._submit("hash", _hash, password))
+
+    async def verify_async(self, password: str, hashed_password: str) -> bool:
+        """Checks a password against its hash without blocking the event loop."""
+
+        return await asyncio.wrap_future(
+            self._submit("verify", _verify, password, hashed_password)
+        )
+
+    def stats(self) -> dict:
+        """Returns the pool's queue depth and hash/verify latency."""
+
+        with self._lock:
+            in_flight = self._in_flight
+
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "in_flight": in_flight,
+            "queue_depth": max(0, in_flight - self.workers),
+            "rejected": self.rejected,
+            "hash": self.hash_latency.snapshot(),
+            "verify": self.verify_latency.snapshot(),
+        }
+
+
+password_hasher = PasswordHasher(
+    workers=int(os.getenv("HASH_WORKERS", min(4, os.cpu_count() or 1))),
+    queue_limit=int(os.getenv("HASH_QUEUE_LIMIT", 32)),
+)
@@ -0,0 +1,209 @@
+"""
+Bulk import of tickets from NDJSON or CSV.
+
+Used by POST /api/tickets/import and `python -m app.cli import-tickets`.
+The file is read one line at a time, every row is validated against
+TicketCreate, and valid rows are inserted in chunks, one transaction per
+chunk. Only the current chunk and a capped list of errors are kept in memory,
+so a file of millions of tickets can be imported as easily as a small one.
+
+Files written by GET /api/tickets/export can be imported again: the columns
+TicketCreate doesn't know about (id, status, ...) are ignored.
+"""
+
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from datetime import date
+from pydantic import ValidationError
+from sqlmodel import Session, insert
+from app.conditional import bump_tickets_version_statement
+from app.export import ExportFormat
+from app.models import Ticket, TicketCreate, TicketImportError, TicketImportResult, TicketStatus
+
+# Valid rows inserted per transaction
+IMPORT_CHUNK_SIZE = 1000
+
+# The most row errors listed in the summary (all of them are counted)
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportFileError(ValueError):
+    """Raised when the file itself can't be read (e.g. it isn't UTF-8)."""
+
+
+@dataclass
+class ImportProgress:
+    """Running totals of an import."""
+
+    rows: int = 0
+    imported: int = 0
+    failed: int = 0
+    errors: list[TicketImportError] = field(default_factory=list)
+
+    def add_error(self, row: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(TicketImportError(row=row, message=message))
+
+    def result(self) -> TicketImportResult:
+        return TicketImportResult(
+            rows=self.rows,
+            imported=self.imported,
+            failed=self.failed,
+            errors=self.errors,
+        )
+
+
+def detect_format(filename: str | None) -> ExportFormat:
+    """Picks the file format from the file name (NDJSON unless it ends in .csv)."""
+
+    if filename and filename.lower().endswith(".csv"):
+        return ExportFormat.csv
+
+    return ExportFormat.ndjson
+
+
+def open_text(binary_file) -> io.TextIOWrapper:
+    """Wraps a binary file so it can be read as UTF-8 text, line by line."""
+
+    # utf-8-sig skips the byte order mark spreadsheet programs add to CSVs,
+    # and newline="" lets the csv module handle line endings inside quotes
+    return io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline="")
+
+
+def read_rows(text_file, file_format: ExportFormat):
+    """Yields each row of the file, without loading the whole file.
+
+    Args:
+        text_file: The file, opened as text.
+        file_format (ExportFormat): Whether the file is NDJSON or CSV.
+
+    Yields:
+        tuple[int, dict | None, str | None]: The row number, and either the
+        row's fields or the reason it couldn't be parsed.
+
+    Raises:
+        ImportFileError: If the file is not valid UTF-8.
+    """
+
+    try:
+        if file_format == ExportFormat.csv:
+            reader = csv.DictReader(text_file)
+
+            for row in reader:
+                # Values past the header's last column end up under None
+                row.pop(None, None)
+                # Row numbers count the header, like a spreadsheet does
+                yield reader.line_num, row, None
+
+            return
+
+        for line_number, line in enumerate(text_file, start=1):
+            if not line.strip():
+                continue
+
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as error:
+                yield line_number, None, f"Invalid JSON: {error.msg}"
+                continue
+
+            if not isinstance(row, dict):
+                yield line_number, None, "Expected a JSON object"
+                continue
+
+            yield line_number, row, None
+
+    except UnicodeDecodeError:
+        raise ImportFileError("The file is not valid UTF-8")
+
+    except csv.Error as error:
+        raise ImportFileError(f"Invalid CSV: {error}")
+
+
+def validation_message(error: ValidationError) -> str:
+    """Returns a short one-line description of a row's validation errors."""
+
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}"
+        for detail in error.errors()
+    )
+
+
+def import_tickets(
+    session: Session,
+    user_id: int,
+    text_file,
+    file_format: ExportFormat,
+    chunk_size: int | None = None,
+    on_progress=None
+) -> TicketImportResult:
+    """Validates every row of a file and inserts the valid ones as tickets.
+
+    Invalid rows are skipped and listed in the summary; they don't stop the
+    import. Each chunk is committed on its own, so tickets from chunks that
+    were committed stay imported even if a later chunk fails.
+
+    Args:
+        session (Session): The database session.
+        user_id (int): The id of the user who will own the tickets.
+        text_file: The file, opened as text (see open_text()).
+        file_format (ExportFormat): Whether the file is NDJSON or CSV.
+        chunk_size (int | None): Valid rows inserted per transaction
+            (IMPORT_CHUNK_SIZE by default).
+        on_progress: Called with the ImportProgress after each chunk is committed.
+
+    Returns:
+        TicketImportResult: How many rows were read, imported and rejected,
+        and the first MAX_REPORTED_ERRORS errors.
+
+    Raises:
+        ImportFileError: If the file can't be read.
+    """
+
+    chunk_size = chunk_size or IMPORT_CHUNK_SIZE
+    progress = ImportProgress()
+    today = date.today()
+    chunk = []
+
+    def flush() -> None:
+        session.execute(insert(Ticket), chunk)
+        session.execute(bump_tickets_version_statement(user_id))
+        session.commit()
+        progress.imported += len(chunk)
+        chunk.clear()
+
+        if on_progress is not None:
+            on_progress(progress)
+
+    for row_number, row, parse_error in read_rows(text_file, file_format):
+        progress.rows += 1
+
+        if parse_error is not None:
+            progress.add_error(row_number, parse_error)
+            continue
+
+        try:
+            ticket = TicketCreate.model_validate(row)
+        except ValidationError as error:
+            progress.add_error(row_number, validation_message(error))
+            continue
+
+        chunk.append({
+            "title": ticket.title,
+            "description": ticket.description,
+            "priority": ticket.priority,
+            "status": TicketStatus.open,
+            "created": today,
+            "user_id": user_id,
+        })
+
+        if len(chunk) >= chunk_size:
+            flush()
+
+    if chunk:
+        flush()
+
+    return progress.result()
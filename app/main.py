@@ -1,11 +1,23 @@
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+from fastapi.routing import APIRoute
+from app.routes import admin
 from app.routes import auth
 from app.routes import tickets
+from app.routes import async_auth
+from app.routes import async_tickets
 from app.models import *
 from app.routes.auth import UserDep
-from app.db import create_db_and_tables
+from app.db import async_engine, async_read_engine, engine, settings
+from app.migrations import check_schema
+from app.revocation import revoked_tokens
+from app.hashing import password_hasher
+from app.group_commit import group_commit
+from app.metrics import CONTENT_TYPE, MetricsMiddleware, render
+from app.slow_queries import SlowQueryMiddleware
+from app.profiling import ProfilingMiddleware
+from app.assets import asset_response, static_path
+from sqlmodel import Session
 
 
 app = FastAPI(
@@ -14,21 +26,83 @@ app = FastAPI(
     description="A small REST API demonstrating CRUD backed by SQLite and SQLModel."
 )
 
+
+def hide_shadowed_routes(app: FastAPI) -> None:
+    """Leaves routes that an earlier route already serves out of the OpenAPI schema.
+
+    Each path and method then has one operation in the schema, the one that
+    actually handles it, instead of two with the same operation id.
+
+    Args:
+        app (FastAPI): The app whose routes to check, in the order they match.
+    """
+
+    served = set()
+
+    for route in app.routes:
+        if not isinstance(route, APIRoute):
+            continue
+
+        operations = {(route.path_format, method) for method in route.methods}
+        if operations & served:
+            route.include_in_schema = False
+        served |= operations
+
+
+# In async mode the async handlers are included first, so they take
+# precedence. Routes without an async version fall through to the sync routers,
+# and so do requests an async route doesn't match (a ticket id that isn't an
+# int gets the sync route's validation error).
+if settings.async_mode:
+    app.include_router(async_auth.router)
+    app.include_router(async_tickets.tickets_router)
+
 app.include_router(auth.router)
 app.include_router(tickets.tickets_router)
-app.mount("/static", StaticFiles(directory="static", html=True), name="static")
+app.include_router(admin.router)
+hide_shadowed_routes(app)
+# The last one added runs first, so the metrics also count profiled requests
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(SlowQueryMiddleware)
 
 @app.on_event("startup")
 def on_startup():
-    create_db_and_tables()
+    # Only reads the stored schema version when the database is up to date
+    check_schema(engine, settings.migrate_on_startup)
+    with Session(engine) as session:
+        revoked_tokens.load(session)
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    password_hasher.shutdown()
+    if group_commit is not None:
+        group_commit.shutdown()
+    # Closes aiosqlite's connection threads; the read engine is the same
+    # engine when there is no separate read-only one
+    if async_read_engine is not None and async_read_engine is not async_engine:
+        await async_read_engine.dispose()
+    if async_engine is not None:
+        await async_engine.dispose()
+
+# Browsers ask for /favicon.ico by name, so it can't be fingerprinted
 @app.get("/favicon.ico", include_in_schema=False)
-async def favicon():
-    return FileResponse("static/favicon.ico", media_type="image/x-icon")
+async def favicon(request: Request):
+    return asset_response(request, "favicon.ico", cache_control="public, max-age=86400")
+
+# Fingerprinted, precompressed files; see app/assets.py
+@app.api_route("/static/{name:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def static_file(request: Request, name: str):
+    return asset_response(request, static_path(name))
+
+# Scraped by Prometheus; see app/metrics.py for what is recorded
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(content=render(), media_type=CONTENT_TYPE)
 
 @app.get("/")
-def index():
-    return FileResponse("static/index.html")
+async def index(request: Request):
+    return asset_response(request, "index.html")
 
 # This is used to display who is currently logged in
 @app.get("/user", response_model=UserPublic)
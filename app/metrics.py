@@ -0,0 +1,339 @@
+"""
+Prometheus metrics, served at /metrics in the text exposition format.
+
+    helpdesk_http_requests_total               requests by method, route and status
+    helpdesk_http_request_duration_seconds     request latency histogram (same labels)
+    helpdesk_http_requests_in_flight           requests being handled right now
+    helpdesk_db_query_duration_seconds         SQL statement latency by operation
+    helpdesk_db_pool_checkout_seconds          time spent waiting for a pooled connection
+    helpdesk_password_hash_duration_seconds    bcrypt hash/verify time, queueing included
+    helpdesk_db_write_batch_size               writes per group commit (WRITE_BATCH_MS)
+
+Routes are labelled with their template (/api/tickets/{ticket_id}), never the
+raw path, so the number of series stays fixed. Requests no route matched
+(404s) share the route label "unmatched".
+
+Recording has to be cheap enough to leave on, so every thread writes to its
+own shard of each metric and never takes a lock. The shards are only summed
+when /metrics is scraped.
+"""
+
+import abc
+import threading
+import time
+from bisect import bisect_left
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds (seconds) of the histogram buckets
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+HASH_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds (writes) of the write batch size buckets
+WRITE_BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+_QUERY_OPERATIONS = ("select", "insert", "update", "delete")
+
+# Every metric, in the order /metrics lists them
+REGISTRY: list = []
+
+
+class _Shards:
+    """One dict per thread, so writers never share (or lock) anything."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: list[dict] = []
+
+    def local(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+
+        if shard is None:
+            # Once per thread. Shards of finished threads are kept, since
+            # their counts are part of the totals.
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+
+        return shard
+
+    def collect(self) -> list[dict]:
+        with self._lock:
+            shards = list(self._shards)
+
+        # dict.copy() runs without releasing the GIL, so it's safe while the
+        # owning thread keeps writing
+        return [shard.copy() for shard in shards]
+
+    def clear(self) -> None:
+        with self._lock:
+            for shard in self._shards:
+                shard.clear()
+
+
+class _Metric(abc.ABC):
+    type = ""
+
+    def __init__(self, name: str, help: str, label_names: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self._shards = _Shards()
+        REGISTRY.append(self)
+
+    def clear(self) -> None:
+        self._shards.clear()
+
+    @abc.abstractmethod
+    def samples(self):
+        """Yields (name suffix, label pairs, value) for every series."""
+
+
+class Counter(_Metric):
+    """A total that only goes up."""
+
+    type = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        shard = self._shards.local()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def totals(self) -> dict[tuple, float]:
+        totals = {}
+
+        for shard in self._shards.collect():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+
+        return totals
+
+    def samples(self):
+        totals = self.totals()
+
+        # An unlabelled metric is always reported, even before its first use
+        if not self.label_names and not totals:
+            totals[()] = 0
+
+        for labels, value in totals.items():
+            yield "", tuple(zip(self.label_names, labels)), value
+
+
+class Gauge(Counter):
+    """A value that goes up and down, e.g. the requests in flight.
+
+    Each thread's shard holds that thread's net change, so a value raised in
+    one thread and lowered in another still adds up.
+    """
+
+    type = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    """Counts observations into buckets, plus their sum and count."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, label_names: tuple[str, ...] = (), buckets=REQUEST_BUCKETS):
+        super().__init__(name, help, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        shard = self._shards.local()
+        entry = shard.get(labels)
+
+        if entry is None:
+            # One count per bucket, one for +Inf, then the sum
+            entry = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+
+        entry[bisect_left(self.buckets, value)] += 1
+        entry[-1] += value
+
+    def totals(self) -> dict[tuple, list]:
+        totals = {}
+
+        for shard in self._shards.collect():
+            for labels, entry in shard.items():
+                entry = list(entry)
+                if labels in totals:
+                    totals[labels] = [a + b for a, b in zip(totals[labels], entry)]
+                else:
+                    totals[labels] = entry
+
+        return totals
+
+    def samples(self):
+        bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+
+        for labels, entry in self.totals().items():
+            pairs = tuple(zip(self.label_names, labels))
+            cumulative = 0
+
+            for bound, count in zip(bounds, entry[:-1]):
+                cumulative += count
+                yield "_bucket", pairs + (("le", bound),), cumulative
+
+            yield "_sum", pairs, entry[-1]
+            yield "_count", pairs, cumulative
+
+
+def _format_value(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(pairs: tuple) -> str:
+    if not pairs:
+        return ""
+
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def render() -> str:
+    """Returns every registered metric in the Prometheus text format."""
+
+    lines = []
+
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+
+        for suffix, pairs, value in metric.samples():
+            lines.append(f"{metric.name}{suffix}{_format_labels(pairs)} {_format_value(value)}")
+
+    return "\n".join(lines) + "\n"
+
+
+REQUESTS = Counter(
+    "helpdesk_http_requests_total",
+    "HTTP requests handled.",
+    ("method", "route", "status"),
+)
+REQUEST_DURATION = Histogram(
+    "helpdesk_http_request_duration_seconds",
+    "Time to handle an HTTP request, streaming the body included.",
+    ("method", "route", "status"),
+)
+IN_FLIGHT = Gauge(
+    "helpdesk_http_requests_in_flight",
+    "HTTP requests being handled.",
+)
+QUERY_DURATION = Histogram(
+    "helpdesk_db_query_duration_seconds",
+    "Time to execute an SQL statement.",
+    ("operation",),
+    buckets=QUERY_BUCKETS,
+)
+POOL_CHECKOUT = Histogram(
+    "helpdesk_db_pool_checkout_seconds",
+    "Time spent waiting for a connection from the pool.",
+    buckets=QUERY_BUCKETS,
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "helpdesk_password_hash_duration_seconds",
+    "Time to hash or verify a password, including the wait for a pool process.",
+    ("operation",),
+    buckets=HASH_BUCKETS,
+)
+
+WRITE_BATCH_SIZE = Histogram(
+    "helpdesk_db_write_batch_size",
+    "Ticket writes committed together by the group-commit writer.",
+    buckets=WRITE_BATCH_BUCKETS,
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording the request metrics.
+
+    A plain ASGI middleware rather than @app.middleware("http"), which would
+    wrap every response in an extra streaming layer.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Stays 500 if the app raises before it starts a response
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        started = time.perf_counter()
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            IN_FLIGHT.dec()
+
+            # The router stores the matched route in the scope
+            route = getattr(scope.get("route"), "path", "unmatched")
+            labels = (scope["method"], route, str(status_code))
+            REQUESTS.inc(*labels)
+            REQUEST_DURATION.observe(elapsed, *labels)
+
+
+def instrument_engine(engine) -> None:
+    """Times every statement the engine executes.
+
+    Args:
+        engine: A sync Engine (for an AsyncEngine, pass its sync_engine).
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        operation = statement.lstrip()[:6].lower()
+        QUERY_DURATION.observe(elapsed, operation if operation in _QUERY_OPERATIONS else "other")
+
+    @event.listens_for(engine, "handle_error")
+    def drop_query_timer(exception_context):
+        # A failed statement never reaches after_cursor_execute, so its start
+        # time would otherwise stay on the pooled connection for good
+        connection = exception_context.connection
+        started = connection.info.get("query_started") if connection is not None else None
+        if started:
+            started.pop()
+
+
+class _TimedCheckout:
+    # The pool has no "before checkout" event, so the wait is timed around
+    # the method every checkout goes through
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT.observe(time.perf_counter() - started)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    """A QueuePool that records how long each checkout waited."""
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    """The AsyncEngine's pool, recording how long each checkout waited."""
@@ -0,0 +1,209 @@
+"""
+Versioned schema migrations.
+
+The database records the version of its schema in a one-row schema_version
+table. Each migration is a module in this package named mNNNN_description.py
+with an upgrade(connection) function, and they run in order, each in its own
+transaction together with the version bump, so a failed migration leaves the
+database at the previous version.
+
+    python -m app.cli migrate          bring the database up to date
+    python -m app.cli migrate --check  only report the version
+
+At startup the app just reads the stored version and compares it with the
+latest migration (check_schema), so workers don't inspect or change the
+schema when the database is already current. A database that is behind is
+migrated at startup unless MIGRATE_ON_STARTUP=0, in which case the worker
+refuses to start until `python -m app.cli migrate` has run.
+
+Migrations may meet databases created before this table existed (every
+earlier version created and patched tables on startup), so they check what
+already exists before changing it.
+"""
+
+import importlib
+import pkgutil
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass
+from sqlalchemy import inspect
+from sqlmodel import SQLModel
+
+# Module names of migrations: m0001_initial_tables, m0002_..., ...
+_MIGRATION_NAME = re.compile(r"^m(\d{4})_\w+$")
+
+SCHEMA_VERSION_DDL = "CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    upgrade: object
+
+
+def load_migrations() -> list[Migration]:
+    """Returns every migration in this package, oldest first.
+
+    Raises:
+        RuntimeError: If two migrations share a version number.
+    """
+
+    migrations = []
+
+    for module in pkgutil.iter_modules(__path__):
+        match = _MIGRATION_NAME.match(module.name)
+        if match is None:
+            continue
+
+        loaded = importlib.import_module(f"{__name__}.{module.name}")
+        migrations.append(Migration(int(match.group(1)), module.name, loaded.upgrade))
+
+    migrations.sort(key=lambda migration: migration.version)
+
+    versions = [migration.version for migration in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions in {versions}")
+
+    return migrations
+
+
+def current_version(connection) -> int | None:
+    """Returns the stored schema version, or None if it was never recorded."""
+
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+    ).first()
+    if exists is None:
+        return None
+
+    return connection.exec_driver_sql("SELECT version FROM schema_version").scalar()
+
+
+def _set_version(connection, version: int) -> None:
+    connection.exec_driver_sql(SCHEMA_VERSION_DDL)
+    connection.exec_driver_sql("DELETE FROM schema_version")
+    connection.exec_driver_sql("INSERT INTO schema_version (version) VALUES (?)", (version,))
+
+
+@contextmanager
+def _write_transaction(engine):
+    """A transaction that holds SQLite's write lock from the start.
+
+    The sqlite3 module only opens a transaction before INSERT/UPDATE/DELETE,
+    so without this DDL would be committed statement by statement, and two
+    workers starting at once could both decide to run the same migration.
+    """
+
+    with engine.begin() as connection:
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+        yield connection
+
+
+def _check_not_newer(version: int) -> None:
+    if version > LATEST_VERSION:
+        raise RuntimeError(
+            f"Database schema version {version} is newer than this code ({LATEST_VERSION})"
+        )
+
+
+def migrate(engine, on_migration=None) -> list[str]:
+    """Brings the database schema up to the latest version.
+
+    A new, empty database gets the current schema in one go and is stamped
+    with the latest version. Anything else runs the migrations it is missing,
+    starting from 0 for databases created before versions were recorded.
+
+    Args:
+        engine: The engine of the database to migrate.
+        on_migration: Optional callback, called with each migration's name
+            before it runs.
+
+    Returns:
+        list[str]: The names of the migrations that ran.
+
+    Raises:
+        RuntimeError: If the database is newer than this code.
+    """
+
+    with _write_transaction(engine) as connection:
+        if current_version(connection) is None and not inspect(connection).get_table_names():
+            # after_create hooks on the metadata add the search index (its
+            # table and triggers). tickets_version has no triggers: every
+            # write bumps it once, see bump_tickets_version_statement()
+            SQLModel.metadata.create_all(connection)
+            _set_version(connection, LATEST_VERSION)
+            return []
+
+    applied = []
+
+    for migration in MIGRATIONS:
+        with _write_transaction(engine) as connection:
+            # Read again under the lock, in case another worker got here first
+            version = current_version(connection) or 0
+            _check_not_newer(version)
+            if migration.version <= version:
+                continue
+
+            if on_migration is not None:
+                on_migration(migration.name)
+
+            migration.upgrade(connection)
+            _set_version(connection, migration.version)
+
+        applied.append(migration.name)
+
+    return applied
+
+
+def check_schema(engine, migrate_if_behind: bool = True) -> None:
+    """Checks the stored schema version at startup.
+
+    Reading one row is all it costs when the database is up to date.
+
+    Args:
+        engine: The engine of the database.
+        migrate_if_behind (bool): Migrate a database that is behind, instead
+            of refusing to start.
+
+    Raises:
+        RuntimeError: If the database is behind and migrate_if_behind is
+            False, or if it is newer than this code.
+    """
+
+    with engine.connect() as connection:
+        version = current_version(connection)
+
+    if version == LATEST_VERSION:
+        return
+
+    _check_not_newer(version or 0)
+
+    if not migrate_if_behind:
+        raise RuntimeError(
+            f"Database schema is at version {version or 0}, expected {LATEST_VERSION}. "
+            "Run `python -m app.cli migrate` first"
+        )
+
+    migrate(engine)
+
+
+def add_column(connection, table_name: str, column_name: str, definition: str) -> bool:
+    """Adds a column unless the table already has it.
+
+    Returns:
+        bool: True if the column was added.
+    """
+
+    columns = {column["name"] for column in inspect(connection).get_columns(table_name)}
+    if column_name in columns:
+        return False
+
+    connection.exec_driver_sql(f'ALTER TABLE "{table_name}" ADD COLUMN {column_name} {definition}')
+    return True
+
+
+# Loaded last, since the migrations import the helpers above
+MIGRATIONS = load_migrations()
+
+LATEST_VERSION = MIGRATIONS[-1].version if MIGRATIONS else 0
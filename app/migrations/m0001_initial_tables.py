@@ -0,0 +1,9 @@
+"""Creates the ticket, user and revokedtoken tables."""
+
+from app.models import RevokedToken, Ticket, User
+
+
+def upgrade(connection) -> None:
+    # Creating the ticket table also creates its full-text index (app/search.py)
+    for model in (User, Ticket, RevokedToken):
+        model.__table__.create(connection, checkfirst=True)
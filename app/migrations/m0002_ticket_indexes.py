@@ -0,0 +1,11 @@
+"""Adds the composite indexes that let every ticket route avoid a full scan."""
+
+from sqlmodel import SQLModel
+
+
+def upgrade(connection) -> None:
+    # create_all() only builds indexes along with new tables, so tables
+    # created by an older version can be missing some
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
@@ -0,0 +1,13 @@
+"""Builds the full-text search index for tickets created before it existed."""
+
+from sqlalchemy import text
+from app.search import rebuild_search_index
+
+
+def upgrade(connection) -> None:
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ticket_fts'")
+    ).first()
+
+    if exists is None:
+        rebuild_search_index(connection)
@@ -0,0 +1,29 @@
+"""Adds ticket versions and per-user ticket versions, for conditional requests."""
+
+from app.conditional import create_version_triggers
+from app.migrations import add_column
+
+# SQLite can't add a NOT NULL column without a constant default, so the
+# timestamps are added as nullable and filled in from existing data
+_COLUMNS = [
+    ("ticket", "version", "INTEGER NOT NULL DEFAULT 1", None),
+    ("ticket", "modified", "DATETIME", "UPDATE ticket SET modified = created"),
+    ("user", "tickets_version", "INTEGER NOT NULL DEFAULT 0", None),
+    ("user", "tickets_modified", "DATETIME", 'UPDATE "user" SET tickets_modified = CURRENT_TIMESTAMP'),
+]
+
+
+def upgrade(connection) -> None:
+    backfills = [
+        backfill
+        for table_name, column_name, definition, backfill in _COLUMNS
+        if add_column(connection, table_name, column_name, definition) and backfill is not None
+    ]
+
+    # Only once every column exists, since a backfill can fire the version
+    # triggers an older version created at startup (they use the other new
+    # columns; m0005 drops them)
+    for backfill in backfills:
+        connection.exec_driver_sql(backfill)
+
+    create_version_triggers(connection)
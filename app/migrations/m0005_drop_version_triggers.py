@@ -0,0 +1,12 @@
+"""Drops the row triggers that used to bump tickets_version.
+
+m0004 (or, before migrations existed, the app at startup) created them. They
+ran an UPDATE of the user for every ticket row, so a bulk write of n tickets
+updated its user n times. Every write now bumps the version once itself (see
+bump_tickets_version_statement() in app/conditional.py).
+"""
+
+
+def upgrade(connection) -> None:
+    for event_name in ("insert", "update", "delete"):
+        connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS ticket_version_{event_name}")
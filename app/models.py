@@ -1,6 +1,7 @@
 from sqlmodel import Field, SQLModel
+from sqlalchemy import Index
 from enum import Enum
-from datetime import date
+from datetime import date, datetime, UTC
 from typing import Annotated
 from pydantic import StringConstraints
 
@@ -10,13 +11,26 @@ NonEmptyStr = Annotated[
     StringConstraints(min_length=1, strip_whitespace=True)
 ]
 
+def utc_now() -> datetime:
+    """The current UTC time, without a timezone (how SQLite stores it)."""
+    return datetime.now(UTC).replace(tzinfo=None)
+
 # Ticket Models
 
+# The most tickets one bulk request can create, or select by id
+MAX_BULK_TICKETS = 1000
+
 class TicketStatus(str, Enum):
     open = "open"
     in_progress = "in_progress"
     closed = "closed"
 
+# Columns the ticket list can be ordered (and paginated) by
+class TicketSort(str, Enum):
+    id = "id"
+    created = "created"
+    priority = "priority"
+
 class TicketBase(SQLModel):
     title: NonEmptyStr
     description: NonEmptyStr
@@ -25,14 +39,27 @@ class TicketBase(SQLModel):
 
 # Ticket stored in the database
 class Ticket(TicketBase, table=True):
+    # Every query is scoped to one user, so every index starts with user_id.
+    # id comes last so each index also gives the keyset pagination order.
+    __table_args__ = (
+        Index("ix_ticket_user_id_id", "user_id", "id"),
+        Index("ix_ticket_user_status_priority", "user_id", "status", "priority", "id"),
+        Index("ix_ticket_user_priority", "user_id", "priority", "id"),
+        Index("ix_ticket_user_created", "user_id", "created", "id"),
+    )
+
     id: int | None = Field(default=None, primary_key=True, index=True)
     created: date = Field(default_factory=date.today) # date.today() is run every time a Ticket is created
     user_id: int
+    # Bumped on every update, and used for the ticket's ETag
+    version: int = Field(default=1)
+    modified: datetime = Field(default_factory=utc_now)
 
 class TicketPublic(TicketBase):
     id: int
     created: date
     user_id: int
+    version: int
 
 class TicketCreate(SQLModel):
     title: NonEmptyStr
@@ -45,6 +72,34 @@ class TicketUpdate(SQLModel):
     priority: int | None = Field(default=None, ge=1, le=5)
     status: TicketStatus | None = None
 
+# Picks the tickets a bulk update/delete applies to. Every field given must
+# match (the text fields work like /api/tickets/search).
+class TicketSelection(SQLModel):
+    ids: list[int] | None = Field(default=None, min_length=1, max_length=MAX_BULK_TICKETS)
+    q: str | None = None
+    title: str | None = None
+    description: str | None = None
+    priority: int | None = Field(default=None, ge=1, le=5)
+    status: TicketStatus | None = None
+
+class TicketBulkUpdate(TicketSelection):
+    changes: TicketUpdate
+
+class TicketBulkResult(SQLModel):
+    count: int
+    ids: list[int]
+
+# A row of an imported file that was skipped, and why
+class TicketImportError(SQLModel):
+    row: int
+    message: str
+
+class TicketImportResult(SQLModel):
+    rows: int
+    imported: int
+    failed: int
+    errors: list[TicketImportError]
+
 
 
 # Token and User Models
@@ -52,6 +107,16 @@ class TicketUpdate(SQLModel):
 class Token(SQLModel):
     access_token: NonEmptyStr
     token_type: NonEmptyStr
+    refresh_token: str | None = None
+
+class RefreshTokenRequest(SQLModel):
+    refresh_token: NonEmptyStr
+
+# Refresh token that was logged out or already used, stored by its "jti" claim.
+# Rows can be deleted once the token would have expired anyway.
+class RevokedToken(SQLModel, table=True):
+    jti: str = Field(primary_key=True)
+    expires: datetime = Field(index=True)
 
 class UserBase(SQLModel):
     username: NonEmptyStr
@@ -61,6 +126,10 @@ class User(UserBase, table=True):
     username: NonEmptyStr = Field(unique=True, index=True)
     id: int | None = Field(default=None, primary_key=True, index=True)
     hashed_password: NonEmptyStr
+    # Bumped (once per write, see app/conditional.py) whenever one of the user's
+    # tickets is created, updated or deleted. Used for the ticket list's ETag.
+    tickets_version: int = Field(default=0)
+    tickets_modified: datetime = Field(default_factory=utc_now)
 
 class UserPublic(UserBase):
     id: int
@@ -0,0 +1,165 @@
+"""
+Keyset (cursor) pagination.
+
+A cursor is an opaque, url-safe string holding the sort key and id of the
+last ticket on a page. The next page starts right after that row, so SQLite
+seeks straight to it through an index instead of walking and throwing away
+`offset` rows. Every page costs the same no matter how deep it is.
+"""
+
+import base64
+import binascii
+import json
+from datetime import date
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+from starlette import status
+from app.models import Ticket
+
+# Header used to hand the cursor for the next page back to the client
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _int_key(key) -> int:
+    # bool is an int to isinstance(), but never a valid key
+    if not isinstance(key, int) or isinstance(key, bool):
+        raise TypeError(key)
+    return key
+
+
+def _date_key(key) -> date:
+    if not isinstance(key, str):
+        raise TypeError(key)
+    return date.fromisoformat(key)
+
+
+def _float_key(key) -> float:
+    # json.dumps() writes a whole float like 2.0 as "2.0", but accept 2 too
+    if not isinstance(key, (int, float)) or isinstance(key, bool):
+        raise TypeError(key)
+    return float(key)
+
+
+# How the sort key of each sort is checked and parsed when a cursor comes back.
+# The client can edit a cursor, so a key of the wrong type must be rejected
+# here instead of failing inside the query.
+_KEY_PARSERS = {
+    "id": _int_key,
+    "priority": _int_key,
+    "created": _date_key,
+    "rank": _float_key,
+}
+
+
+def encode_cursor(sort: str, key, ticket_id: int) -> str:
+    """Encodes the position of a ticket as an opaque cursor.
+
+    Args:
+        sort (str): The name of the sort the page was ordered by.
+        key: The value of the sort column for the ticket.
+        ticket_id (int): The id of the ticket, used to break ties.
+
+    Returns:
+        str: A url-safe cursor.
+    """
+
+    if isinstance(key, date):
+        key = key.isoformat()
+
+    raw = json.dumps([sort, key, ticket_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple:
+    """Decodes a cursor created by encode_cursor().
+
+    Args:
+        cursor (str): The cursor sent by the client.
+        sort (str): The sort the client is currently asking for.
+
+    Returns:
+        tuple: The (sort key, ticket id) of the last ticket on the previous page.
+
+    Raises:
+        HTTPException(400): If the cursor is malformed, was made for a different
+            sort, or holds a key of the wrong type for its sort.
+    """
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, key, ticket_id = json.loads(base64.urlsafe_b64decode(padded))
+
+        if cursor_sort != sort or sort not in _KEY_PARSERS:
+            raise ValueError(cursor_sort)
+
+        return _KEY_PARSERS[sort](key), _int_key(ticket_id)
+
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def paginate(stmt, sort: str, sort_column, after: str | None, offset: int, limit: int):
+    """Orders and limits a ticket query, starting after a cursor if one was given.
+
+    One extra row is fetched so split_page() can tell whether another page exists.
+
+    Args:
+        stmt: The select statement to paginate.
+        sort (str): The name of the sort, stored in the cursor.
+        sort_column: The column (or expression) the tickets are ordered by.
+        after (str | None): The cursor returned with the previous page.
+        offset (int): The number of tickets to skip (legacy paging).
+        limit (int): The number of tickets in a page.
+
+    Returns:
+        The paginated select statement.
+
+    Raises:
+        HTTPException(400): If both offset and after were provided, or the cursor is invalid.
+    """
+
+    # The id is always the last sort column, so the order is total and stable
+    order = [Ticket.id] if sort_column is Ticket.id else [sort_column, Ticket.id]
+
+    if after is not None:
+        if offset:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="offset cannot be combined with after"
+            )
+
+        key, last_id = decode_cursor(after, sort)
+
+        if len(order) == 1:
+            stmt = stmt.where(Ticket.id > last_id)
+        else:
+            stmt = stmt.where(tuple_(sort_column, Ticket.id) > tuple_(key, last_id))
+
+    elif offset:
+        stmt = stmt.offset(offset)
+
+    return stmt.order_by(*order).limit(limit + 1)
+
+
+def split_page(rows: list, limit: int, sort: str, key_of) -> tuple[list, str | None]:
+    """Trims the extra row fetched by paginate() and builds the next cursor.
+
+    Args:
+        rows (list): The rows returned by the paginated query.
+        limit (int): The number of tickets in a page.
+        sort (str): The name of the sort, stored in the cursor.
+        key_of: Function that returns the (sort key, ticket id) of a row.
+
+    Returns:
+        tuple[list, str | None]: The page, and the cursor for the next page
+        (None when this is the last page).
+    """
+
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    return rows, encode_cursor(sort, *key_of(rows[-1]))
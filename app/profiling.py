@@ -0,0 +1,333 @@
+"""
+On-demand profiling of a single request.
+
+An admin sends a request with the header `X-Profile: 1`, and that one request
+is profiled while it runs. The response carries an `X-Profile-Id` header, and
+the profile is kept in a small in-memory store:
+
+    GET /admin/profiles                  recent profiles, newest first
+    GET /admin/profiles/{id}             call tree and time breakdown (JSON)
+    GET /admin/profiles/{id}/download    folded stacks, for flamegraph.pl or
+                                         https://www.speedscope.app
+
+The profiler samples stacks from a background thread instead of tracing
+every call, so the profiled request runs at close to its normal speed. The
+request runs partly on the event loop and partly in the thread pool (sync
+routes, sync dependencies, streamed bodies), so each sample looks at every
+thread but only keeps the ones that are running the profiled request: asyncio
+runs each task step, and anyio each thread pool job, inside the context it was
+started from, and the middleware marks the request's context. Other requests
+running at the same time don't show up.
+
+The sampler needs the GIL to take a sample. A thread running pure Python only
+hands it over every sys.getswitchinterval() (5 ms by default), so samples can
+be further apart than PROFILE_INTERVAL_MS. Each profile reports the interval
+it actually got and uses it for its times.
+
+Requests without the header, or sent by someone who isn't an admin, are
+passed through untouched.
+
+    PROFILE_INTERVAL_MS   time between samples (default: 1)
+    PROFILE_STORE_SIZE    profiles kept (default: 20)
+"""
+
+import contextvars
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from datetime import datetime, UTC
+from pathlib import Path
+from fastapi import HTTPException
+from app.routes import auth
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+_APP_DIR = str(Path(__file__).resolve().parent)
+
+# Middleware and profiler frames are part of every request, so on their own
+# they don't make a sample count
+_IGNORED_FILES = {
+    str(Path(_APP_DIR) / "profiling.py"),
+    str(Path(_APP_DIR) / "metrics.py"),
+    str(Path(_APP_DIR) / "slow_queries.py"),
+}
+
+# A sample is put in the first category found walking from the innermost frame
+# outwards: (category, substrings of the frame's file or function)
+_CATEGORIES = [
+    ("auth", ("jose/", "passlib/", "decode_access_token", "app/hashing.py")),
+    ("db", ("sqlalchemy/", "sqlmodel/", "sqlite3/", "aiosqlite/")),
+    ("serialization", ("pydantic/", "pydantic_core/", "fastapi/encoders.py", "app/responses.py", "/json/")),
+]
+
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    if filename.startswith(_APP_DIR):
+        filename = "app" + filename[len(_APP_DIR):]
+    else:
+        filename = filename.rsplit("site-packages/", 1)[-1]
+    return f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+
+
+# Set to the profile id while a request is profiled. Every task and thread
+# pool job the request starts inherits it, which is how the sampler tells the
+# request's threads from everyone else's.
+_profiled_request = contextvars.ContextVar("profiled_request", default=None)
+
+
+def _running_context(frame) -> contextvars.Context | None:
+    # The frames where asyncio (a task step) and anyio (a thread pool job)
+    # switch into the context the code above them runs in
+    code = frame.f_code
+    if code.co_qualname == "Handle._run" and code.co_filename.endswith("events.py"):
+        context = getattr(frame.f_locals.get("self"), "_context", None)
+    elif code.co_qualname == "WorkerThread.run" and "anyio" in code.co_filename:
+        context = frame.f_locals.get("context")
+    else:
+        return None
+    return context if isinstance(context, contextvars.Context) else None
+
+
+def _category(stack: tuple[str, ...]) -> str:
+    for label in reversed(stack):
+        for category, markers in _CATEGORIES:
+            if any(marker in label for marker in markers):
+                return category
+    return "other"
+
+
+class Sampler:
+    """Samples the stacks of the threads running one request until stopped.
+
+    Args:
+        interval (float): Seconds between samples.
+        profile_id (str): The value of _profiled_request in the request's context.
+    """
+
+    def __init__(self, interval: float, profile_id: str):
+        self.interval = interval
+        self.profile_id = profile_id
+        self.stacks: Counter[tuple[str, ...]] = Counter()
+        self.rounds = 0
+        self.seconds = 0.0
+        self._labels: dict = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    @property
+    def actual_interval(self) -> float:
+        """The average time between samples, which the GIL can stretch."""
+
+        return self.seconds / self.rounds if self.rounds else self.interval
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        started = time.perf_counter()
+
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    self._sample(frame)
+
+            self.rounds += 1
+
+        self.seconds = time.perf_counter() - started
+
+    def _sample(self, frame) -> None:
+        codes = []
+        in_app = False
+        context = None
+
+        while frame is not None:
+            code = frame.f_code
+            codes.append(code)
+            if code.co_filename.startswith(_APP_DIR) and code.co_filename not in _IGNORED_FILES:
+                in_app = True
+            if context is None:
+                # The innermost one wins: that's the context the thread is in now
+                context = _running_context(frame)
+            frame = frame.f_back
+
+        if in_app and context is not None and context.get(_profiled_request) == self.profile_id:
+            self.stacks[tuple(self._label(code) for code in reversed(codes))] += 1
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = _frame_label(code)
+        return label
+
+
+def call_tree(stacks: Counter, interval_ms: float) -> dict:
+    """Merges the sampled stacks into a tree, heaviest children first."""
+
+    root = {"name": "all", "ms": 0.0, "children": {}}
+
+    for stack, count in stacks.items():
+        node = root
+        node["ms"] += count * interval_ms
+        for label in stack:
+            node = node["children"].setdefault(label, {"name": label, "ms": 0.0, "children": {}})
+            node["ms"] += count * interval_ms
+
+    def finish(node: dict) -> dict:
+        children = sorted(node["children"].values(), key=lambda child: child["ms"], reverse=True)
+        return {"name": node["name"], "ms": round(node["ms"], 3), "children": [finish(child) for child in children]}
+
+    return finish(root)
+
+
+def build_profile(profile_id: str, sampler: Sampler, scope: dict, status_code: int, seconds: float) -> dict:
+    """Turns a finished request's samples into a stored profile."""
+
+    interval_ms = sampler.actual_interval * 1000
+    breakdown = {"auth": 0.0, "db": 0.0, "serialization": 0.0, "other": 0.0}
+
+    for stack, count in sampler.stacks.items():
+        breakdown[_category(stack)] += count * interval_ms
+
+    return {
+        "id": profile_id,
+        "created": datetime.now(UTC).isoformat(timespec="milliseconds"),
+        "method": scope["method"],
+        "path": scope["path"],
+        "route": getattr(scope.get("route"), "path", None),
+        "status": status_code,
+        "duration_ms": round(seconds * 1000, 3),
+        "interval_ms": round(interval_ms, 3),
+        "samples": sum(sampler.stacks.values()),
+        "breakdown_ms": {name: round(ms, 3) for name, ms in breakdown.items()},
+        "tree": call_tree(sampler.stacks, interval_ms),
+        "stacks": dict(sampler.stacks),
+    }
+
+
+def folded_stacks(profile: dict) -> str:
+    """Returns the profile in the folded format ("frame;frame;frame count")."""
+
+    return "".join(
+        f"{';'.join(label.replace(';', ',') for label in stack)} {count}\n"
+        for stack, count in profile["stacks"].items()
+    )
+
+
+def summary(profile: dict) -> dict:
+    return {name: value for name, value in profile.items() if name not in ("tree", "stacks")}
+
+
+class ProfileStore:
+    """The most recent profiles, oldest dropped first.
+
+    Args:
+        maxsize (int): Profiles kept.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = max(1, maxsize)
+        self._profiles: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: dict) -> None:
+        with self._lock:
+            self._profiles[profile["id"]] = profile
+            while len(self._profiles) > self.maxsize:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> dict | None:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def recent(self) -> list[dict]:
+        with self._lock:
+            return list(reversed(self._profiles.values()))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._profiles.clear()
+
+
+profile_store = ProfileStore(int(os.getenv("PROFILE_STORE_SIZE", 20)))
+
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", 1)) / 1000
+
+# One profile at a time: every sampler thread competes for the GIL with the
+# requests it samples
+_profiling = threading.Lock()
+
+
+def requested_by_admin(headers: dict) -> bool:
+    """Checks for the profile header and an admin's access token."""
+
+    if headers.get(PROFILE_HEADER, b"").strip().lower() not in (b"1", b"true", b"yes", b"on"):
+        return False
+
+    scheme, _, token = headers.get(b"authorization", b"").decode("latin-1").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+
+    try:
+        user = auth.decode_access_token(token.strip())
+    except HTTPException:
+        return False
+
+    return user["username"] in auth.ADMIN_USERNAMES
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles requests an admin asked to profile."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not requested_by_admin(dict(scope["headers"]))
+            or not _profiling.acquire(blocking=False)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self._profile(scope, receive, send)
+        finally:
+            _profiling.release()
+
+    async def _profile(self, scope, receive, send):
+        profile_id = uuid.uuid4().hex[:16]
+        status_code = 500
+
+        async def send_with_profile_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (PROFILE_ID_HEADER, profile_id.encode()),
+                ]
+            await send(message)
+
+        sampler = Sampler(PROFILE_INTERVAL, profile_id)
+        token = _profiled_request.set(profile_id)
+        started = time.perf_counter()
+        sampler.start()
+
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            sampler.stop()
+            elapsed = time.perf_counter() - started
+            _profiled_request.reset(token)
+            profile_store.add(build_profile(profile_id, sampler, scope, status_code, elapsed))
@@ -0,0 +1,372 @@
+"""
+Ticket statements shared by the sync and async ticket routes.
+
+The routes only differ in how they run a statement (Session vs AsyncSession),
+so building the statements and turning rows into a page lives here.
+"""
+
+from datetime import datetime
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import false
+from sqlmodel import select
+from starlette import status
+from app.conditional import (
+    bump_tickets_version_statement,
+    check_if_match,
+    is_not_modified,
+    not_modified,
+    set_validators,
+    ticket_etag,
+)
+from app.models import Ticket, TicketCreate, TicketSelection, TicketSort, TicketStatus, TicketUpdate, utc_now
+from app.pagination import NEXT_CURSOR_HEADER, paginate, split_page
+from app.responses import PUBLIC_COLUMNS, json_response, ticket_dict
+from app.search import fts_match, has_no_words, match_expression, matching_ticket_ids, ticket_fts
+
+# The column each TicketSort orders by
+SORT_COLUMNS = {
+    TicketSort.id: Ticket.id,
+    TicketSort.created: Ticket.created,
+    TicketSort.priority: Ticket.priority,
+}
+
+# Sort name used for full-text results ordered by relevance
+RANK_SORT = "rank"
+
+
+def ticket_filters(
+    user_id: int,
+    q: str | None = None,
+    title: str | None = None,
+    description: str | None = None,
+    priority: int | None = None,
+    status: TicketStatus | None = None
+) -> tuple[list, str | None]:
+    """Builds the where clauses for a ticket search.
+
+    Args:
+        user_id (int): The id of the user who owns the tickets.
+        q (str | None): Words in the ticket's title or description.
+        title (str | None): Words in the ticket's title.
+        description (str | None): Words in the ticket's description.
+        priority (int | None): The ticket's priority.
+        status (TicketStatus | None): The ticket's status.
+
+    Returns:
+        tuple[list, str | None]: The where clauses on the ticket table, and
+        the full-text MATCH expression (None when no text was given).
+    """
+
+    filters = [Ticket.user_id == user_id]
+
+    if priority is not None:
+        filters.append(Ticket.priority == priority)
+
+    if status is not None:
+        filters.append(Ticket.status == status)
+
+    # Text with no words in it can't match any ticket. Leaving it out of the
+    # MATCH instead would widen the search (or a bulk delete) to every ticket.
+    if has_no_words(q, title, description):
+        filters.append(false())
+        return filters, None
+
+    return filters, match_expression(q, title, description)
+
+
+def selection_filters(user_id: int, selection: TicketSelection) -> list:
+    """Builds the where clauses for a bulk update or delete.
+
+    Unlike a search, the full-text match becomes an `id IN (...)` subquery,
+    since UPDATE and DELETE can't join the FTS table.
+
+    Args:
+        user_id (int): The id of the user who owns the tickets.
+        selection (TicketSelection): The ids and/or filters picking the tickets.
+
+    Returns:
+        list: The where clauses on the ticket table.
+
+    Raises:
+        HTTPException(422): If neither ids nor a filter were provided.
+    """
+
+    filters, match = ticket_filters(
+        user_id,
+        selection.q,
+        selection.title,
+        selection.description,
+        selection.priority,
+        selection.status
+    )
+
+    # Only the user_id clause means nothing was selected, and running the
+    # statement would touch every ticket the user owns
+    if selection.ids is None and match is None and len(filters) == 1:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Provide ids or at least one filter"
+        )
+
+    if selection.ids is not None:
+        filters.append(Ticket.id.in_(selection.ids))
+
+    if match is not None:
+        filters.append(Ticket.id.in_(matching_ticket_ids(match)))
+
+    return filters
+
+
+def ticket_page_statement(
+    filters: list,
+    match: str | None,
+    sort: TicketSort | None,
+    after: str | None,
+    offset: int,
+    limit: int
+) -> tuple:
+    """Builds the paginated select for one page of tickets.
+
+    Full-text searches are ordered by relevance unless a sort is given. Only
+    the TicketPublic columns are selected, as plain rows (see app/responses.py).
+
+    Args:
+        filters (list): The where clauses from ticket_filters().
+        match (str | None): The full-text MATCH expression from ticket_filters().
+        sort (TicketSort | None): The column the tickets are ordered by.
+        after (str | None): The cursor returned with the previous page.
+        offset (int): The number of tickets to skip (legacy paging).
+        limit (int): The number of tickets in a page.
+
+    Returns:
+        tuple: The select statement and the name of the sort it uses.
+
+    Raises:
+        HTTPException(400): If the cursor is invalid or combined with offset.
+    """
+
+    if match is None:
+        stmt = select(*PUBLIC_COLUMNS).where(*filters)
+
+    elif sort is None:
+        stmt = (
+            select(*PUBLIC_COLUMNS, ticket_fts.c.rank)
+            .join(ticket_fts, ticket_fts.c.rowid == Ticket.id)
+            .where(*filters, fts_match(match))
+        )
+        return paginate(stmt, RANK_SORT, ticket_fts.c.rank, after, offset, limit), RANK_SORT
+
+    else:
+        stmt = (
+            select(*PUBLIC_COLUMNS)
+            .join(ticket_fts, ticket_fts.c.rowid == Ticket.id)
+            .where(*filters, fts_match(match))
+        )
+
+    sort = sort or TicketSort.id
+    return paginate(stmt, sort.value, SORT_COLUMNS[sort], after, offset, limit), sort.value
+
+
+def finish_ticket_page(rows: list, response: Response, sort: str, limit: int) -> list[dict]:
+    """Trims a page to its limit and sets the X-Next-Cursor header.
+
+    Args:
+        rows (list): The rows returned by the ticket_page_statement() query.
+        response (Response): The response to add the cursor header to.
+        sort (str): The sort name returned by ticket_page_statement().
+        limit (int): The number of tickets in a page.
+
+    Returns:
+        list[dict]: The tickets on the page, shaped like TicketPublic.
+    """
+
+    if sort == RANK_SORT:
+        key_of = lambda row: (row.rank, row.id)
+    else:
+        key_of = lambda row: (getattr(row, sort), row.id)
+
+    rows, next_cursor = split_page(list(rows), limit, sort, key_of)
+
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+    # ticket_dict() stops at the last TicketPublic column, which drops rank
+    return [ticket_dict(row) for row in rows]
+
+
+def owned_ticket_statement(ticket_id: int, user_id: int):
+    """Selects a ticket by id, only if it belongs to the user."""
+
+    return select(Ticket).where(
+        Ticket.id == ticket_id,
+        Ticket.user_id == user_id
+    )
+
+
+def owned_ticket_row_statement(ticket_id: int, user_id: int):
+    """Like owned_ticket_statement(), but selects a plain TicketPublic row (plus modified)."""
+
+    return select(*PUBLIC_COLUMNS, Ticket.modified).where(
+        Ticket.id == ticket_id,
+        Ticket.user_id == user_id
+    )
+
+
+def ticket_not_found(ticket_id: int) -> HTTPException:
+    """Returns the 404 raised when a ticket does not exist (or isn't the user's)."""
+
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Ticket with {ticket_id=} does not exist"
+    )
+
+
+def ticket_update_values(ticket: TicketUpdate) -> dict:
+    """Returns the fields the user provided, with their new values.
+
+    Args:
+        ticket (TicketUpdate): The incoming JSON data from the user.
+
+    Returns:
+        dict: The new value of each field to update.
+
+    Raises:
+        HTTPException(422): If no update fields were provided.
+    """
+
+    # Get a dictionary of all the fields with the new values.
+    update_data = ticket.model_dump(exclude_unset=True, exclude_none=True)
+
+    if not update_data:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="At least one field must be provided"
+        )
+
+    return update_data
+
+
+def apply_ticket_update(db_ticket: Ticket, ticket: TicketUpdate) -> None:
+    """Copies the fields the user provided onto a ticket.
+
+    Args:
+        db_ticket (Ticket): The ticket stored in the database.
+        ticket (TicketUpdate): The incoming JSON data from the user.
+
+    Raises:
+        HTTPException(422): If no update fields were provided.
+    """
+
+    # Update each field to the new value provided by the user.
+    for key, value in ticket_update_values(ticket).items():
+        setattr(db_ticket, key, value)
+
+    # A new version gives the ticket a new ETag
+    db_ticket.version += 1
+    db_ticket.modified = utc_now()
+
+
+def ticket_create_write(ticket: TicketCreate, user_id: int):
+    """Returns a write (see app/group_commit.py) that adds a new ticket.
+
+    Args:
+        ticket (TicketCreate): The incoming JSON data from the user.
+        user_id (int): The id of the ticket's owner.
+
+    Returns:
+        A function taking a Session, which adds the ticket and returns it.
+    """
+
+    def write(session) -> Ticket:
+        db_ticket = Ticket(
+            title=ticket.title,
+            description=ticket.description,
+            priority=ticket.priority,
+            user_id=user_id
+        )
+
+        session.add(db_ticket)
+        # Assigns the ticket's id
+        session.flush()
+        session.execute(bump_tickets_version_statement(user_id))
+        return db_ticket
+
+    return write
+
+
+def ticket_update_write(ticket_id: int, ticket: TicketUpdate, user_id: int, request: Request):
+    """Returns a write (see app/group_commit.py) that updates one of the user's tickets.
+
+    Args:
+        ticket_id (int): The id of the ticket to update.
+        ticket (TicketUpdate): The incoming JSON data from the user.
+        user_id (int): The id of the current user.
+        request (Request): The incoming request, for its If-Match header.
+
+    Returns:
+        A function taking a Session, which updates the ticket and returns it.
+        It raises HTTPException(404) if the user has no such ticket, and
+        HTTPException(412) if If-Match doesn't match the ticket's ETag.
+    """
+
+    def write(session) -> Ticket:
+        db_ticket = session.exec(owned_ticket_statement(ticket_id, user_id)).first()
+
+        if db_ticket is None:
+            raise ticket_not_found(ticket_id)
+
+        check_if_match(request, ticket_etag(db_ticket.id, db_ticket.version))
+        apply_ticket_update(db_ticket, ticket)
+
+        session.add(db_ticket)
+        session.flush()
+        session.execute(bump_tickets_version_statement(user_id))
+        return db_ticket
+
+    return write
+
+
+def cache_entry(body: bytes, etag: str, last_modified: datetime | None, response: Response) -> dict:
+    """Builds the read cache entry for a response that is about to be sent.
+
+    Args:
+        body (bytes): The encoded JSON body.
+        etag (str): The response's ETag.
+        last_modified (datetime | None): The response's Last-Modified time.
+        response (Response): The response, for its X-Next-Cursor header.
+
+    Returns:
+        dict: A JSON-compatible entry for the read cache.
+    """
+
+    return {
+        # Kept encoded, so a cache hit doesn't serialize anything
+        "body": body.decode(),
+        "etag": etag,
+        "last_modified": last_modified.isoformat() if last_modified else None,
+        "next_cursor": response.headers.get(NEXT_CURSOR_HEADER),
+    }
+
+
+def serve_cache_entry(entry: dict, request: Request, response: Response) -> Response:
+    """Answers a request from a read cache entry (with a 304 if the client is current).
+
+    Args:
+        entry (dict): The entry from cache_entry().
+        request (Request): The incoming request.
+        response (Response): The route's injected response.
+
+    Returns:
+        Response: The cached body, or a 304 response.
+    """
+
+    last_modified = entry["last_modified"] and datetime.fromisoformat(entry["last_modified"])
+
+    if is_not_modified(request, entry["etag"], last_modified):
+        return not_modified(entry["etag"], last_modified)
+
+    set_validators(response, entry["etag"], last_modified)
+    if entry["next_cursor"] is not None:
+        response.headers[NEXT_CURSOR_HEADER] = entry["next_cursor"]
+
+    return json_response(entry["body"], response)
@@ -0,0 +1,113 @@
+"""
+Revoked refresh tokens.
+
+Every revocation is written to the revokedtoken table (the JWT "jti" claim is
+the primary key), so it survives restarts and is seen by the other workers.
+Token ids this worker knows are revoked are also kept in memory, so a reused
+token is rejected without a query. Any other token, including one that was
+never revoked, costs a primary key lookup, since another worker may have
+revoked it.
+
+Rows and in-memory entries are dropped once the token they revoke has expired
+anyway: at startup, and whenever more than REVOKED_TOKENS_COMPACT_AT tokens
+(default: 10000) have been revoked in memory since the last clean-up.
+"""
+
+import os
+import threading
+from datetime import datetime, UTC
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, delete, select
+from app.models import RevokedToken
+
+# Revoked tokens kept in memory before expired ones are cleaned up
+COMPACT_AT = int(os.getenv("REVOKED_TOKENS_COMPACT_AT", 10000))
+
+
+class RevokedTokens:
+    """The revoked refresh tokens, in the database and cached in memory.
+
+    Args:
+        compact_at (int): In-memory entries that trigger a clean-up of the
+            expired ones (and of the expired rows).
+    """
+
+    def __init__(self, compact_at: int = COMPACT_AT):
+        self._lock = threading.Lock()
+        # jti -> expiry, so expired entries can be dropped from memory too
+        self._revoked: dict[str, datetime] = {}
+        self.compact_at = max(1, compact_at)
+        self._next_compact = self.compact_at
+
+    def load(self, session: Session) -> None:
+        """Drops expired revocations and loads the rest into memory."""
+
+        self.compact(session)
+
+        with self._lock:
+            self._revoked = {
+                row.jti: row.expires for row in session.exec(select(RevokedToken)).all()
+            }
+
+    def is_revoked(self, jti: str, session: Session) -> bool:
+        """Returns True if the token id was revoked (by this or another worker)."""
+
+        with self._lock:
+            if jti in self._revoked:
+                return True
+
+        row = session.get(RevokedToken, jti)
+        if row is None:
+            return False
+
+        with self._lock:
+            self._revoked[jti] = row.expires
+        return True
+
+    def revoke(self, jti: str, expires: datetime, session: Session) -> bool:
+        """Revokes a token id and commits.
+
+        The primary key makes this atomic, so when two requests race to use
+        the same refresh token only one of them gets True.
+
+        Returns:
+            bool: False if the token id was already revoked.
+        """
+
+        session.add(RevokedToken(jti=jti, expires=expires))
+
+        try:
+            session.commit()
+            newly_revoked = True
+        except IntegrityError:
+            session.rollback()
+            newly_revoked = False
+
+        with self._lock:
+            self._revoked[jti] = expires
+            # Every refresh revokes a token, so without this the dict would
+            # grow for as long as the worker runs
+            needs_compact = len(self._revoked) > self._next_compact
+
+        if needs_compact:
+            self.compact(session)
+
+        return newly_revoked
+
+    def compact(self, session: Session) -> None:
+        """Deletes revocations for tokens that have expired anyway."""
+
+        now = datetime.now(UTC).replace(tzinfo=None)
+        session.exec(delete(RevokedToken).where(RevokedToken.expires < now))
+        session.commit()
+
+        with self._lock:
+            self._revoked = {
+                jti: expires for jti, expires in self._revoked.items() if expires >= now
+            }
+            # If most tokens are still valid, wait for as many new ones again
+            # instead of cleaning up on every revoke
+            self._next_compact = max(self.compact_at, 2 * len(self._revoked))
+
+
+revoked_tokens = RevokedTokens()
@@ -0,0 +1,149 @@
+"""
+Admin router.
+
+Operational endpoints for the people running the service. Only users listed
+in the ADMIN_USERNAMES environment variable can use them.
+"""
+
+from typing import Literal
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from starlette import status
+from app.cache import read_cache
+from app.hashing import password_hasher
+from app.profiling import folded_stacks, profile_store, summary
+from app.slow_queries import slow_query_log
+from app.routes.auth import AdminDep, token_cache
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"]
+)
+
+
+@router.get(
+    "/stats",
+    status_code=status.HTTP_200_OK
+)
+def read_stats(admin: AdminDep) -> dict:
+    """Return runtime statistics for the service.
+
+    Returns:
+        dict: Statistics grouped by subsystem.
+
+    Raises:
+        HTTPException(403): If the user is not an admin.
+    """
+
+    return {
+        "password_hashing": password_hasher.stats(),
+        "token_cache": token_cache.stats(),
+        "read_cache": read_cache.stats(),
+    }
+
+
+@router.get(
+    "/slow-queries",
+    status_code=status.HTTP_200_OK
+)
+def read_slow_queries(
+    admin: AdminDep,
+    limit: int = Query(default=20, ge=1, le=100),
+    sort: Literal["total_ms", "max_ms", "mean_ms", "count"] = "total_ms"
+) -> dict:
+    """Return the slowest query shapes recorded by the slow-query log.
+
+    Args:
+        limit (int): How many query shapes to return.
+        sort (str): What "slowest" means: total, max or mean time, or count.
+
+    Returns:
+        dict: The threshold and the query shapes, worst first.
+
+    Raises:
+        HTTPException(403): If the user is not an admin.
+        HTTPException(404): If the slow-query log is off.
+    """
+
+    if slow_query_log is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Slow-query log is off, set SLOW_QUERY_MS to turn it on"
+        )
+
+    return {
+        "threshold_ms": slow_query_log.threshold * 1000,
+        "queries": slow_query_log.top(limit, sort),
+    }
+
+
+def get_profile(profile_id: str) -> dict:
+    profile = profile_store.get(profile_id)
+
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+
+    return profile
+
+
+@router.get(
+    "/profiles",
+    status_code=status.HTTP_200_OK
+)
+def read_profiles(admin: AdminDep) -> list[dict]:
+    """Return the recently profiled requests, newest first.
+
+    A request is profiled when an admin sends it with the header `X-Profile: 1`
+    (see app/profiling.py).
+
+    Returns:
+        list[dict]: Each profile's request, duration and time breakdown.
+
+    Raises:
+        HTTPException(403): If the user is not an admin.
+    """
+
+    return [summary(profile) for profile in profile_store.recent()]
+
+
+@router.get(
+    "/profiles/{profile_id}",
+    status_code=status.HTTP_200_OK
+)
+def read_profile(admin: AdminDep, profile_id: str) -> dict:
+    """Return one profile, with its call tree.
+
+    Raises:
+        HTTPException(403): If the user is not an admin.
+        HTTPException(404): If the profile doesn't exist (or was dropped).
+    """
+
+    profile = get_profile(profile_id)
+    return {**summary(profile), "tree": profile["tree"]}
+
+
+@router.get(
+    "/profiles/{profile_id}/download",
+    status_code=status.HTTP_200_OK,
+    response_class=PlainTextResponse
+)
+def download_profile(admin: AdminDep, profile_id: str) -> PlainTextResponse:
+    """Download one profile as folded stacks.
+
+    The file opens in https://www.speedscope.app, or turns into a flame graph
+    with flamegraph.pl.
+
+    Raises:
+        HTTPException(403): If the user is not an admin.
+        HTTPException(404): If the profile doesn't exist (or was dropped).
+    """
+
+    profile = get_profile(profile_id)
+
+    return PlainTextResponse(
+        folded_stacks(profile),
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'}
+    )
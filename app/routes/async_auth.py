@@ -0,0 +1,94 @@
+"""
+Async authentication router (DB_ASYNC=1).
+
+Same routes and behavior as app/routes/auth.py, but the handlers are
+coroutines that use an AsyncSession. Token validation (get_current_user)
+is shared with the sync router, since it never touches the database.
+"""
+
+from fastapi import APIRouter, HTTPException
+from starlette import status
+from sqlmodel import select
+from app.db import AsyncSessionDep
+from app.models import User, UserCreate, UserPublic, Token
+from app.hashing import password_hasher
+from app.routes.auth import issue_tokens
+
+router = APIRouter(
+    prefix="/auth",
+    tags=["auth"]
+)
+
+
+@router.post(
+    "/",
+    response_model=UserPublic,
+    status_code=status.HTTP_201_CREATED
+)
+async def create_user(
+    user: UserCreate,
+    session: AsyncSessionDep
+) -> UserPublic:
+    """Async version of auth.create_user()."""
+
+    existing = (await session.exec(select(User).where(User.username == user.username))).first()
+
+    # Usernames must be unique, so if the username is being used, raise an exception
+    if existing:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Username already exists"
+        )
+
+    # Hashing is CPU bound, so it runs in the password pool off the event loop
+    create_user_model = User(
+        username=user.username,
+        hashed_password=await password_hasher.hash_async(user.password),
+    )
+
+    session.add(create_user_model)
+    await session.commit()
+    await session.refresh(create_user_model)
+
+    return create_user_model
+
+
+@router.post(
+    "/token",
+    response_model=Token,
+    status_code=status.HTTP_200_OK
+)
+async def login_for_access_token(
+    user: UserCreate,
+    session: AsyncSessionDep,
+):
+    """Async version of auth.login_for_access_token()."""
+
+    log_user = await authenticate_user(user.username, user.password, session)
+
+    if not log_user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password",
+        )
+
+    return issue_tokens(log_user.username, log_user.id)
+
+
+async def authenticate_user(
+    username: str,
+    password: str,
+    session: AsyncSessionDep
+) -> User | None:
+    """Async version of auth.authenticate_user()."""
+
+    statement = select(User).where(User.username == username)
+    user = (await session.exec(statement)).first()
+
+    if not user:
+        return None
+
+    if not await password_hasher.verify_async(password, user.hashed_password):
+        return None
+
+    return user
@@ -0,0 +1,260 @@
+"""
+Async ticket router (DB_ASYNC=1).
+
+Same routes and behavior as app/routes/tickets.py, but the handlers are
+coroutines that use an AsyncSession, so a request waiting on SQLite does
+not hold one of Starlette's threadpool slots.
+
+The ticket id routes use the {ticket_id:int} convertor. Anything else
+(e.g. /api/tickets/abc or newer sync-only routes) doesn't match here and
+falls through to the sync router, which is included after this one.
+"""
+
+from fastapi import Query, Path, APIRouter, Request, Response
+from typing import Annotated
+from starlette import status
+from app.models import *
+from app.db import AsyncReadSessionDep, AsyncSessionDep
+from app.cache import read_cache
+from app.responses import encode_json, json_response, ticket_dict
+from app.conditional import (
+    bump_tickets_version_statement,
+    check_if_match,
+    collection_validators,
+    is_conditional,
+    is_not_modified,
+    not_modified,
+    set_validators,
+    ticket_etag,
+    ticket_version_statement,
+    tickets_version_statement,
+)
+from app.group_commit import run_write_async
+from app.queries import (
+    cache_entry,
+    finish_ticket_page,
+    owned_ticket_row_statement,
+    owned_ticket_statement,
+    serve_cache_entry,
+    ticket_filters,
+    ticket_not_found,
+    ticket_create_write,
+    ticket_page_statement,
+    ticket_update_write,
+)
+from app.routes.auth import UserDep
+
+# Authentication is required via dependency injection
+tickets_router = APIRouter(
+    prefix="/api/tickets",
+    tags=["tickets"]
+)
+
+
+@tickets_router.get(
+    "/",
+    response_model=list[TicketPublic],
+    status_code=status.HTTP_200_OK
+)
+async def read_tickets(
+    session: AsyncReadSessionDep,
+    current_user: UserDep,
+    request: Request,
+    response: Response,
+    offset: int = 0,
+    limit: Annotated[int, Query(ge=1, le=100)] = 100,
+    sort: TicketSort = TicketSort.id,
+    after: str | None = None,
+) -> list[TicketPublic]:
+    """Async version of tickets.read_tickets()."""
+
+    key = read_cache.key(
+        current_user["id"], "list", sort=sort, after=after, offset=offset, limit=limit
+    )
+    entry = read_cache.get(key)
+    if entry is not None:
+        return serve_cache_entry(entry, request, response)
+
+    etag, last_modified = collection_validators(
+        (await session.exec(tickets_version_statement(current_user["id"]))).first(),
+        current_user["id"]
+    )
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    set_validators(response, etag, last_modified)
+
+    stmt, sort_name = ticket_page_statement(
+        [Ticket.user_id == current_user["id"]], None, sort, after, offset, limit
+    )
+    rows = (await session.exec(stmt)).all()
+    body = encode_json(finish_ticket_page(rows, response, sort_name, limit))
+
+    if key is not None:
+        read_cache.set(key, cache_entry(body, etag, last_modified, response))
+    return json_response(body, response)
+
+
+@tickets_router.get(
+    "/search",
+    response_model=list[TicketPublic],
+    status_code=status.HTTP_200_OK
+)
+async def query_ticket_by_parameters(
+    session: AsyncReadSessionDep,
+    current_user: UserDep,
+    request: Request,
+    response: Response,
+    q: str | None = None,
+    title: str | None = None,
+    description: str | None = None,
+    priority: int | None = Query(default=None, ge=1, le=5),
+    status: TicketStatus | None = None,
+    offset: int = 0,
+    limit: int = Query(default=100, ge=1, le=100),
+    sort: TicketSort | None = None,
+    after: str | None = None,
+) -> list[TicketPublic]:
+    """Async version of tickets.query_ticket_by_parameters()."""
+
+    key = read_cache.key(
+        current_user["id"], "search",
+        q=q, title=title, description=description, priority=priority, status=status,
+        sort=sort, after=after, offset=offset, limit=limit
+    )
+    entry = read_cache.get(key)
+    if entry is not None:
+        return serve_cache_entry(entry, request, response)
+
+    etag, last_modified = collection_validators(
+        (await session.exec(tickets_version_statement(current_user["id"]))).first(),
+        current_user["id"]
+    )
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    set_validators(response, etag, last_modified)
+
+    filters, match = ticket_filters(current_user["id"], q, title, description, priority, status)
+    stmt, sort_name = ticket_page_statement(filters, match, sort, after, offset, limit)
+    rows = (await session.exec(stmt)).all()
+    body = encode_json(finish_ticket_page(rows, response, sort_name, limit))
+
+    if key is not None:
+        read_cache.set(key, cache_entry(body, etag, last_modified, response))
+    return json_response(body, response)
+
+
+@tickets_router.get(
+    "/{ticket_id:int}",
+    response_model=TicketPublic,
+    status_code=status.HTTP_200_OK
+)
+async def query_ticket_by_id(
+    session: AsyncReadSessionDep,
+    current_user: UserDep,
+    request: Request,
+    response: Response,
+    ticket_id: int = Path(ge=1)
+) -> TicketPublic:
+    """Async version of tickets.query_ticket_by_id()."""
+
+    key = read_cache.key(current_user["id"], "ticket", ticket_id=ticket_id)
+    entry = read_cache.get(key)
+    if entry is not None:
+        return serve_cache_entry(entry, request, response)
+
+    if is_conditional(request):
+        row = (await session.exec(ticket_version_statement(ticket_id, current_user["id"]))).first()
+
+        if row is None:
+            raise ticket_not_found(ticket_id)
+
+        etag = ticket_etag(ticket_id, row.version)
+        if is_not_modified(request, etag, row.modified):
+            return not_modified(etag, row.modified)
+
+    row = (await session.exec(
+        owned_ticket_row_statement(ticket_id, current_user["id"])
+    )).first()
+
+    if row is None:
+        raise ticket_not_found(ticket_id)
+
+    etag = ticket_etag(row.id, row.version)
+    set_validators(response, etag, row.modified)
+    body = encode_json(ticket_dict(row))
+
+    if key is not None:
+        read_cache.set(key, cache_entry(body, etag, row.modified, response))
+    return json_response(body, response)
+
+
+@tickets_router.post(
+    "/",
+    response_model=TicketPublic,
+    status_code=status.HTTP_201_CREATED
+)
+async def add_ticket(
+    session: AsyncSessionDep,
+    current_user: UserDep,
+    response: Response,
+    ticket: TicketCreate
+) -> TicketPublic:
+    """Async version of tickets.add_ticket()."""
+
+    db_ticket = await run_write_async(session, ticket_create_write(ticket, current_user["id"]))
+    read_cache.invalidate(current_user["id"])
+    set_validators(response, ticket_etag(db_ticket.id, db_ticket.version), db_ticket.modified)
+    return db_ticket
+
+
+@tickets_router.patch(
+    "/{ticket_id:int}",
+    response_model=TicketPublic,
+    status_code=status.HTTP_200_OK
+)
+async def update_ticket(
+    ticket: TicketUpdate,
+    session: AsyncSessionDep,
+    current_user: UserDep,
+    request: Request,
+    response: Response,
+    ticket_id: int = Path(ge=1)
+) -> TicketPublic:
+    """Async version of tickets.update_ticket()."""
+
+    db_ticket = await run_write_async(
+        session, ticket_update_write(ticket_id, ticket, current_user["id"], request)
+    )
+    read_cache.invalidate(current_user["id"])
+    set_validators(response, ticket_etag(db_ticket.id, db_ticket.version), db_ticket.modified)
+    return db_ticket
+
+
+@tickets_router.delete(
+    "/{ticket_id:int}",
+    response_model=TicketPublic,
+    status_code=status.HTTP_200_OK
+)
+async def delete_ticket(
+    session: AsyncSessionDep,
+    current_user: UserDep,
+    request: Request,
+    ticket_id: int = Path(ge=1)
+) -> TicketPublic:
+    """Async version of tickets.delete_ticket()."""
+
+    db_ticket = (await session.exec(
+        owned_ticket_statement(ticket_id, current_user["id"])
+    )).first()
+
+    if db_ticket is None:
+        raise ticket_not_found(ticket_id)
+
+    check_if_match(request, ticket_etag(db_ticket.id, db_ticket.version))
+    await session.delete(db_ticket)
+    await session.exec(bump_tickets_version_statement(current_user["id"]))
+    await session.commit()
+    read_cache.invalidate(current_user["id"])
+    return db_ticket
@@ -4,6 +4,7 @@ Authentication router.
 Provides:
 - User registration
 - Login and JWT generation
+- Refresh tokens, so clients renew access tokens without a password
 - Token validation dependency
 
 Uses OAuth2PasswordBearer with JWT-based authentication.
@@ -12,14 +13,20 @@ Uses OAuth2PasswordBearer with JWT-based authentication.
 from datetime import timedelta, datetime, UTC
 from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from starlette import status
 from app.db import SessionDep
-from app.models import User, UserCreate, UserPublic, Token
-from passlib.context import CryptContext
+from app.models import User, UserCreate, UserPublic, Token, RefreshTokenRequest
+from app.hashing import password_hasher
+from app.revocation import revoked_tokens
+from app.lru import TTLCache
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from sqlmodel import select
+import hashlib
 import os
+import time
+import uuid
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -29,13 +36,28 @@ if not SECRET_KEY:
     raise RuntimeError("SECRET_KEY is not set")
 ALGORITHM = "HS256"
 
+# Access tokens are short lived. Refresh tokens last much longer and are used
+# to get new access tokens from /auth/refresh, which needs no password (and
+# so no expensive bcrypt check).
+ACCESS_TOKEN_EXPIRES = timedelta(minutes=20)
+REFRESH_TOKEN_EXPIRES = timedelta(days=int(os.getenv("REFRESH_TOKEN_DAYS", 7)))
+
 router = APIRouter(
     prefix="/auth",
     tags=["auth"]
 )
 
-# Use this to hash the user's password
-bcrypt_context = CryptContext(schemes=["bcrypt"])
+# Usernames allowed to use the /admin routes (comma separated)
+ADMIN_USERNAMES = {
+    name.strip() for name in os.getenv("ADMIN_USERNAMES", "").split(",") if name.strip()
+}
+
+# Verified access tokens -> user info (see decode_access_token)
+token_cache = TTLCache(
+    maxsize=int(os.getenv("TOKEN_CACHE_SIZE", 10000)),
+    ttl=float(os.getenv("TOKEN_CACHE_TTL", 300)),
+)
+
 # When a route needs authentication, look for a Bearer token in the request header
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl="auth/token", auto_error=False)
 
@@ -46,7 +68,7 @@ oauth2_bearer = OAuth2PasswordBearer(tokenUrl="auth/token", auto_error=False)
     response_model=UserPublic,
     status_code=status.HTTP_201_CREATED
 )
-def create_user(
+async def create_user(
     user: UserCreate,
     session: SessionDep
 ) -> UserPublic:
@@ -64,9 +86,13 @@ def create_user(
 
     Raises:
         HTTPException(409): If the username already exists.
+        HTTPException(503): If the password hashing pool is saturated.
     """
-        
-    existing = session.exec(select(User).where(User.username == user.username)).first()
+
+    # The handler is a coroutine so it can wait for the password pool without
+    # holding a threadpool thread; the (blocking) database work still runs in
+    # the threadpool.
+    existing = await run_in_threadpool(find_user, user.username, session)
 
     # Usernames must be unique, so if the username is being used, raise an exception
     if existing:
@@ -77,12 +103,11 @@ def create_user(
     
     create_user_model = User(
         username=user.username,
-        hashed_password=bcrypt_context.hash(user.password),
+        # Hashed in the password pool, see app/hashing.py
+        hashed_password=await password_hasher.hash_async(user.password),
     )
 
-    session.add(create_user_model)
-    session.commit()
-    session.refresh(create_user_model)
+    await run_in_threadpool(save_user, create_user_model, session)
 
     return create_user_model
 
@@ -92,7 +117,7 @@ def create_user(
     response_model=Token,
     status_code=status.HTTP_200_OK
 )
-def login_for_access_token(
+async def login_for_access_token(
     user: UserCreate,
     session: SessionDep,
 ):
@@ -111,9 +136,10 @@ def login_for_access_token(
 
     Raises:
         HTTPException(401): If the username or password is incorrect.
+        HTTPException(503): If the password hashing pool is saturated.
     """
 
-    log_user = authenticate_user(user.username, user.password, session)
+    log_user = await authenticate_user(user.username, user.password, session)
 
     if not log_user:
         raise HTTPException(
@@ -121,15 +147,100 @@ def login_for_access_token(
             detail="Incorrect username or password",
         )
     
-    token = create_access_token(log_user.username, log_user.id, timedelta(minutes=20))
+    return issue_tokens(log_user.username, log_user.id)
 
-    return {
-        "access_token": token,
-        "token_type": "bearer"
-    }
 
+@router.post(
+    "/refresh",
+    response_model=Token,
+    status_code=status.HTTP_200_OK
+)
+def refresh_access_token(
+    body: RefreshTokenRequest,
+    session: SessionDep,
+):
+    """Get a new access token using a refresh token.
+
+    Refresh tokens can only be used once: the one sent is revoked and a
+    new refresh token is returned along with the new access token.
+
+    Args:
+        body (RefreshTokenRequest): The refresh token returned at login (or by the last refresh).
+        session (SessionDep): Database session injected by FastAPI.
+
+    Returns:
+        Token: A new access token and refresh token.
+
+    Raises:
+        HTTPException(401): If the refresh token is invalid, expired, or was revoked.
+    """
+
+    payload = decode_refresh_token(body.refresh_token)
+    expires = datetime.fromtimestamp(payload["exp"], UTC).replace(tzinfo=None)
+
+    if (
+        revoked_tokens.is_revoked(payload["jti"], session)
+        or not revoked_tokens.revoke(payload["jti"], expires, session)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token has been revoked"
+        )
+
+    return issue_tokens(payload["sub"], payload["id"])
+
+
+@router.post(
+    "/logout",
+    status_code=status.HTTP_204_NO_CONTENT
+)
+def logout(
+    body: RefreshTokenRequest,
+    session: SessionDep,
+) -> None:
+    """Log out by revoking a refresh token.
+
+    Args:
+        body (RefreshTokenRequest): The refresh token to revoke.
+        session (SessionDep): Database session injected by FastAPI.
+
+    Raises:
+        None
+    """
+
+    try:
+        payload = decode_refresh_token(body.refresh_token)
+    # An invalid or expired token can't be used anyway
+    except HTTPException:
+        return None
+
+    expires = datetime.fromtimestamp(payload["exp"], UTC).replace(tzinfo=None)
+    revoked_tokens.revoke(payload["jti"], expires, session)
+
+
+def find_user(username: str, session: SessionDep) -> User | None:
+    """Looks up a user by username.
+
+    Args:
+        username (str): The username to look for.
+        session (SessionDep): Database session injected by FastAPI.
+
+    Returns:
+        User | None: The user, or None if there is no such user.
+    """
+
+    return session.exec(select(User).where(User.username == username)).first()
 
-def authenticate_user(
+
+def save_user(user: User, session: SessionDep) -> None:
+    """Commits a new user and loads its generated id."""
+
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+
+
+async def authenticate_user(
     username: str,
     password: str,
     session: SessionDep
@@ -148,16 +259,15 @@ def authenticate_user(
         User | None: The authenticated user object, or None if authentication fails.
 
     Raises:
-        None
+        HTTPException(503): If the password hashing pool is saturated.
     """
 
-    statement = select(User).where(User.username == username)
-    user = session.exec(statement).first()
+    user = await run_in_threadpool(find_user, username, session)
 
     if not user:
         return None
 
-    if not bcrypt_context.verify(password, user.hashed_password):
+    if not await password_hasher.verify_async(password, user.hashed_password):
         return None
 
     return user
@@ -184,41 +294,111 @@ def create_access_token(
     Raises:
         None
     """
-    encode = {"sub": username, "id": user_id}
+    encode = {"sub": username, "id": user_id, "type": "access"}
     expires = datetime.now(UTC) + expires_delta
     encode.update({"exp": expires})
     
     return jwt.encode(encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-# FastAPI runs oauth2_bearer (a dependency) to extract the Bearer token
-# from the Authorization header, then passes the token string into this function.
-async def get_current_user(
-    token: Annotated[str | None, Depends(oauth2_bearer)]
-) -> dict:
-    """Returns the user currently logged in.
+def create_refresh_token(
+    username: str,
+    user_id: int,
+    expires_delta: timedelta = REFRESH_TOKEN_EXPIRES
+) -> str:
+    """Creates a refresh token.
 
-    The token for the current user is decoded, and the user's info is stored, then returned.
+    Like an access token, but with a unique id ("jti") so it can be revoked,
+    and a "type" claim so it can't be used as an access token.
 
     Args:
-        token: The JWT for the user currently logged in.
+        username (str): The username of the logged in user
+        user_id (int): The id of the logged in user.
+        expires_delta (timedelta): How long the token should last.
 
     Returns:
-        A dictionary containing the user's info
+        A JWT
 
     Raises:
-        HTTPException(401): if no one is logged in (there is no JWT).
-        HTTPException(401): if the token did not contain the required user information.
-        JWTError: if jwt.decode() fails
+        None
     """
+    encode = {
+        "sub": username,
+        "id": user_id,
+        "type": "refresh",
+        "jti": uuid.uuid4().hex,
+        "exp": datetime.now(UTC) + expires_delta,
+    }
 
-    # If there is no token, then no one is signed in
-    if token is None:
+    return jwt.encode(encode, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def issue_tokens(username: str, user_id: int) -> dict:
+    """Returns the Token response with a new access token and refresh token."""
+
+    return {
+        "access_token": create_access_token(username, user_id, ACCESS_TOKEN_EXPIRES),
+        "token_type": "bearer",
+        "refresh_token": create_refresh_token(username, user_id),
+    }
+
+
+def decode_refresh_token(token: str) -> dict:
+    """Validates a refresh token and returns its claims.
+
+    Args:
+        token (str): The refresh token.
+
+    Returns:
+        dict: The token's claims.
+
+    Raises:
+        HTTPException(401): If the token is invalid, expired, or not a refresh token.
+    """
+
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        payload = {}
+
+    if (
+        payload.get("type") != "refresh"
+        or payload.get("jti") is None
+        or payload.get("sub") is None
+        or payload.get("id") is None
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="You must be logged in"
+            detail="Invalid refresh token"
         )
-    
+
+    return payload
+
+
+def decode_access_token(token: str) -> dict:
+    """Validates an access token and returns the user it belongs to.
+
+    Verified tokens are cached (keyed by a digest of the token) until they
+    expire, so a client sending the same token many times a minute only pays
+    for jwt.decode() once.
+
+    Args:
+        token (str): The JWT for the user currently logged in.
+
+    Returns:
+        A dictionary containing the user's info
+
+    Raises:
+        HTTPException(401): if the token did not contain the required user information.
+        HTTPException(401): if jwt.decode() fails
+    """
+
+    digest = hashlib.sha256(token.encode()).digest()
+    cached = token_cache.get(digest)
+    if cached is not None:
+        # Copy so a route changing its user dict can't change the cached one
+        return dict(cached)
+
     try:
         # jwt.decode() ensures that the token is valid
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -231,9 +411,14 @@ async def get_current_user(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Username or id is not present"
             )
-        
-        return {"username": username, "id": user_id}
-    
+
+        # Refresh tokens can only be exchanged at /auth/refresh
+        if payload.get("type") == "refresh":
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid token"
+            )
+
     # This runs if jwt.decode() fails -> occurs when the token
     # is expired OR its signature/payload has been modified (invalid)
     except JWTError:
@@ -242,7 +427,71 @@ async def get_current_user(
             detail="Invalid token"
         )
 
+    user = {"username": username, "id": user_id}
+
+    # Never keep a token in the cache past its own expiry
+    if "exp" in payload:
+        token_cache.set(digest, user, ttl=payload["exp"] - time.time())
+
+    return dict(user)
+
+
+# FastAPI runs oauth2_bearer (a dependency) to extract the Bearer token
+# from the Authorization header, then passes the token string into this function.
+async def get_current_user(
+    token: Annotated[str | None, Depends(oauth2_bearer)]
+) -> dict:
+    """Returns the user currently logged in.
+
+    The token for the current user is decoded, and the user's info is stored, then returned.
+
+    Args:
+        token: The JWT for the user currently logged in.
+
+    Returns:
+        A dictionary containing the user's info
+
+    Raises:
+        HTTPException(401): if no one is logged in (there is no JWT).
+        HTTPException(401): if the token is invalid (see decode_access_token()).
+    """
+
+    # If there is no token, then no one is signed in
+    if token is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="You must be logged in"
+        )
+
+    return decode_access_token(token)
+
 
 # UserDep is a dependency alias that tells FastAPI to run get_current_user()
 # and inject the returned user dictionary into route parameters.
-UserDep = Annotated[dict, Depends(get_current_user)]
\ No newline at end of file
+UserDep = Annotated[dict, Depends(get_current_user)]
+
+
+async def get_current_admin(current_user: UserDep) -> dict:
+    """Returns the user currently logged in, if they are an admin.
+
+    Args:
+        current_user: The user returned by get_current_user().
+
+    Returns:
+        A dictionary containing the user's info
+
+    Raises:
+        HTTPException(403): if the user is not listed in ADMIN_USERNAMES.
+    """
+
+    if current_user["username"] not in ADMIN_USERNAMES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+
+    return current_user
+
+
+# AdminDep works like UserDep, but only lets admins through.
+AdminDep = Annotated[dict, Depends(get_current_admin)]
\ No newline at end of file
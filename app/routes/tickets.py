@@ -1,9 +1,42 @@
-from fastapi import Query, HTTPException, Path, APIRouter, Depends
-from sqlmodel import select
+from fastapi import Query, HTTPException, Path, APIRouter, Depends, Request, Response, Body, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlmodel import insert, update, delete
+from datetime import date
 from typing import Annotated
 from starlette import status
 from app.models import *
-from app.db import SessionDep
+from app.db import ReadSessionDep, SessionDep
+from app.cache import read_cache
+from app.responses import encode_json, json_response, ticket_dict
+from app.conditional import (
+    bump_tickets_version_statement,
+    check_if_match,
+    collection_validators,
+    is_conditional,
+    is_not_modified,
+    not_modified,
+    set_validators,
+    ticket_etag,
+    ticket_version_statement,
+    tickets_version_statement,
+)
+from app.export import MEDIA_TYPES, ExportFormat, export_body, iter_ticket_chunks
+from app.group_commit import run_write
+from app.importer import IMPORT_CHUNK_SIZE, ImportFileError, detect_format, import_tickets, open_text
+from app.queries import (
+    cache_entry,
+    finish_ticket_page,
+    owned_ticket_row_statement,
+    owned_ticket_statement,
+    serve_cache_entry,
+    selection_filters,
+    ticket_create_write,
+    ticket_filters,
+    ticket_not_found,
+    ticket_page_statement,
+    ticket_update_values,
+    ticket_update_write,
+)
 from app.routes.auth import get_current_user, UserDep
 
 # Authentication is required via dependency injection
@@ -18,27 +51,60 @@ tickets_router = APIRouter(
     status_code=status.HTTP_200_OK
 )
 def read_tickets(
-    session: SessionDep,
+    session: ReadSessionDep,
     current_user: UserDep,
+    request: Request,
+    response: Response,
     offset: int = 0,
-    limit: Annotated[int, Query(le=100)] = 100,
+    limit: Annotated[int, Query(ge=1, le=100)] = 100,
+    sort: TicketSort = TicketSort.id,
+    after: str | None = None,
 ) -> list[TicketPublic]:
     """Return a list of tickets owned by the current user.
 
+    When there are more tickets, the cursor for the next page is returned
+    in the X-Next-Cursor header. Pass it back as `after` to get that page.
+
+    The ETag changes whenever any of the user's tickets change. Send it back
+    in If-None-Match to get a 304 (and no body) if nothing has changed.
+    Pages are kept in the read cache (app/cache.py) until then.
+
     Args:
-        offset (int): Allows you to skip the first 'n' tickets.
+        offset (int): Allows you to skip the first 'n' tickets (prefer `after`).
         limit (int): Allows you to limit how many tickets are returned.
-        session (SessionDep): Database session injected by FastAPI.
+        sort (TicketSort): The column the tickets are ordered by.
+        after (str | None): The cursor returned with the previous page.
+        session (ReadSessionDep): Read-only database session injected by FastAPI.
 
     Returns:
         list[Ticket]: Returns up to 100 tickets owned by the user, or the limit via query parameters.
 
     Raises:
-        None
+        HTTPException(400): If the cursor is invalid or combined with offset.
     """
-    
-    tickets = session.exec(select(Ticket).where(Ticket.user_id == current_user["id"]).offset(offset).limit(limit)).all()
-    return tickets
+
+    key = read_cache.key(
+        current_user["id"], "list", sort=sort, after=after, offset=offset, limit=limit
+    )
+    entry = read_cache.get(key)
+    if entry is not None:
+        return serve_cache_entry(entry, request, response)
+
+    etag, last_modified = collection_validators(
+        session.exec(tickets_version_statement(current_user["id"])).first(), current_user["id"]
+    )
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    set_validators(response, etag, last_modified)
+    stmt, sort_name = ticket_page_statement(
+        [Ticket.user_id == current_user["id"]], None, sort, after, offset, limit
+    )
+    body = encode_json(finish_ticket_page(session.exec(stmt).all(), response, sort_name, limit))
+
+    if key is not None:
+        read_cache.set(key, cache_entry(body, etag, last_modified, response))
+    return json_response(body, response)
 
 
 
@@ -48,57 +114,312 @@ def read_tickets(
     status_code=status.HTTP_200_OK
 )
 def query_ticket_by_parameters(
-    session: SessionDep,
+    session: ReadSessionDep,
     current_user: UserDep,
+    request: Request,
+    response: Response,
+    q: str | None = None,
     title: str | None = None,
     description: str | None = None,
     priority: int | None = Query(default=None, ge=1, le=5),
     status: TicketStatus | None = None,
     offset: int = 0,
-    limit: int = Query(default=100, le=100),
+    limit: int = Query(default=100, ge=1, le=100),
+    sort: TicketSort | None = None,
+    after: str | None = None,
 ) -> list[TicketPublic]:
     """Search for a Ticket via query parameters.
 
     Search for a Ticket by using its title, description, priority, or status.
     You can also combine any number of these query parameters.
 
+    Text is matched through the full-text index: every word must appear,
+    and words match as prefixes ("comp" finds "computer"). Text searches
+    are ordered by relevance unless a sort is given.
+
+    Supports If-None-Match the same way as read_tickets().
+
     Args:
-        title (str | None): The ticket's title.
-        description (str | None): The ticket's description.
+        q (str | None): Words in the ticket's title or description.
+        title (str | None): Words in the ticket's title.
+        description (str | None): Words in the ticket's description.
         priority (int | None): The ticket's priority.
         status (TicketStatus | None): The ticket's status.
-        offset (int): Allows you to skip the first 'n' tickets.
+        offset (int): Allows you to skip the first 'n' tickets (prefer `after`).
         limit (int): Allows you to limit how many tickets are returned.
-        session (SessionDep): Database session injected by FastAPI.
+        sort (TicketSort | None): The column the tickets are ordered by.
+        after (str | None): The cursor returned with the previous page (see X-Next-Cursor).
+        session (ReadSessionDep): Read-only database session injected by FastAPI.
 
     Returns:
         list[TicketPublic]: A list of tickets owned by the user, that meet all the query parameters.
 
+    Raises:
+        HTTPException(400): If the cursor is invalid or combined with offset.
+    """
+
+    key = read_cache.key(
+        current_user["id"], "search",
+        q=q, title=title, description=description, priority=priority, status=status,
+        sort=sort, after=after, offset=offset, limit=limit
+    )
+    entry = read_cache.get(key)
+    if entry is not None:
+        return serve_cache_entry(entry, request, response)
+
+    etag, last_modified = collection_validators(
+        session.exec(tickets_version_statement(current_user["id"])).first(), current_user["id"]
+    )
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    set_validators(response, etag, last_modified)
+    filters, match = ticket_filters(current_user["id"], q, title, description, priority, status)
+    stmt, sort_name = ticket_page_statement(filters, match, sort, after, offset, limit)
+    body = encode_json(finish_ticket_page(session.exec(stmt).all(), response, sort_name, limit))
+
+    if key is not None:
+        read_cache.set(key, cache_entry(body, etag, last_modified, response))
+    return json_response(body, response)
+
+
+
+@tickets_router.get(
+    "/export",
+    response_class=StreamingResponse,
+    status_code=status.HTTP_200_OK
+)
+def export_tickets(
+    session: ReadSessionDep,
+    current_user: UserDep,
+    export_format: ExportFormat = Query(default=ExportFormat.ndjson, alias="format"),
+    q: str | None = None,
+    title: str | None = None,
+    description: str | None = None,
+    priority: int | None = Query(default=None, ge=1, le=5),
+    status: TicketStatus | None = None,
+) -> StreamingResponse:
+    """Stream every ticket owned by the current user as NDJSON or CSV.
+
+    Takes the same filters as /api/tickets/search, with no page size limit.
+    The tickets are read in chunks ordered by id while the response is being
+    sent, so memory use stays flat however many tickets there are.
+
+    Args:
+        export_format (ExportFormat): "ndjson" (one JSON ticket per line) or "csv".
+        q (str | None): Words in the ticket's title or description.
+        title (str | None): Words in the ticket's title.
+        description (str | None): Words in the ticket's description.
+        priority (int | None): The ticket's priority.
+        status (TicketStatus | None): The ticket's status.
+        session (ReadSessionDep): Read-only database session injected by FastAPI.
+
+    Returns:
+        StreamingResponse: The tickets, ordered by id.
+
     Raises:
         None
     """
-    
-    stmt = select(Ticket)
 
-    if title is not None:
-        stmt = stmt.where(Ticket.title.ilike(f"%{title}%"))
+    filters, match = ticket_filters(current_user["id"], q, title, description, priority, status)
+
+    # The session stays open until the response has been sent, so the
+    # generator can keep reading from it while streaming
+    body = export_body(export_format, iter_ticket_chunks(session, filters, match))
+
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="tickets.{export_format.value}"'}
+    )
+
+
+
+@tickets_router.post(
+    "/bulk",
+    response_model=list[TicketPublic],
+    status_code=status.HTTP_201_CREATED
+)
+def add_tickets_bulk(
+    session: SessionDep,
+    current_user: UserDep,
+    tickets: Annotated[list[TicketCreate], Body(min_length=1, max_length=MAX_BULK_TICKETS)]
+) -> list[TicketPublic]:
+    """Add many Tickets to the database at once.
+
+    Every ticket is validated before anything is written. If any ticket is
+    invalid, none are created and the 422 response lists the errors by the
+    ticket's index in the request. The tickets are inserted with a single
+    multi-row INSERT ... RETURNING in one transaction.
+
+    Args:
+        tickets (list[TicketCreate]): The incoming JSON data from the user (at most 1000 tickets).
+        session (SessionDep): Database session injected by FastAPI.
+
+    Returns:
+        list[TicketPublic]: The tickets that the user created, in the same order.
 
-    if description is not None:
-        stmt = stmt.where(Ticket.description.ilike(f"%{description}%"))
+    Raises:
+        HTTPException(422): If any ticket is invalid, or there are too many tickets.
+    """
 
-    if priority is not None:
-        stmt = stmt.where(Ticket.priority == priority)
+    today = date.today()
+    rows = [
+        {
+            "title": ticket.title,
+            "description": ticket.description,
+            "priority": ticket.priority,
+            "status": TicketStatus.open,
+            "created": today,
+            "user_id": current_user["id"],
+        }
+        for ticket in tickets
+    ]
+
+    created = session.scalars(
+        insert(Ticket).returning(Ticket, sort_by_parameter_order=True),
+        rows
+    ).all()
+    session.execute(bump_tickets_version_statement(current_user["id"]))
+    session.commit()
+    read_cache.invalidate(current_user["id"])
+    return created
 
-    if status is not None:
-        stmt = stmt.where(Ticket.status == status)
 
-    tickets = session.exec(
-        stmt.where(
-            Ticket.user_id == current_user["id"]
-        ).offset(offset)
-         .limit(limit)).all()
-        
-    return tickets
+
+@tickets_router.post(
+    "/import",
+    response_model=TicketImportResult,
+    status_code=status.HTTP_200_OK
+)
+def import_tickets_file(
+    session: SessionDep,
+    current_user: UserDep,
+    file: UploadFile,
+    file_format: ExportFormat | None = Query(default=None, alias="format"),
+    chunk_size: int = Query(default=IMPORT_CHUNK_SIZE, ge=1, le=10000),
+) -> TicketImportResult:
+    """Import Tickets from an uploaded NDJSON or CSV file.
+
+    Every row is validated like POST /api/tickets/. Invalid rows are skipped
+    and reported; the valid ones are inserted `chunk_size` at a time, one
+    transaction per chunk. The file is read line by line, so its size
+    doesn't matter.
+
+    Args:
+        file (UploadFile): The file, with a title, description and priority per row.
+        file_format (ExportFormat | None): "ndjson" or "csv" (from the file name by default).
+        chunk_size (int): Valid rows inserted per transaction.
+        session (SessionDep): Database session injected by FastAPI.
+
+    Returns:
+        TicketImportResult: How many rows were read, imported and rejected,
+        with the row number and reason for the first 100 rejected rows.
+
+    Raises:
+        HTTPException(400): If the file can't be read.
+    """
+
+    file_format = file_format or detect_format(file.filename)
+
+    try:
+        return import_tickets(
+            session,
+            current_user["id"],
+            open_text(file.file),
+            file_format,
+            chunk_size
+        )
+    except ImportFileError as error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(error)
+        )
+    finally:
+        # Chunks are committed as the import goes, even if it stops early
+        read_cache.invalidate(current_user["id"])
+
+
+
+@tickets_router.patch(
+    "/bulk",
+    response_model=TicketBulkResult,
+    status_code=status.HTTP_200_OK
+)
+def update_tickets_bulk(
+    session: SessionDep,
+    current_user: UserDep,
+    bulk: TicketBulkUpdate
+) -> TicketBulkResult:
+    """Update every selected Ticket with one UPDATE statement.
+
+    The tickets are picked by a list of ids and/or the same filters as
+    /api/tickets/search. Every ticket matching all of them is changed in
+    one transaction. Tickets owned by other users are never touched.
+
+    Args:
+        bulk (TicketBulkUpdate): The ids/filters picking the tickets, and the changes to make.
+        session (SessionDep): Database session injected by FastAPI.
+
+    Returns:
+        TicketBulkResult: How many tickets were updated, and their ids.
+
+    Raises:
+        HTTPException(422): If no tickets were selected or no changes were provided.
+    """
+
+    values = ticket_update_values(bulk.changes)
+    filters = selection_filters(current_user["id"], bulk)
+
+    ids = session.scalars(
+        update(Ticket)
+        .where(*filters)
+        .values(**values, version=Ticket.version + 1, modified=utc_now())
+        .returning(Ticket.id)
+    ).all()
+    if ids:
+        session.execute(bump_tickets_version_statement(current_user["id"]))
+    session.commit()
+    read_cache.invalidate(current_user["id"])
+    return TicketBulkResult(count=len(ids), ids=sorted(ids))
+
+
+
+@tickets_router.delete(
+    "/bulk",
+    response_model=TicketBulkResult,
+    status_code=status.HTTP_200_OK
+)
+def delete_tickets_bulk(
+    session: SessionDep,
+    current_user: UserDep,
+    selection: TicketSelection
+) -> TicketBulkResult:
+    """Delete every selected Ticket with one DELETE statement.
+
+    The tickets are picked the same way as update_tickets_bulk().
+
+    Args:
+        selection (TicketSelection): The ids/filters picking the tickets.
+        session (SessionDep): Database session injected by FastAPI.
+
+    Returns:
+        TicketBulkResult: How many tickets were deleted, and their ids.
+
+    Raises:
+        HTTPException(422): If no tickets were selected.
+    """
+
+    filters = selection_filters(current_user["id"], selection)
+
+    ids = session.scalars(
+        delete(Ticket).where(*filters).returning(Ticket.id)
+    ).all()
+    if ids:
+        session.execute(bump_tickets_version_statement(current_user["id"]))
+    session.commit()
+    read_cache.invalidate(current_user["id"])
+    return TicketBulkResult(count=len(ids), ids=sorted(ids))
 
 
 
@@ -108,15 +429,21 @@ def query_ticket_by_parameters(
     status_code=status.HTTP_200_OK
 )
 def query_ticket_by_id(
-    session: SessionDep,
+    session: ReadSessionDep,
     current_user: UserDep,
+    request: Request,
+    response: Response,
     ticket_id: int = Path(ge=1)
 ) -> TicketPublic:
     """Return a ticket by id owned by the current user.
 
+    The ETag changes whenever the ticket changes. Send it back in
+    If-None-Match to get a 304 (and no body) if it hasn't, or in If-Match
+    when updating or deleting it.
+
     Args:
         ticket_id (int): The id of the ticket to be returned.
-        session (SessionDep): Database session injected by FastAPI.
+        session (ReadSessionDep): Read-only database session injected by FastAPI.
 
     Returns:
         Ticket: ticket owned by the user with id == ticket_id.
@@ -125,22 +452,38 @@ def query_ticket_by_id(
         HTTPException(404): If no ticket was found with id == ticket_id.
     """
 
+    key = read_cache.key(current_user["id"], "ticket", ticket_id=ticket_id)
+    entry = read_cache.get(key)
+    if entry is not None:
+        return serve_cache_entry(entry, request, response)
+
+    # Revalidation only needs the version, not the whole ticket
+    if is_conditional(request):
+        row = session.exec(ticket_version_statement(ticket_id, current_user["id"])).first()
+
+        if row is None:
+            raise ticket_not_found(ticket_id)
+
+        etag = ticket_etag(ticket_id, row.version)
+        if is_not_modified(request, etag, row.modified):
+            return not_modified(etag, row.modified)
+
     # Search using the ticket's id, which is the primary key in the DB.
     #ticket = session.get(Ticket, ticket_id) THIS IS WHAT I HAD BEFORE
-    db_ticket = session.exec(
-        select(Ticket).where(
-            Ticket.id == ticket_id,
-            Ticket.user_id == current_user["id"]
-        )
+    row = session.exec(
+        owned_ticket_row_statement(ticket_id, current_user["id"])
     ).first()
 
-    if db_ticket is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Ticket with {ticket_id=} does not exist"
-        )
-    
-    return db_ticket
+    if row is None:
+        raise ticket_not_found(ticket_id)
+
+    etag = ticket_etag(row.id, row.version)
+    set_validators(response, etag, row.modified)
+    body = encode_json(ticket_dict(row))
+
+    if key is not None:
+        read_cache.set(key, cache_entry(body, etag, row.modified, response))
+    return json_response(body, response)
 
 
 
@@ -152,6 +495,7 @@ def query_ticket_by_id(
 def add_ticket(
     session: SessionDep,
     current_user: UserDep,
+    response: Response,
     ticket: TicketCreate
 ) -> TicketPublic:
     """Add a Ticket to the database.
@@ -167,16 +511,9 @@ def add_ticket(
         None
     """
     
-    db_ticket = Ticket(
-        title=ticket.title,
-        description=ticket.description,
-        priority=ticket.priority,
-        user_id=current_user["id"]
-    )
-
-    session.add(db_ticket)
-    session.commit()
-    session.refresh(db_ticket)
+    db_ticket = run_write(session, ticket_create_write(ticket, current_user["id"]))
+    read_cache.invalidate(current_user["id"])
+    set_validators(response, ticket_etag(db_ticket.id, db_ticket.version), db_ticket.modified)
     return db_ticket
 
 
@@ -190,10 +527,15 @@ def update_ticket(
     ticket: TicketUpdate,
     session: SessionDep,
     current_user: UserDep,
+    request: Request,
+    response: Response,
     ticket_id: int = Path(ge=1)
 ) -> TicketPublic:
     """Update a Ticket in the database.
 
+    If an If-Match header is sent, the ticket is only updated if its ETag
+    still matches, so two people editing it can't overwrite each other.
+
     Args:
         ticket_id (int): The id of the Ticket to be updated.
         ticket (TicketUpdate): The incoming JSON data from the user.
@@ -203,38 +545,14 @@ def update_ticket(
         TicketPublic: The ticket that the user updated.
 
     Raises:
+        HTTPException(404): If no ticket was found with id == ticket_id.
+        HTTPException(412): If If-Match doesn't match the ticket's current ETag.
         HTTPException(422): If no update fields were provided.
     """
     
-    db_ticket = session.exec(
-        select(Ticket).where(
-            Ticket.id == ticket_id,
-            Ticket.user_id == current_user["id"]
-        )
-    ).first()
-
-    if db_ticket is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Ticket with {ticket_id=} does not exist"
-        )
-
-    # Get a dictionary of all the fields with the new values.
-    update_data = ticket.model_dump(exclude_unset=True, exclude_none=True)
-
-    if not update_data:
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail="At least one field must be provided"
-        )
-
-    # Update each field to the new value provided by the user.
-    for key, value in update_data.items():
-        setattr(db_ticket, key, value)
-
-    session.add(db_ticket)
-    session.commit()
-    session.refresh(db_ticket)
+    db_ticket = run_write(session, ticket_update_write(ticket_id, ticket, current_user["id"], request))
+    read_cache.invalidate(current_user["id"])
+    set_validators(response, ticket_etag(db_ticket.id, db_ticket.version), db_ticket.modified)
     return db_ticket
 
 
@@ -247,10 +565,13 @@ def update_ticket(
 def delete_ticket(
     session: SessionDep,
     current_user: UserDep,
+    request: Request,
     ticket_id: int = Path(ge=1)
 ) -> TicketPublic:
     """Delete a Ticket in the database.
 
+    Supports If-Match the same way as update_ticket().
+
     Args:
         ticket_id (int): The id of the ticket to be deleted.
         session (SessionDep): Database session injected by FastAPI.
@@ -260,21 +581,19 @@ def delete_ticket(
 
     Raises:
         HTTPException(404): If no ticket was found with id == ticket_id.
+        HTTPException(412): If If-Match doesn't match the ticket's current ETag.
     """
     
     db_ticket = session.exec(
-        select(Ticket).where(
-            Ticket.id == ticket_id,
-            Ticket.user_id == current_user["id"]
-        )
+        owned_ticket_statement(ticket_id, current_user["id"])
     ).first()
 
     if db_ticket is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Ticket with {ticket_id=} does not exist"
-        )
+        raise ticket_not_found(ticket_id)
 
+    check_if_match(request, ticket_etag(db_ticket.id, db_ticket.version))
     session.delete(db_ticket)
+    session.execute(bump_tickets_version_statement(current_user["id"]))
     session.commit()
+    read_cache.invalidate(current_user["id"])
     return db_ticket
\ No newline at end of file
@@ -0,0 +1,163 @@
+"""
+Full-text search over ticket titles and descriptions.
+
+Tickets are indexed in an SQLite FTS5 table (ticket_fts) that uses the ticket
+table as its external content. Triggers keep the index in sync whenever a
+ticket is created, updated or deleted, so searching never has to fall back to
+a leading-wildcard LIKE that scans every ticket.
+"""
+
+import re
+from sqlalchemy import DDL, Float, Integer, column, event, literal_column, select, table, text
+from app.models import Ticket
+
+# prefix='2 3' builds extra indexes so short prefix searches ("pr*") stay fast
+SEARCH_INDEX_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS ticket_fts USING fts5(
+        title,
+        description,
+        content='ticket',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ticket_fts_insert AFTER INSERT ON ticket BEGIN
+        INSERT INTO ticket_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ticket_fts_delete AFTER DELETE ON ticket BEGIN
+        INSERT INTO ticket_fts(ticket_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ticket_fts_update AFTER UPDATE OF title, description ON ticket BEGIN
+        INSERT INTO ticket_fts(ticket_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO ticket_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+]
+
+# Lightweight handle on the FTS table so it can be used in select statements.
+# rank is FTS5's built-in bm25() relevance score (lower is more relevant).
+ticket_fts = table(
+    "ticket_fts",
+    column("rowid", Integer),
+    column("rank", Float),
+)
+
+# unicode61 splits text on anything that is not a letter or a number
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def create_search_index(connection) -> None:
+    """Creates the FTS table and the triggers that keep it in sync.
+
+    Args:
+        connection: An open SQLAlchemy connection.
+    """
+
+    for statement in SEARCH_INDEX_DDL:
+        connection.execute(text(statement))
+
+
+def rebuild_search_index(connection) -> None:
+    """Rebuilds the FTS index from every ticket currently in the database.
+
+    Args:
+        connection: An open SQLAlchemy connection.
+    """
+
+    create_search_index(connection)
+    connection.execute(text("INSERT INTO ticket_fts(ticket_fts) VALUES ('rebuild')"))
+
+
+def match_expression(
+    q: str | None = None,
+    title: str | None = None,
+    description: str | None = None
+) -> str | None:
+    """Builds an FTS5 MATCH expression from the user's search terms.
+
+    Every word is quoted (so FTS operators in user input are taken literally)
+    and matched as a prefix, so "comp" finds "computer". All words must match.
+
+    Args:
+        q (str | None): Words to find in either the title or the description.
+        title (str | None): Words to find in the title.
+        description (str | None): Words to find in the description.
+
+    Returns:
+        str | None: The MATCH expression, or None if there is nothing to search for.
+    """
+
+    parts = []
+
+    for column_name, value in (
+        (None, q),
+        ("title", title),
+        ("description", description)
+    ):
+        if value is None:
+            continue
+
+        tokens = _TOKEN_PATTERN.findall(value)
+        if not tokens:
+            continue
+
+        terms = " AND ".join(f'"{token}"*' for token in tokens)
+        parts.append(f"({terms})" if column_name is None else f"{column_name} : ({terms})")
+
+    return " AND ".join(parts) if parts else None
+
+
+def has_no_words(
+    q: str | None = None,
+    title: str | None = None,
+    description: str | None = None
+) -> bool:
+    """True if any of the search terms is text with no words in it (e.g. "!!!").
+
+    match_expression() leaves such terms out, but a search for them must
+    match nothing rather than be dropped. Blank values count as not given.
+    """
+
+    return any(
+        value is not None and value.strip() and not _TOKEN_PATTERN.search(value)
+        for value in (q, title, description)
+    )
+
+
+def fts_match(expression: str):
+    """Returns the `ticket_fts MATCH :expression` where clause."""
+
+    return literal_column("ticket_fts").op("MATCH")(expression)
+
+
+def matching_ticket_ids(expression: str):
+    """Returns a subquery of the ids of every ticket matching the expression."""
+
+    return select(ticket_fts.c.rowid).where(fts_match(expression))
+
+
+# Keep the FTS table in step with the ticket table whenever the schema is
+# created or dropped through SQLModel.metadata (including in the tests).
+for statement in SEARCH_INDEX_DDL:
+    event.listen(
+        Ticket.__table__,
+        "after_create",
+        DDL(statement).execute_if(dialect="sqlite")
+    )
+
+event.listen(
+    Ticket.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS ticket_fts").execute_if(dialect="sqlite")
+)
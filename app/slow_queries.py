@@ -0,0 +1,289 @@
+"""
+Slow-query log.
+
+Statements that take longer than a threshold are recorded with their SQL,
+the shape of their parameters (types, never values), how long they took, the
+route that sent them and SQLite's EXPLAIN QUERY PLAN. Each record is appended
+to a rotating JSONL file, and statements of the same shape (same SQL once
+literals and IN lists are normalized) are grouped under a fingerprint, so
+GET /admin/slow-queries can list the worst offenders.
+
+Off unless SLOW_QUERY_MS is set:
+
+    SLOW_QUERY_MS            threshold in milliseconds, e.g. 50
+    SLOW_QUERY_LOG           JSONL file (default: slow_queries.jsonl), empty to
+                             only keep the summary for the admin endpoint
+    SLOW_QUERY_LOG_BYTES     size at which the file is rotated (default: 10 MB)
+    SLOW_QUERY_LOG_BACKUPS   rotated files kept (default: 3)
+"""
+
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime, UTC
+from logging.handlers import RotatingFileHandler
+from sqlalchemy import event
+
+# Query shapes kept for the admin endpoint; the one with the least total time
+# makes room for a new one
+MAX_FINGERPRINTS = 500
+
+# The request being handled, so a statement can be traced to its route
+_current_scope = contextvars.ContextVar("slow_query_scope", default=None)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+
+
+def fingerprint(statement: str) -> tuple[str, str]:
+    """Normalizes a statement so queries of the same shape match.
+
+    Literals become ?, IN lists of any length become (?...), and whitespace
+    and case are normalized.
+
+    Args:
+        statement (str): The SQL sent to the database.
+
+    Returns:
+        tuple[str, str]: A short hash of the normalized SQL, and the SQL itself.
+    """
+
+    normalized = _STRING.sub("?", statement)
+    normalized = _NUMBER.sub("?", normalized)
+    normalized = _IN_LIST.sub("(?...)", normalized)
+    normalized = " ".join(normalized.split()).lower()
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12], normalized
+
+
+def parameter_shape(parameters, executemany: bool):
+    """Describes the bound parameters by type, so no user data is logged.
+
+    Returns:
+        A list (positional) or dict (named) of type names. For executemany,
+        the shape of the first row and the number of rows.
+    """
+
+    if executemany:
+        rows = list(parameters)
+        return {"rows": len(rows), "row": parameter_shape(rows[0], False) if rows else None}
+
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+
+    return [type(value).__name__ for value in parameters or ()]
+
+
+def current_route() -> str | None:
+    """Returns "METHOD /route/{template}" for the request being handled."""
+
+    scope = _current_scope.get()
+    if scope is None:
+        return None
+
+    # The router stores the matched route in the scope once it has found it
+    route = getattr(scope.get("route"), "path", scope.get("path"))
+    return f"{scope['method']} {route}"
+
+
+class SlowQueryMiddleware:
+    """ASGI middleware that makes the current request known to the log."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = _current_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_scope.reset(token)
+
+
+def explain(conn, statement: str, parameters) -> list[str] | None:
+    """Runs EXPLAIN QUERY PLAN for a statement on the connection that ran it.
+
+    A raw DBAPI cursor is used, so the EXPLAIN doesn't go through the engine
+    events (and get timed and logged) itself.
+
+    Returns:
+        list[str] | None: The plan steps, or None if SQLite couldn't explain it.
+    """
+
+    plan_cursor = conn.connection.cursor()
+
+    try:
+        plan_cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return [row[-1] for row in plan_cursor.fetchall()]
+    except Exception:
+        return None
+    finally:
+        plan_cursor.close()
+
+
+class SlowQueryLog:
+    """Records statements slower than a threshold.
+
+    Args:
+        threshold_ms (float): Statements taking at least this long are recorded.
+        path (str | None): The JSONL file, or None to only keep the summary.
+        max_bytes (int): Size at which the file is rotated.
+        backups (int): Rotated files kept.
+    """
+
+    def __init__(self, threshold_ms: float, path: str | None = None, max_bytes: int = 10_000_000, backups: int = 3):
+        self.threshold = threshold_ms / 1000
+        self.path = path
+        self._groups: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._handler = None
+
+        if path is not None:
+            # The logging module's handler already does thread-safe appends
+            # and rotation; each record is one line of JSON
+            self._handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, delay=True)
+            self._handler.setFormatter(logging.Formatter("%(message)s"))
+
+    def instrument(self, engine) -> None:
+        """Times every statement the engine executes.
+
+        Args:
+            engine: A sync Engine (for an AsyncEngine, pass its sync_engine).
+        """
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def start_slow_query_timer(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("slow_query_started", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def check_slow_query(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - conn.info["slow_query_started"].pop()
+
+            if elapsed >= self.threshold:
+                plan = None
+                if conn.dialect.name == "sqlite":
+                    first = parameters[0] if executemany and parameters else parameters
+                    plan = explain(conn, statement, first)
+
+                self.record(statement, parameter_shape(parameters, executemany), elapsed, plan)
+
+        @event.listens_for(engine, "handle_error")
+        def drop_slow_query_timer(exception_context):
+            # A failed statement never reaches after_cursor_execute
+            connection = exception_context.connection
+            started = connection.info.get("slow_query_started") if connection is not None else None
+            if started:
+                started.pop()
+
+    def record(self, statement: str, shape, seconds: float, plan: list[str] | None) -> None:
+        """Writes one slow statement to the file and adds it to its group."""
+
+        key, normalized = fingerprint(statement)
+        route = current_route()
+        now = datetime.now(UTC).isoformat(timespec="milliseconds")
+        duration_ms = round(seconds * 1000, 3)
+
+        if self._handler is not None:
+            line = json.dumps({
+                "time": now,
+                "fingerprint": key,
+                "duration_ms": duration_ms,
+                "route": route,
+                "sql": statement,
+                "parameters": shape,
+                "plan": plan,
+            })
+            self._handler.handle(logging.makeLogRecord({"msg": line}))
+
+        with self._lock:
+            group = self._groups.get(key)
+
+            if group is None:
+                if len(self._groups) >= MAX_FINGERPRINTS:
+                    cheapest = min(self._groups, key=lambda k: self._groups[k]["total_ms"])
+                    del self._groups[cheapest]
+
+                group = self._groups[key] = {
+                    "fingerprint": key,
+                    "sql": normalized,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "routes": {},
+                }
+
+            group["count"] += 1
+            group["total_ms"] += duration_ms
+            group["max_ms"] = max(group["max_ms"], duration_ms)
+            group["last_seen"] = now
+            group["parameters"] = shape
+            group["plan"] = plan
+            if route is not None:
+                group["routes"][route] = group["routes"].get(route, 0) + 1
+
+    def top(self, limit: int = 20, sort: str = "total_ms") -> list[dict]:
+        """Returns the query shapes that took the most time.
+
+        Args:
+            limit (int): How many to return.
+            sort (str): "total_ms", "max_ms", "mean_ms" or "count".
+
+        Returns:
+            list[dict]: One entry per fingerprint, worst first.
+        """
+
+        with self._lock:
+            groups = [
+                {**group, "routes": dict(group["routes"]), "mean_ms": group["total_ms"] / group["count"]}
+                for group in self._groups.values()
+            ]
+
+        groups.sort(key=lambda group: group[sort], reverse=True)
+        return groups[:limit]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._groups.clear()
+
+    def close(self) -> None:
+        if self._handler is not None:
+            self._handler.close()
+
+
+def build_slow_query_log(environ=os.environ) -> SlowQueryLog | None:
+    """Builds the slow-query log from the SLOW_QUERY_* environment variables.
+
+    Returns:
+        SlowQueryLog | None: The log, or None when SLOW_QUERY_MS isn't set.
+
+    Raises:
+        RuntimeError: If SLOW_QUERY_MS is not a number.
+    """
+
+    raw = environ.get("SLOW_QUERY_MS", "").strip()
+    if not raw:
+        return None
+
+    try:
+        threshold_ms = float(raw)
+    except ValueError:
+        raise RuntimeError(f"SLOW_QUERY_MS must be a number: {raw!r}")
+
+    return SlowQueryLog(
+        threshold_ms,
+        path=environ.get("SLOW_QUERY_LOG", "slow_queries.jsonl").strip() or None,
+        max_bytes=int(environ.get("SLOW_QUERY_LOG_BYTES", 10_000_000)),
+        backups=int(environ.get("SLOW_QUERY_LOG_BACKUPS", 3)),
+    )
+
+
+slow_query_log = build_slow_query_log()
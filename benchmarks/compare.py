@@ -0,0 +1,85 @@
+"""
+Compares two benchmark result files and flags regressions.
+
+A route regresses when its p95 latency grows, or its throughput drops, by
+more than the threshold (20% by default).
+
+Usage:
+    python -m benchmarks.compare baseline.json current.json [--threshold 0.2]
+
+Exits with status 1 if any route regressed, so it can gate a CI job.
+"""
+
+import argparse
+import json
+import sys
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[dict]:
+    """Compares the routes found in both results.
+
+    Args:
+        baseline (dict): The results to compare against (from benchmarks.run).
+        current (dict): The new results.
+        threshold (float): The relative change that counts as a regression.
+
+    Returns:
+        list[dict]: One row per route, with the p95 and throughput changes
+        and whether the route regressed.
+    """
+
+    rows = []
+
+    for name, new in current["routes"].items():
+        old = baseline["routes"].get(name)
+        if old is None:
+            continue
+
+        p95_change = new["p95_ms"] / old["p95_ms"] - 1 if old["p95_ms"] else 0.0
+        rps_change = new["rps"] / old["rps"] - 1 if old["rps"] else 0.0
+
+        rows.append({
+            "route": name,
+            "p95_ms": (old["p95_ms"], new["p95_ms"]),
+            "rps": (old["rps"], new["rps"]),
+            "p95_change": p95_change,
+            "rps_change": rps_change,
+            "regressed": p95_change > threshold or rps_change < -threshold,
+        })
+
+    return rows
+
+
+def print_comparison(rows: list[dict]) -> None:
+    print(f"{'route':<32} {'p95 ms':>17} {'change':>8} {'req/s':>17} {'change':>8}")
+
+    for row in rows:
+        flag = "  REGRESSED" if row["regressed"] else ""
+        print(
+            f"{row['route']:<32} "
+            f"{row['p95_ms'][0]:>8.2f}->{row['p95_ms'][1]:<8.2f} {row['p95_change']:>+8.0%} "
+            f"{row['rps'][0]:>8.1f}->{row['rps'][1]:<8.1f} {row['rps_change']:>+8.0%}{flag}"
+        )
+
+
+def load(path: str) -> dict:
+    with open(path) as file:
+        return json.load(file)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compare", description=__doc__.splitlines()[1])
+    parser.add_argument("baseline", help="results of the earlier run")
+    parser.add_argument("current", help="results of the new run")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative change that counts (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    rows = compare(load(args.baseline), load(args.current), args.threshold)
+    print_comparison(rows)
+
+    if any(row["regressed"] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,422 @@
+"""
+Load and latency benchmark for every endpoint.
+
+Seeds a scratch SQLite database (users x tickets per user), sends each route
+a batch of requests from N concurrent clients, and reports throughput and
+p50/p95/p99 latency per route. Reads run before writes, so the writes don't
+change what the reads see.
+
+    inprocess  (default) drives the app in this process through httpx's ASGI
+               transport, with the session dependency pointed at the scratch
+               database. Measures the app without any network or server.
+    uvicorn    starts `uvicorn app.main:app` on a free local port, with
+               DATABASE_URL set to the scratch database, and sends real HTTP
+               requests to it.
+
+Both targets use this process's environment, so DB_PROFILE, READ_CACHE,
+HASH_WORKERS, ... apply as usual (DB_ASYNC only with --target uvicorn).
+
+Usage:
+    python -m benchmarks.run [--users 10] [--tickets-per-user 1000]
+                             [--requests 200] [--concurrency 8]
+                             [--target inprocess|uvicorn]
+                             [--output results.json] [--compare baseline.json]
+"""
+
+import os
+
+# The app refuses to start without a signing key; any value will do here
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, UTC
+from pathlib import Path
+import httpx
+from sqlmodel import Session, func, select
+from app.db import build_engine, load_settings
+from app.models import Ticket
+from benchmarks.compare import compare, load, print_comparison
+from benchmarks.seed import PASSWORD, WORDS, seed, username
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@dataclass
+class BenchUser:
+    id: int
+    username: str
+    headers: dict
+    first_ticket: int
+    last_ticket: int
+
+
+@dataclass
+class Context:
+    users: list[BenchUser]
+    rng: random.Random
+    # (user, ticket id) of tickets created during the run, deleted at the end
+    created: list = field(default_factory=list)
+
+
+@dataclass
+class Route:
+    name: str
+    method: str
+    # Builds (path, json body) for one request by the given user
+    build: object
+    # Fraction of --requests sent to this route (bcrypt and export are slow)
+    scale: float = 1.0
+    authenticated: bool = True
+    # Called with the user and the response, e.g. to remember created tickets
+    after: object = None
+
+
+def _new_ticket(ctx: Context) -> dict:
+    return {
+        "title": " ".join(ctx.rng.sample(WORDS, 3)),
+        "description": " ".join(ctx.rng.sample(WORDS, 8)),
+        "priority": ctx.rng.randint(1, 5),
+    }
+
+
+def _remember_created(ctx: Context, user: BenchUser, response: httpx.Response) -> None:
+    if response.status_code == 201:
+        body = response.json()
+        for ticket in body if isinstance(body, list) else [body]:
+            ctx.created.append((user, ticket["id"]))
+
+
+def _delete_created(ctx: Context, user: BenchUser):
+    owner, ticket_id = ctx.created.pop()
+    return f"/api/tickets/{ticket_id}", None, owner
+
+
+ROUTES = [
+    Route(
+        "POST /auth/token", "POST",
+        lambda ctx, u: ("/auth/token", {"username": u.username, "password": PASSWORD}),
+        scale=0.1, authenticated=False,
+    ),
+    Route("GET /api/tickets/", "GET", lambda ctx, u: ("/api/tickets/?limit=100", None)),
+    Route(
+        "GET /api/tickets/ sort=priority", "GET",
+        lambda ctx, u: ("/api/tickets/?limit=50&sort=priority", None),
+    ),
+    Route(
+        "GET /api/tickets/search q", "GET",
+        lambda ctx, u: (f"/api/tickets/search?q={ctx.rng.choice(WORDS)}&limit=50", None),
+    ),
+    Route(
+        "GET /api/tickets/search filters", "GET",
+        lambda ctx, u: (
+            f"/api/tickets/search?priority={ctx.rng.randint(1, 5)}&status=open&limit=50", None
+        ),
+    ),
+    Route(
+        "GET /api/tickets/{id}", "GET",
+        lambda ctx, u: (f"/api/tickets/{ctx.rng.randint(u.first_ticket, u.last_ticket)}", None),
+    ),
+    Route("GET /api/tickets/export", "GET", lambda ctx, u: ("/api/tickets/export", None), scale=0.1),
+    Route(
+        "POST /api/tickets/", "POST",
+        lambda ctx, u: ("/api/tickets/", _new_ticket(ctx)),
+        after=_remember_created,
+    ),
+    Route(
+        "POST /api/tickets/bulk", "POST",
+        lambda ctx, u: ("/api/tickets/bulk", [_new_ticket(ctx) for _ in range(10)]),
+        scale=0.25, after=_remember_created,
+    ),
+    Route(
+        "PATCH /api/tickets/{id}", "PATCH",
+        lambda ctx, u: (
+            f"/api/tickets/{ctx.rng.randint(u.first_ticket, u.last_ticket)}",
+            {"priority": ctx.rng.randint(1, 5)},
+        ),
+    ),
+    # Deletes the tickets created above, so it runs at most once per ticket
+    Route("DELETE /api/tickets/{id}", "DELETE", _delete_created),
+]
+
+
+def percentile(samples: list[float], p: float) -> float:
+    """Nearest-rank percentile of sorted samples."""
+
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+
+def summarize(latencies: list[float], errors: int, wall_seconds: float) -> dict:
+    latencies = sorted(latencies)
+    count = len(latencies)
+
+    return {
+        "count": count,
+        "errors": errors,
+        "rps": count / wall_seconds if wall_seconds else 0.0,
+        "mean_ms": sum(latencies) / count * 1000 if count else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": latencies[-1] * 1000 if count else 0.0,
+    }
+
+
+async def run_route(
+    client: httpx.AsyncClient,
+    ctx: Context,
+    route: Route,
+    count: int,
+    concurrency: int
+) -> dict:
+    """Sends `count` requests to one route from `concurrency` clients at once.
+
+    Returns:
+        dict: The route's summary (see summarize()).
+    """
+
+    if route.method == "DELETE":
+        count = min(count, len(ctx.created))
+
+    remaining = count
+    latencies = []
+    errors = 0
+
+    async def client_loop() -> None:
+        nonlocal remaining, errors
+
+        while remaining > 0:
+            remaining -= 1
+            user = ctx.rng.choice(ctx.users)
+            path, body, *owner = route.build(ctx, user)
+            user = owner[0] if owner else user
+
+            started = time.perf_counter()
+            response = await client.request(
+                route.method,
+                path,
+                json=body,
+                headers=user.headers if route.authenticated else None,
+            )
+            latencies.append(time.perf_counter() - started)
+
+            if response.status_code >= 400:
+                errors += 1
+            if route.after is not None:
+                route.after(ctx, user, response)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def run_all(client: httpx.AsyncClient, ctx: Context, args: argparse.Namespace) -> dict:
+    results = {}
+
+    for route in ROUTES:
+        count = max(1, int(args.requests * route.scale))
+
+        # Warm up connections and caches without measuring
+        if args.warmup and route.method == "GET":
+            await run_route(client, ctx, route, args.warmup, 1)
+
+        results[route.name] = await run_route(client, ctx, route, count, args.concurrency)
+        print_route(route.name, results[route.name])
+
+    return results
+
+
+def load_users(engine, user_ids: list[int]) -> list[BenchUser]:
+    """Builds each user's access token and ticket id range."""
+
+    # Imported here, after SECRET_KEY has a value
+    from app.routes.auth import create_access_token
+
+    with Session(engine) as session:
+        ranges = dict(
+            (user_id, (first, last))
+            for user_id, first, last in session.exec(
+                select(Ticket.user_id, func.min(Ticket.id), func.max(Ticket.id)).group_by(Ticket.user_id)
+            ).all()
+        )
+
+    users = []
+    for index, user_id in enumerate(user_ids):
+        token = create_access_token(username(index), user_id, timedelta(hours=12))
+        first, last = ranges.get(user_id, (1, 1))
+        users.append(BenchUser(
+            id=user_id,
+            username=username(index),
+            headers={"Authorization": f"Bearer {token}"},
+            first_ticket=first,
+            last_ticket=last,
+        ))
+
+    return users
+
+
+async def run_inprocess(database_url: str, ctx: Context, args: argparse.Namespace) -> dict:
+    from app.cache import read_cache
+    from app.db import build_read_engine, get_read_session, get_session
+    from app.main import app
+
+    settings = load_settings({**os.environ, "DATABASE_URL": database_url})
+    engine = build_engine(settings)
+    read_engine = build_read_engine(settings) or engine
+
+    def override_get_session():
+        with Session(engine) as session:
+            yield session
+
+    def override_get_read_session():
+        with Session(read_engine) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = override_get_session
+    app.dependency_overrides[get_read_session] = override_get_read_session
+    read_cache.clear()
+
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            return await run_all(client, ctx, args)
+    finally:
+        app.dependency_overrides.clear()
+        engine.dispose()
+        read_engine.dispose()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_uvicorn(database_url: str, ctx: Context, args: argparse.Namespace) -> dict:
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        env={**os.environ, "DATABASE_URL": database_url},
+    )
+
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+            deadline = time.monotonic() + 30
+
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError("uvicorn exited before it started serving")
+                try:
+                    if (await client.get("/")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError("uvicorn did not start within 30 seconds")
+                await asyncio.sleep(0.2)
+
+            return await run_all(client, ctx, args)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def print_header() -> None:
+    print(
+        f"{'route':<32} {'count':>6} {'errors':>6} {'req/s':>8} "
+        f"{'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  (ms)"
+    )
+
+
+def print_route(name: str, result: dict) -> None:
+    print(
+        f"{name:<32} {result['count']:>6} {result['errors']:>6} {result['rps']:>8.1f} "
+        f"{result['mean_ms']:>8.2f} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+        f"{result['p99_ms']:>8.2f} {result['max_ms']:>8.2f}"
+    )
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=10, help="users to seed (default: 10)")
+    parser.add_argument("--tickets-per-user", type=int, default=1000, help="tickets per user (default: 1000)")
+    parser.add_argument("--requests", type=int, default=200, help="requests per route (default: 200)")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent clients (default: 8)")
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured requests per GET route (default: 5)")
+    parser.add_argument("--target", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="compare with the results in this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="regression threshold for --compare (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f"sqlite:///{Path(directory) / 'benchmark.db'}"
+        seed_engine = build_engine(load_settings({"DATABASE_URL": database_url}))
+
+        print(f"Seeding {args.users} users x {args.tickets_per_user} tickets...")
+        user_ids = seed(seed_engine, args.users, args.tickets_per_user, args.seed)
+        ctx = Context(users=load_users(seed_engine, user_ids), rng=random.Random(args.seed))
+        seed_engine.dispose()
+
+        print_header()
+        runner = run_uvicorn if args.target == "uvicorn" else run_inprocess
+        routes = asyncio.run(runner(database_url, ctx, args))
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(UTC).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "target": args.target,
+            "users": args.users,
+            "tickets_per_user": args.tickets_per_user,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "environment": {
+                name: os.environ[name]
+                for name in ("DB_PROFILE", "DB_ASYNC", "READ_CACHE", "HASH_WORKERS")
+                if name in os.environ
+            },
+        },
+        "routes": routes,
+    }
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        rows = compare(load(args.compare), results, args.threshold)
+        print()
+        print_comparison(rows)
+        if any(row["regressed"] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
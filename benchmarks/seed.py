@@ -0,0 +1,80 @@
+"""
+Seeds a scratch database for the benchmarks.
+
+Every user gets the same password, hashed once, so seeding thousands of
+users doesn't mean thousands of bcrypt calls.
+"""
+
+import random
+from datetime import date, timedelta
+from sqlmodel import Session, insert, select
+from app.hashing import bcrypt_context
+from app.migrations import migrate
+from app.models import Ticket, TicketStatus, User
+
+PASSWORD = "benchmark-password"
+
+WORDS = [
+    "printer", "laptop", "network", "password", "email", "monitor", "vpn",
+    "keyboard", "server", "backup", "license", "install", "slow", "broken",
+    "error", "access", "screen", "update", "meeting", "phone",
+]
+
+_STATUSES = list(TicketStatus)
+
+# Rows per executemany, to keep the seeding memory bounded
+_CHUNK_SIZE = 5000
+
+
+def username(index: int) -> str:
+    return f"bench{index}"
+
+
+def seed(engine, users: int, tickets_per_user: int, seed_value: int = 0) -> list[int]:
+    """Creates the tables and fills them with users and their tickets.
+
+    Args:
+        engine: The scratch database's engine.
+        users (int): How many users to create.
+        tickets_per_user (int): How many tickets each user gets.
+        seed_value (int): Seed for the random titles, so runs are repeatable.
+
+    Returns:
+        list[int]: The ids of the users created.
+    """
+
+    rng = random.Random(seed_value)
+    migrate(engine)
+
+    hashed_password = bcrypt_context.hash(PASSWORD)
+    today = date.today()
+
+    with Session(engine) as session:
+        session.execute(insert(User), [
+            {"username": username(i), "hashed_password": hashed_password}
+            for i in range(users)
+        ])
+        session.commit()
+        user_ids = list(session.exec(select(User.id).order_by(User.id)).all())
+
+        chunk = []
+        for user_id in user_ids:
+            for i in range(tickets_per_user):
+                chunk.append({
+                    "title": " ".join(rng.sample(WORDS, 3)),
+                    "description": " ".join(rng.sample(WORDS, 8)),
+                    "priority": rng.randint(1, 5),
+                    "status": rng.choice(_STATUSES),
+                    "created": today - timedelta(days=rng.randint(0, 365)),
+                    "user_id": user_id,
+                })
+
+                if len(chunk) >= _CHUNK_SIZE:
+                    session.execute(insert(Ticket), chunk)
+                    chunk.clear()
+
+        if chunk:
+            session.execute(insert(Ticket), chunk)
+        session.commit()
+
+    return user_ids
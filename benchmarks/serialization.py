@@ -0,0 +1,100 @@
+"""
+Compares the ORM and lean ways of turning a page of tickets into JSON.
+
+    orm   select(Ticket) objects, validated against list[TicketPublic] and
+          encoded with the json module (what FastAPI does with response_model)
+    lean  select the TicketPublic columns as plain rows and encode them with
+          orjson (app/responses.py)
+
+Both include the query, so the numbers are the cost of one page as served.
+Runs against a scratch SQLite database, never the app's own.
+
+Usage:
+    python -m benchmarks.serialization [--tickets 5000] [--repeat 200]
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlmodel import Session, SQLModel, create_engine, insert, select
+from app.models import Ticket, TicketPublic, TicketStatus
+from app.responses import PUBLIC_COLUMNS, encode_json, ticket_dict
+
+PAGE_SIZES = [10, 50, 100]
+
+_public_list = TypeAdapter(list[TicketPublic])
+
+
+def seed(engine, tickets: int) -> None:
+    rows = [
+        {
+            "title": f"Ticket {i}",
+            "description": " ".join(["Printer on the third floor is out of toner again"] * 3),
+            "priority": 1 + i % 5,
+            "status": TicketStatus.open,
+            "created": date.today(),
+            "user_id": 1,
+        }
+        for i in range(tickets)
+    ]
+
+    with Session(engine) as session:
+        session.execute(insert(Ticket), rows)
+        session.commit()
+
+
+def orm_page(session: Session, limit: int) -> bytes:
+    tickets = session.exec(select(Ticket).where(Ticket.user_id == 1).order_by(Ticket.id).limit(limit)).all()
+    validated = _public_list.validate_python(tickets, from_attributes=True)
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+
+def lean_page(session: Session, limit: int) -> bytes:
+    rows = session.exec(select(*PUBLIC_COLUMNS).where(Ticket.user_id == 1).order_by(Ticket.id).limit(limit)).all()
+    return encode_json([ticket_dict(row) for row in rows])
+
+
+def time_per_page(page, engine, limit: int, repeat: int) -> float:
+    """Returns the mean milliseconds per page, each in a fresh session."""
+
+    started = time.perf_counter()
+
+    for _ in range(repeat):
+        with Session(engine) as session:
+            page(session, limit)
+
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.serialization", description=__doc__.splitlines()[1])
+    parser.add_argument("--tickets", type=int, default=5000, help="tickets to seed (default: 5000)")
+    parser.add_argument("--repeat", type=int, default=200, help="pages timed per size (default: 200)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{Path(directory) / 'serialization.db'}")
+        SQLModel.metadata.create_all(engine)
+        seed(engine, args.tickets)
+
+        with Session(engine) as session:
+            # Both paths must produce the same JSON
+            assert json.loads(orm_page(session, 100)) == json.loads(lean_page(session, 100))
+
+        print(f"{'page size':>9}  {'orm ms':>8}  {'lean ms':>8}  {'speedup':>7}")
+
+        for limit in PAGE_SIZES:
+            orm_ms = time_per_page(orm_page, engine, limit, args.repeat)
+            lean_ms = time_per_page(lean_page, engine, limit, args.repeat)
+            print(f"{limit:>9}  {orm_ms:>8.3f}  {lean_ms:>8.3f}  {orm_ms / lean_ms:>6.1f}x")
+
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
-// This is the key for the token
+// These are the keys for the tokens
 const TOKEN_KEY = "access_token";
+const REFRESH_KEY = "refresh_token";
 
 // Functions dealing with the access_token
 function set_token(token)
@@ -12,13 +13,97 @@ function get_token()
     return sessionStorage.getItem(TOKEN_KEY);
 }
 
-function logout()
+// Functions dealing with the refresh_token
+function set_refresh_token(token)
 {
+    if (token)
+        sessionStorage.setItem(REFRESH_KEY, token);
+}
+
+function get_refresh_token()
+{
+    return sessionStorage.getItem(REFRESH_KEY);
+}
+
+async function logout()
+{
+    const refresh_token = get_refresh_token();
+
+    clear_cache();
     sessionStorage.removeItem(TOKEN_KEY);
+    sessionStorage.removeItem(REFRESH_KEY);
+
+    // Revoke the refresh token so it can't be used again
+    if (refresh_token)
+    {
+        try
+        {
+            await fetch("/auth/logout", {
+                method: "POST",
+                headers: { "Content-Type": "application/json" },
+                body: JSON.stringify({refresh_token})
+            });
+        }
+        catch
+        {
+            // Logging out locally still works if the request fails
+        }
+    }
+
     window.location.reload();
 }
 
 
+// The refresh request in progress, so pages that send several requests
+// at once only refresh the access token once
+let refresh_in_flight = null;
+
+// Use the refresh token to get a new access token (no password needed).
+// Returns true if the tokens were renewed.
+function refresh_access_token()
+{
+    const refresh_token = get_refresh_token();
+    if (!refresh_token)
+        return Promise.resolve(false);
+
+    if (refresh_in_flight === null)
+    {
+        refresh_in_flight = (async () => {
+            try
+            {
+                const res = await fetch("/auth/refresh", {
+                    method: "POST",
+                    headers: { "Content-Type": "application/json" },
+                    body: JSON.stringify({refresh_token})
+                });
+
+                if (!res.ok)
+                {
+                    // The refresh token expired or was revoked, so log in again
+                    sessionStorage.removeItem(REFRESH_KEY);
+                    return false;
+                }
+
+                const data = await res.json();
+                set_token(data.access_token);
+                set_refresh_token(data.refresh_token);
+                return true;
+            }
+            catch
+            {
+                return false;
+            }
+            finally
+            {
+                refresh_in_flight = null;
+            }
+        })();
+    }
+
+    return refresh_in_flight;
+}
+
+
 
 // Parses the response body as JSON and returns a JS object
 async function safeJson(res)
@@ -49,6 +134,44 @@ function extract_error_message(data)
 
 // Send a request to the API
 async function requestOrThrow(url, options = {})
+{
+    const {data} = await requestWithHeadersOrThrow(url, options);
+    return data;
+}
+
+// Send a request to the API, and also return the response headers
+// (the ticket lists send the cursor for the next page in X-Next-Cursor).
+// GET requests go through the response cache below.
+async function requestWithHeadersOrThrow(url, options = {})
+{
+    const method = (options.method || "GET").toUpperCase();
+    const user = cache_user();
+
+    // Responses are cached per user, so nothing is cached when logged out
+    if (user === null || !url.startsWith("/api/"))
+        return send_request(url, options);
+
+    if (method === "GET")
+        return cached_get(user, url, options);
+
+    try
+    {
+        const result = await send_request(url, options);
+        update_cache_after_write(user, url, method, result);
+        return result;
+    }
+    catch (err)
+    {
+        // The request failed, maybe because a ticket changed or is gone,
+        // so don't trust anything cached for this user any more
+        clear_cache(user);
+        throw err;
+    }
+}
+
+// Send the request, renewing the access token if it expired.
+// A 304 Not Modified is returned like a success, with no data.
+async function send_request(url, options = {})
 {
     const headers = new Headers(options.headers || {});
     const token = get_token();
@@ -62,7 +185,18 @@ async function requestOrThrow(url, options = {})
     options.headers = headers
 
     // API request
-    const res = await fetch(url, options);
+    let res = await fetch(url, options);
+
+    // The access token expired: renew it and send the request again
+    if (res.status === 401 && !url.startsWith("/auth") && await refresh_access_token())
+    {
+        headers.set("Authorization", `Bearer ${get_token()}`);
+        res = await fetch(url, options);
+    }
+
+    if (res.status === 304)
+        return {data: null, headers: res.headers, status: res.status};
+
     // JavaScript object returned from request
     const data = await safeJson(res);
 
@@ -73,7 +207,243 @@ async function requestOrThrow(url, options = {})
         throw new Error(msg || `Request failed (${res.status})`);
     }
 
-    return data
+    return {data, headers: res.headers, status: res.status};
+}
+
+
+// ----- Response cache -----
+//
+// GET responses that come with an ETag are kept in sessionStorage, so they
+// survive moving between pages. An entry younger than CACHE_FRESH_MS is used
+// without asking the server at all; an older one is revalidated with
+// If-None-Match, and a 304 means the cached copy is used without downloading
+// it again. After a POST, PATCH or DELETE the cached tickets and ticket lists
+// are updated locally, so the next page shows the change straight away.
+
+const CACHE_PREFIX = "api_cache:";
+
+// How long a cached response is used without revalidating it
+const CACHE_FRESH_MS = 10000;
+
+// The most responses kept; the oldest are dropped first
+const CACHE_MAX_ENTRIES = 50;
+
+// The page size the API uses when a list request doesn't send a limit
+const DEFAULT_PAGE_SIZE = 100;
+
+// GET requests waiting for a response, so identical requests made at the
+// same time share one
+const gets_in_flight = new Map();
+
+// The id of the logged in user, read from the access token
+function cache_user()
+{
+    const token = get_token();
+    if (!token) return null;
+
+    try
+    {
+        const payload = token.split(".")[1].replace(/-/g, "+").replace(/_/g, "/");
+        return JSON.parse(atob(payload)).id ?? null;
+    }
+    catch
+    {
+        return null;
+    }
+}
+
+// The same url always gives the same key, however it was written
+function cache_key(user, url)
+{
+    const parsed = new URL(url, window.location.origin);
+    return `${CACHE_PREFIX}${user}:${parsed.pathname}${parsed.search}`;
+}
+
+function read_cache_entry(key)
+{
+    try
+    {
+        return JSON.parse(sessionStorage.getItem(key));
+    }
+    catch
+    {
+        return null;
+    }
+}
+
+function write_cache_entry(key, entry)
+{
+    try
+    {
+        sessionStorage.setItem(key, JSON.stringify(entry));
+    }
+    catch
+    {
+        // Storage is full: start over rather than keep old responses
+        clear_cache();
+        return;
+    }
+
+    const entries = cache_entries();
+    entries.sort((a, b) => a.entry.stored - b.entry.stored);
+    for (const {key: old_key} of entries.slice(0, Math.max(0, entries.length - CACHE_MAX_ENTRIES)))
+        sessionStorage.removeItem(old_key);
+}
+
+// The cached responses, all of them or only the given user's
+function cache_entries(user = null)
+{
+    const prefix = user === null ? CACHE_PREFIX : `${CACHE_PREFIX}${user}:`;
+    const entries = [];
+
+    for (let i = 0; i < sessionStorage.length; i++)
+    {
+        const key = sessionStorage.key(i);
+        if (!key.startsWith(prefix)) continue;
+
+        const entry = read_cache_entry(key);
+        if (entry === null) continue;
+
+        const url = new URL(key.slice(key.indexOf(":", CACHE_PREFIX.length) + 1), window.location.origin);
+        entries.push({key, url, entry});
+    }
+
+    return entries;
+}
+
+function clear_cache(user = null)
+{
+    for (const {key} of cache_entries(user))
+        sessionStorage.removeItem(key);
+}
+
+function entry_result(entry)
+{
+    return {data: entry.data, headers: new Headers(entry.headers), status: 200};
+}
+
+// Send a GET through the cache
+function cached_get(user, url, options)
+{
+    const key = cache_key(user, url);
+
+    let request = gets_in_flight.get(key);
+    if (request === undefined)
+    {
+        request = revalidate(key, url, options).finally(() => gets_in_flight.delete(key));
+        gets_in_flight.set(key, request);
+    }
+
+    return request;
+}
+
+async function revalidate(key, url, options)
+{
+    const entry = read_cache_entry(key);
+
+    if (entry !== null && Date.now() - entry.stored < CACHE_FRESH_MS)
+        return entry_result(entry);
+
+    const headers = new Headers(options.headers || {});
+    if (entry !== null)
+        headers.set("If-None-Match", entry.etag);
+
+    // This cache decides when to revalidate, not the browser's
+    const result = await send_request(url, {...options, headers, cache: "no-store"});
+
+    if (result.status === 304 && entry !== null)
+    {
+        entry.stored = Date.now();
+        write_cache_entry(key, entry);
+        return entry_result(entry);
+    }
+
+    const etag = result.headers.get("ETag");
+    if (etag && result.data !== null)
+    {
+        const cursor = result.headers.get("X-Next-Cursor");
+        write_cache_entry(key, {
+            etag,
+            data: result.data,
+            headers: cursor ? {"X-Next-Cursor": cursor} : {},
+            stored: Date.now()
+        });
+    }
+
+    return result;
+}
+
+// Apply a successful write to the cached responses
+function update_cache_after_write(user, url, method, result)
+{
+    const path = new URL(url, window.location.origin).pathname;
+    const single = path.match(/^\/api\/tickets\/(\d+)$/);
+    const ticket = result.data;
+
+    const created = method === "POST" && (path === "/api/tickets/" || path === "/api/tickets");
+    const changed = single !== null && (method === "PATCH" || method === "DELETE");
+
+    // Anything else (bulk changes, imports) could touch any ticket
+    if (!created && !changed)
+    {
+        clear_cache(user);
+        return;
+    }
+
+    const ticket_key = cache_key(user, `/api/tickets/${ticket.id}`);
+    const etag = result.headers.get("ETag");
+
+    if (method === "DELETE" || !etag)
+        sessionStorage.removeItem(ticket_key);
+    else
+        write_cache_entry(ticket_key, {etag, data: ticket, headers: {}, stored: Date.now()});
+
+    for (const {key, url: cached_url, entry} of cache_entries(user))
+    {
+        if (key === ticket_key) continue;
+
+        if (!update_cached_list(cached_url, entry, method, ticket))
+            sessionStorage.removeItem(key);
+        else
+            sessionStorage.setItem(key, JSON.stringify(entry));
+    }
+}
+
+// Update a cached ticket list in place. Returns false if the list can't be
+// updated locally (the change may move tickets between pages or searches),
+// so it has to be dropped instead.
+function update_cached_list(url, entry, method, ticket)
+{
+    // A different ticket
+    if (/^\/api\/tickets\/\d+$/.test(url.pathname)) return true;
+
+    // Only the plain list in id order can be updated safely
+    const sort = url.searchParams.get("sort") || "id";
+    if (url.pathname !== "/api/tickets/" || sort !== "id" || !Array.isArray(entry.data)) return false;
+
+    if (method === "PATCH")
+    {
+        entry.data = entry.data.map(t => t.id === ticket.id ? ticket : t);
+        return true;
+    }
+
+    // Adding or removing a ticket shifts every page after it by one
+    if (url.searchParams.has("offset")) return false;
+
+    if (method === "DELETE")
+    {
+        entry.data = entry.data.filter(t => t.id !== ticket.id);
+        return true;
+    }
+
+    // A new ticket has the highest id, so it goes at the end of the last page
+    if (entry.headers["X-Next-Cursor"]) return true;
+
+    const limit = Number(url.searchParams.get("limit") || DEFAULT_PAGE_SIZE);
+    if (entry.data.length >= limit) return false;
+
+    entry.data.push(ticket);
+    return true;
 }
 
 
@@ -36,8 +36,9 @@ form.addEventListener("submit", async (event) =>
          
         // Success
         alert(`Logged in as: ${payload.username}`);
-        // Put the token in session storage
+        // Put the tokens in session storage
         set_token(data.access_token);
+        set_refresh_token(data.refresh_token);
         window.location.href = "/static/index.html";
     }
     // Print the error if the request failed
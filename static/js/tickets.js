@@ -1,51 +1,197 @@
-// Display the tickets from the API request
-function render_tickets(tickets)
-{
-    const list = document.getElementById("tickets");
-    list.innerHTML = "";
+// Tickets requested per page while scrolling (the most the API sends at once)
+const PAGE_SIZE = 100;
+
+// Start loading the next page when the end of the list is this close
+const LOAD_MARGIN = "800px";
+
+// Batches of tickets further off-screen than this are emptied, so the page
+// only ever holds the rows around what the user is looking at
+const KEEP_MARGIN = "1500px";
+
+// The list being shown: where its next page comes from and what is loaded.
+// Replaced by every new search, so late responses for an old one are ignored.
+let view = null;
+
+// Loads the next page when the end of the list scrolls into view
+const end_observer = new IntersectionObserver((entries) => {
+    if (entries.some(entry => entry.isIntersecting))
+        load_next_page();
+}, {rootMargin: LOAD_MARGIN});
 
-    // The user might not have any tickets
-    if (!tickets || tickets.length === 0)
+// Empties batches that scroll far away and refills them when they come back
+const batch_observer = new IntersectionObserver((entries) => {
+    for (const entry of entries)
     {
-        const li = document.createElement("li");
-        li.textContent = "No tickets found"
-        list.appendChild(li)
-        return;
+        const batch = entry.target.batch;
+
+        if (entry.isIntersecting)
+            fill_batch(batch);
+        else
+            empty_batch(batch);
     }
+}, {rootMargin: KEEP_MARGIN});
+
 
-    // Create a list of the user's tickets
-    for (const t of tickets)
+// Create the list item for one ticket. textContent is used for the ticket's
+// fields, so any HTML in a title or description is shown as text.
+function ticket_item(t)
+{
+    const li = document.createElement("li");
+
+    const heading = document.createElement("strong");
+    heading.textContent = `Ticket id=${t.id}`;
+    li.appendChild(heading);
+
+    const details = document.createElement("ul");
+    for (const [label, value] of [
+        ["Title", t.title],
+        ["Description", t.description],
+        ["Priority", t.priority],
+        ["Status", t.status]
+    ])
     {
-        const li = document.createElement("li");
-        li.innerHTML = `<strong>Ticket id=${t.id}</strong>
-                        <ul>
-                            <li>Title: ${t.title}</li>
-                            <li>Description: ${t.description}</li>
-                            <li>Priority: ${t.priority}</li>
-                            <li>Status: ${t.status}</li>
-                        </ul>`;
-        list.appendChild(li);
+        const detail = document.createElement("li");
+        detail.textContent = `${label}: ${value}`;
+        details.appendChild(detail);
     }
+    li.appendChild(details);
+
+    return li;
+}
+
+
+// Render a batch's tickets. They are built in a DocumentFragment first,
+// so the page is laid out once per batch instead of once per ticket.
+function fill_batch(batch)
+{
+    if (batch.filled) return;
+
+    const fragment = document.createDocumentFragment();
+    for (const t of batch.tickets)
+        fragment.appendChild(ticket_item(t));
+
+    batch.list.appendChild(fragment);
+    batch.el.style.height = "";
+    batch.filled = true;
+}
+
+
+// Remove a batch's rows, keeping its height so the scroll position stays put
+function empty_batch(batch)
+{
+    if (!batch.filled) return;
+
+    batch.el.style.height = `${batch.el.offsetHeight}px`;
+    batch.list.replaceChildren();
+    batch.filled = false;
+}
+
+
+// Add a page of tickets to the end of the list
+function append_batch(tickets)
+{
+    const el = document.createElement("li");
+    el.className = "ticket-batch";
+
+    const list = document.createElement("ul");
+    el.appendChild(list);
+
+    const batch = {el, list, tickets, filled: false};
+    el.batch = batch;
+
+    fill_batch(batch);
+    document.getElementById("tickets").appendChild(el);
+    batch_observer.observe(el);
+}
+
+
+// Clear the list and start showing the tickets from url.
+// With paged set, the following pages are loaded as the user scrolls.
+function show_tickets(url, paged = true)
+{
+    batch_observer.disconnect();
+    end_observer.disconnect();
+    document.getElementById("tickets").replaceChildren();
+    document.getElementById("tickets-end").textContent = "";
+
+    view = {url, next_url: url, paged, loading: false, count: 0};
+    load_next_page();
+}
+
+
+// The url of the page after the one whose cursor is given. The cursor
+// already says where to continue, so any offset is dropped.
+function next_page_url(url, cursor)
+{
+    const next = new URL(url, window.location.origin);
+    next.searchParams.delete("offset");
+    next.searchParams.set("after", cursor);
+    return next.pathname + next.search;
 }
 
 
-// Make an API request to view all the users tickets
-async function load_all_tickets()
+// Make an API request for the next page of the list being shown
+async function load_next_page()
 {
+    const current = view;
+    if (!current || current.loading || !current.next_url) return;
+
     const statusEl = document.getElementById("status");
+    const end = document.getElementById("tickets-end");
+    current.loading = true;
 
     try
     {
-        // Make API request
-        const tickets = await requestOrThrow("/api/tickets/", {method: "GET"});
+        const {data: tickets, headers} = await requestWithHeadersOrThrow(current.next_url, {method: "GET"});
+
+        // A new search started while this page was loading
+        if (view !== current) return;
+
+        const cursor = headers.get("X-Next-Cursor");
+        current.next_url = current.paged && cursor ? next_page_url(current.url, cursor) : null;
+        current.count += tickets.length;
         statusEl.textContent = "";
-        render_tickets(tickets);
+
+        if (tickets.length > 0)
+            append_batch(tickets);
+        else if (current.count === 0)
+            append_message("No tickets found");
+
+        end.textContent = current.next_url ? "Loading more tickets..." : "";
     }
     // Print the error if the request failed
     catch (err)
     {
+        if (view !== current) return;
+        current.next_url = null;
         statusEl.textContent = err?.message || "Failed to load tickets";
     }
+    finally
+    {
+        current.loading = false;
+    }
+
+    // Observing again reports straight away if the end is still in view,
+    // which happens when the pages are shorter than the screen
+    end_observer.unobserve(end);
+    if (current.next_url)
+        end_observer.observe(end);
+}
+
+
+// Show a message in place of the tickets
+function append_message(message)
+{
+    const li = document.createElement("li");
+    li.textContent = message;
+    document.getElementById("tickets").appendChild(li);
+}
+
+
+// Show all the user's tickets, a page at a time
+function load_all_tickets()
+{
+    show_tickets(`/api/tickets/?limit=${PAGE_SIZE}`);
 }
 
 
@@ -116,27 +262,24 @@ function build_search_url()
 }
 
 
-// Search for the ticket(s) using the form data as query parameters
-async function search_tickets()
+// Search for the ticket(s) using the form data as query parameters.
+// Without a limit, the results keep loading as the user scrolls.
+function search_tickets()
 {
-    const statusEl = document.getElementById("status");
+    const url = build_search_url();
+    if (!url) return;
 
-    try
-    {
-        const url = build_search_url();
-        if (!url) return;
-        // Make API request
-        const tickets = await requestOrThrow(url, {method: "GET"});
+    const paged = !document.getElementById("q-limit").value.trim();
+    show_tickets(paged ? with_page_size(url) : url, paged);
+}
 
-        // Success
-        statusEl.textContent = "";
-        render_tickets(tickets);
-    }
-    // Print the error if the request failed
-    catch (err)
-    {
-        statusEl.textContent = err?.message || "Search failed"
-    }
+
+// Ask for full pages when the user didn't choose a limit
+function with_page_size(url)
+{
+    const sized = new URL(url, window.location.origin);
+    sized.searchParams.set("limit", PAGE_SIZE);
+    return sized.pathname + sized.search;
 }
 
 
@@ -144,20 +287,27 @@ async function search_tickets()
 async function search_by_id(ticket_id)
 {
     const statusEl = document.getElementById("status");
-    const list = document.getElementById("tickets");
-    list.textContent = "";
+
+    // Stop any list that is still loading pages
+    show_tickets(null, false);
+    const current = view;
 
     try
     {
         // Make the API request
         const ticket = await requestOrThrow(`/api/tickets/${ticket_id}`, {method: "GET"});
+        if (view !== current) return;
+
         // Success
         statusEl.textContent = "";
-        render_tickets([ticket]);
+        append_batch([ticket]);
     }
     // Print the error if the request failed
     catch (err)
     {
+        // A newer search or list owns the status line now
+        if (view !== current) return;
+
         statusEl.textContent = err?.message || "Search failed";
     }
 }
@@ -2,7 +2,8 @@ import pytest
 from fastapi.testclient import TestClient
 from sqlmodel import SQLModel, Session, create_engine
 from app.main import app
-from app.db import get_session
+from app.db import get_read_session, get_session, read_only_url
+from app.cache import read_cache
 from starlette import status
 
 def register(client, username: str | None = None, password: str | None = None):
@@ -15,20 +16,42 @@ def login_token(client, username: str, password: str):
 TEST_DB_URL = "sqlite:///test_database.db"
 
 @pytest.fixture
-def client():
+def engine():
     engine = create_engine(TEST_DB_URL, connect_args={"check_same_thread": False})
 
     # Delete all tables and create them all again for a fresh database
     SQLModel.metadata.drop_all(engine)
     SQLModel.metadata.create_all(engine)
+    # User ids start again at 1, so pages cached by another test must go too
+    read_cache.clear()
 
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def read_engine(engine):
+    # Read-only connections to the same file, like the app's read engine,
+    # so a GET route that tries to write fails in the tests too
+    read_engine = create_engine(read_only_url(TEST_DB_URL), connect_args={"check_same_thread": False})
+    yield read_engine
+    read_engine.dispose()
+
+
+@pytest.fixture
+def client(engine, read_engine):
     # Create a session with the new database
     def override_get_session():
         with Session(engine) as session:
             yield session
+
+    def override_get_read_session():
+        with Session(read_engine) as session:
+            yield session
     
     # Use "override_get_session" instead of "get_session"
     app.dependency_overrides[get_session] = override_get_session
+    app.dependency_overrides[get_read_session] = override_get_read_session
 
     # Pass the test client to the test
     with TestClient(app) as c:
@@ -0,0 +1,146 @@
+import warnings
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette import status
+from app.db import get_async_read_session, get_async_session, get_read_session, get_session, read_only_url
+from app.main import hide_shadowed_routes
+from app.routes import async_auth, async_tickets, auth, tickets
+from conftest import TEST_DB_URL, register, login_token
+
+"""
+The async handlers (DB_ASYNC=1) must behave exactly like the sync ones.
+
+async_client builds an app the way app/main.py does in async mode: the async
+routers first, then the sync routers for anything they don't handle.
+"""
+
+
+@pytest.fixture
+def async_client(engine):
+    async_engine = create_async_engine(TEST_DB_URL.replace("sqlite://", "sqlite+aiosqlite://"))
+    async_read_engine = create_async_engine(read_only_url(TEST_DB_URL).replace("sqlite://", "sqlite+aiosqlite://"))
+
+    async def override_get_async_session():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+
+    async def override_get_async_read_session():
+        async with AsyncSession(async_read_engine, expire_on_commit=False) as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(async_auth.router)
+    app.include_router(async_tickets.tickets_router)
+    app.include_router(auth.router)
+    app.include_router(tickets.tickets_router)
+    hide_shadowed_routes(app)
+    app.dependency_overrides[get_async_session] = override_get_async_session
+    app.dependency_overrides[get_async_read_session] = override_get_async_read_session
+    app.dependency_overrides[get_session] = lambda: Session(engine)
+    app.dependency_overrides[get_read_session] = lambda: Session(engine)
+
+    with TestClient(app) as c:
+        assert register(c, "bob", "abc123").status_code == status.HTTP_201_CREATED
+        r = login_token(c, "bob", "abc123")
+        assert r.status_code == status.HTTP_200_OK
+        c.headers.update({"Authorization": f"Bearer {r.json()['access_token']}"})
+        yield c
+
+    async_engine.sync_engine.dispose()
+    async_read_engine.sync_engine.dispose()
+
+
+def test_async_ticket_crud(async_client):
+    # Act - create, read, search, update and delete through the async handlers
+    created = async_client.post(
+        "/api/tickets/",
+        json={"title": "Computer problems", "description": "Turns off", "priority": 4}
+    )
+    ticket_id = created.json()["id"]
+    listed = async_client.get("/api/tickets/")
+    found = async_client.get("/api/tickets/search?q=comp")
+    fetched = async_client.get(f"/api/tickets/{ticket_id}")
+    updated = async_client.patch(f"/api/tickets/{ticket_id}", json={"status": "closed"})
+    deleted = async_client.delete(f"/api/tickets/{ticket_id}")
+    missing = async_client.get(f"/api/tickets/{ticket_id}")
+
+    # Assert
+    assert created.status_code == status.HTTP_201_CREATED
+    assert listed.json() == [created.json()]
+    assert found.json() == [created.json()]
+    assert fetched.json() == created.json()
+    assert updated.json()["status"] == "closed"
+    assert deleted.json()["id"] == ticket_id
+    assert missing.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_async_cursor_pagination(async_client):
+    # Arrange
+    for i in range(3):
+        async_client.post("/api/tickets/", json={"title": f"T{i}", "description": "D", "priority": 1})
+
+    # Act
+    r1 = async_client.get("/api/tickets/?limit=2")
+    r2 = async_client.get(f"/api/tickets/?limit=2&after={r1.headers['X-Next-Cursor']}")
+
+    # Assert
+    assert [t["id"] for t in r1.json()] == [1, 2]
+    assert [t["id"] for t in r2.json()] == [3]
+
+
+def test_async_errors_match_sync(async_client):
+    # Act
+    bad_login = login_token(async_client, "bob", "wrong")
+    duplicate = register(async_client, "bob", "abc123")
+    # Not an int, so it falls through to the sync route and its validation error
+    not_an_id = async_client.get("/api/tickets/abc")
+
+    # Assert
+    assert bad_login.status_code == status.HTTP_401_UNAUTHORIZED
+    assert duplicate.status_code == status.HTTP_409_CONFLICT
+    assert not_an_id.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+
+def test_async_conditional_requests(async_client):
+    # Arrange
+    created = async_client.post(
+        "/api/tickets/",
+        json={"title": "Computer problems", "description": "Turns off", "priority": 4}
+    )
+    ticket_id = created.json()["id"]
+    list_etag = async_client.get("/api/tickets/").headers["ETag"]
+
+    # Act
+    same_ticket = async_client.get(
+        f"/api/tickets/{ticket_id}", headers={"If-None-Match": created.headers["ETag"]}
+    )
+    same_list = async_client.get("/api/tickets/", headers={"If-None-Match": list_etag})
+    async_client.patch(f"/api/tickets/{ticket_id}", json={"priority": 1})
+    stale = async_client.delete(f"/api/tickets/{ticket_id}", headers={"If-Match": created.headers["ETag"]})
+    changed_list = async_client.get("/api/tickets/", headers={"If-None-Match": list_etag})
+
+    # Assert
+    assert same_ticket.status_code == status.HTTP_304_NOT_MODIFIED
+    assert same_list.status_code == status.HTTP_304_NOT_MODIFIED
+    assert stale.status_code == status.HTTP_412_PRECONDITION_FAILED
+    assert changed_list.status_code == status.HTTP_200_OK
+
+
+def test_async_schema_has_one_operation_per_route(async_client):
+    # Act
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        schema = async_client.get("/openapi.json").json()
+
+    # Assert - no "Duplicate Operation ID" warning, and the routes without an
+    # async version are still documented
+    operation_ids = [
+        operation["operationId"] for path in schema["paths"].values() for operation in path.values()
+    ]
+    assert len(operation_ids) == len(set(operation_ids))
+    assert "/api/tickets/{ticket_id}" in schema["paths"]
+    assert {"/auth/refresh", "/api/tickets/bulk", "/api/tickets/export"} <= set(schema["paths"])
@@ -0,0 +1,54 @@
+import json
+import pytest
+from benchmarks import run
+from benchmarks.compare import compare
+
+
+def result(p95_ms: float, rps: float) -> dict:
+    return {"p95_ms": p95_ms, "rps": rps}
+
+
+def test_compare_flags_regressions():
+    # Arrange
+    baseline = {"routes": {
+        "GET /api/tickets/": result(10.0, 500.0),
+        "GET /api/tickets/search q": result(20.0, 200.0),
+        "POST /auth/token": result(300.0, 3.0),
+        "GET /api/tickets/export": result(40.0, 100.0),
+    }}
+    current = {"routes": {
+        "GET /api/tickets/": result(11.0, 480.0),            # within 20%
+        "GET /api/tickets/search q": result(30.0, 190.0),    # p95 up 50%
+        "POST /auth/token": result(300.0, 2.0),              # throughput down 33%
+        "GET /api/tickets/new": result(5.0, 900.0),          # not in the baseline
+    }}
+
+    # Act
+    rows = {row["route"]: row for row in compare(baseline, current, threshold=0.2)}
+
+    # Assert
+    assert set(rows) == {"GET /api/tickets/", "GET /api/tickets/search q", "POST /auth/token"}
+    assert not rows["GET /api/tickets/"]["regressed"]
+    assert rows["GET /api/tickets/search q"]["regressed"]
+    assert rows["POST /auth/token"]["regressed"]
+    assert rows["GET /api/tickets/search q"]["p95_change"] == pytest.approx(0.5)
+
+
+def test_benchmark_runs_every_route(tmp_path, capsys):
+    # Arrange
+    output = tmp_path / "results.json"
+
+    # Act - a tiny in-process run
+    run.main([
+        "--users", "2", "--tickets-per-user", "20", "--requests", "10",
+        "--concurrency", "2", "--warmup", "1", "--output", str(output),
+    ])
+
+    # Assert
+    results = json.loads(output.read_text())
+    assert results["meta"]["target"] == "inprocess"
+    assert set(results["routes"]) == {route.name for route in run.ROUTES}
+    for name, route in results["routes"].items():
+        assert route["errors"] == 0, name
+        assert route["count"] > 0, name
+        assert route["p50_ms"] <= route["p95_ms"] <= route["p99_ms"] <= route["max_ms"]
@@ -0,0 +1,67 @@
+import pytest
+from app.cache import LocalBackend, LocalSharedClient, ReadCache, SharedBackend, build_read_cache
+
+
+@pytest.fixture(params=["local", "shared"])
+def cache(request):
+    if request.param == "local":
+        return ReadCache(LocalBackend(maxsize=100, ttl=60), ttl=60)
+    return ReadCache(SharedBackend(LocalSharedClient()), ttl=60)
+
+
+def test_read_cache_normalizes_queries(cache):
+    # Act - same search, written differently
+    cache.set(cache.key(1, "search", q="Printer  JAM", title=None, limit=100), {"body": []})
+
+    # Assert
+    assert cache.get(cache.key(1, "search", limit=100, q="printer jam")) == {"body": []}
+    assert cache.get(cache.key(1, "search", q="printer", limit=100)) is None
+
+
+def test_read_cache_invalidates_one_user(cache):
+    # Arrange
+    cache.set(cache.key(1, "list", limit=10), ["bob's page"])
+    cache.set(cache.key(2, "list", limit=10), ["sam's page"])
+
+    # Act - user 1 writes
+    cache.invalidate(1)
+
+    # Assert - only user 1's pages are gone
+    assert cache.get(cache.key(1, "list", limit=10)) is None
+    assert cache.get(cache.key(2, "list", limit=10)) == ["sam's page"]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (1, 1, 1)
+
+
+def test_read_cache_stale_key_is_never_served(cache):
+    # Arrange - a read takes its key, then a write lands before it stores its page
+    key = cache.key(1, "list")
+    cache.invalidate(1)
+
+    # Act
+    cache.set(key, ["old page"])
+
+    # Assert
+    assert cache.get(cache.key(1, "list")) is None
+
+
+def test_build_read_cache():
+    # Act / Assert
+    assert not build_read_cache({"READ_CACHE": "off"}).enabled
+    assert isinstance(build_read_cache({}).backend, LocalBackend)
+    assert isinstance(build_read_cache({"READ_CACHE": "shared"}).backend.client, LocalSharedClient)
+    with pytest.raises(RuntimeError):
+        build_read_cache({"READ_CACHE": "memcached"})
+
+
+def test_build_read_cache_with_several_workers(caplog):
+    # Act
+    local = build_read_cache({"WEB_CONCURRENCY": "4"})
+
+    # Assert
+    assert isinstance(local.backend, LocalBackend)
+    assert local.ttl == 1.0
+    assert "WEB_CONCURRENCY=4" in caplog.text
+    assert build_read_cache({"WEB_CONCURRENCY": "1"}).ttl == 30
+    with pytest.raises(RuntimeError, match="redis"):
+        build_read_cache({"WEB_CONCURRENCY": "4", "READ_CACHE_URL": "redis://localhost"})
@@ -0,0 +1,104 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app.db import DB_PROFILES, build_engine, build_read_engine, load_settings, read_only_url
+
+"""
+Engine configuration: profiles, environment overrides and per-connection PRAGMAs.
+"""
+
+
+def test_load_settings_default():
+    # Act
+    settings = load_settings({})
+    # Assert - with no environment, SQLite's own defaults are kept
+    assert settings == DB_PROFILES["default"]
+    assert settings.journal_mode is None
+
+
+def test_load_settings_profile_with_overrides():
+    # Act
+    settings = load_settings({
+        "DB_PROFILE": "production",
+        "SQLITE_BUSY_TIMEOUT": "250",
+        "SQLITE_SYNCHRONOUS": "FULL",
+        "DB_POOL_SIZE": "3",
+    })
+    # Assert - profile values are kept unless a variable overrides them
+    assert settings.journal_mode == "wal"
+    assert settings.busy_timeout == 250
+    assert settings.synchronous == "full"
+    assert settings.pool_size == 3
+
+
+@pytest.mark.parametrize(
+    "environ",
+    [
+        {"DB_PROFILE": "fastest"},
+        {"SQLITE_JOURNAL_MODE": "wal; DROP TABLE ticket"},
+        {"SQLITE_CACHE_SIZE": "lots"},
+    ]
+)
+def test_load_settings_invalid(environ):
+    # Act / Assert - bad configuration fails at startup, not on first request
+    with pytest.raises(RuntimeError):
+        load_settings(environ)
+
+
+def test_pragmas_applied_to_every_connection(tmp_path):
+    # Arrange
+    settings = load_settings({
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'pragmas.db'}",
+        "DB_PROFILE": "production",
+    })
+    engine = build_engine(settings)
+
+    # Act - open two connections at once so both come from the connect event
+    with engine.connect() as c1, engine.connect() as c2:
+        results = [
+            (
+                c.execute(text("PRAGMA journal_mode")).scalar(),
+                c.execute(text("PRAGMA synchronous")).scalar(),
+                c.execute(text("PRAGMA busy_timeout")).scalar(),
+                c.execute(text("PRAGMA temp_store")).scalar(),
+            )
+            for c in (c1, c2)
+        ]
+    engine.dispose()
+
+    # Assert - synchronous=normal is 1 and temp_store=memory is 2
+    assert results == [("wal", 1, 5000, 2)] * 2
+
+
+def test_read_engine_is_read_only(tmp_path):
+    # Arrange - a WAL database written through the write engine
+    settings = load_settings({
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'split.db'}",
+        "DB_PROFILE": "production",
+        "DB_READ_POOL_SIZE": "7",
+    })
+    engine = build_engine(settings)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE note (body TEXT)"))
+        conn.execute(text("INSERT INTO note VALUES ('hello')"))
+    read_engine = build_read_engine(settings)
+
+    # Act / Assert - reads work, writes are refused by SQLite itself
+    with read_engine.connect() as conn:
+        assert conn.execute(text("SELECT body FROM note")).scalar() == "hello"
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        with pytest.raises(OperationalError, match="readonly"):
+            conn.execute(text("INSERT INTO note VALUES ('nope')"))
+    assert read_engine.pool.size() == 7
+
+    read_engine.dispose()
+    engine.dispose()
+
+
+def test_read_only_url():
+    # Act / Assert
+    assert read_only_url("sqlite:///database.db") == "sqlite:///file:database.db?mode=ro&uri=true"
+    assert read_only_url("sqlite:////srv/replica.db") == "sqlite:///file:/srv/replica.db?mode=ro&uri=true"
+    # An in-memory database only exists in its own connection, so it has no reader
+    assert read_only_url("sqlite://") is None
+    assert build_read_engine(load_settings({"DATABASE_URL": "sqlite:///:memory:"})) is None
@@ -0,0 +1,110 @@
+import threading
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlmodel import Session, select
+from starlette import status
+from app.group_commit import GroupCommitWriter
+from app.models import Ticket, TicketCreate
+
+"""
+Group commit: concurrent ticket writes share one transaction, each with its own result.
+"""
+
+
+@pytest.fixture
+def writer(engine):
+    writer = GroupCommitWriter(engine, window=0.05, max_batch=256)
+    yield writer
+    writer.shutdown()
+
+
+@pytest.fixture
+def batched_client(auth_client, writer, monkeypatch):
+    monkeypatch.setattr("app.group_commit.group_commit", writer)
+    return auth_client
+
+
+def count_commits(engine) -> list:
+    commits = []
+    event.listen(engine, "commit", lambda connection: commits.append(1))
+    return commits
+
+
+def add(title: str, user_id: int = 1):
+    def write(session):
+        ticket = Ticket(**TicketCreate(title=title, description="D", priority=1).model_dump(), user_id=user_id)
+        session.add(ticket)
+        session.flush()
+        return ticket
+
+    return write
+
+
+def test_concurrent_writes_share_one_commit(engine, writer):
+    # Arrange
+    commits = count_commits(engine)
+
+    # Act - submitted together, so they land in the same batch
+    futures = [writer.submit(add(f"Ticket {i}")) for i in range(20)]
+    tickets = [future.result(timeout=5) for future in futures]
+
+    # Assert - every caller got its own ticket, with its id, from one commit
+    assert len(commits) == 1
+    assert sorted(ticket.id for ticket in tickets) == list(range(1, 21))
+    assert [ticket.title for ticket in tickets] == [f"Ticket {i}" for i in range(20)]
+    with Session(engine) as session:
+        assert len(session.exec(select(Ticket)).all()) == 20
+
+
+def test_failed_write_only_fails_its_own_request(engine, writer):
+    # Arrange
+    def missing(session):
+        session.add(Ticket(**TicketCreate(title="Half done", description="D", priority=1).model_dump(), user_id=1))
+        session.flush()
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+
+    # Act
+    futures = [writer.submit(add("First")), writer.submit(missing), writer.submit(add("Last"))]
+
+    # Assert - the failed write's savepoint was rolled back, the others committed
+    assert futures[0].result(timeout=5).title == "First"
+    with pytest.raises(HTTPException):
+        futures[1].result(timeout=5)
+    assert futures[2].result(timeout=5).title == "Last"
+    with Session(engine) as session:
+        assert session.exec(select(Ticket.title).order_by(Ticket.id)).all() == ["First", "Last"]
+
+
+def test_routes_write_through_the_writer(batched_client, engine):
+    # Arrange
+    commits = count_commits(engine)
+    responses = []
+
+    def create(i: int):
+        responses.append(batched_client.post("/api/tickets/", json={"title": f"T{i}", "description": "D", "priority": 2}))
+
+    # Act - concurrent requests, as the writer sees them in production
+    threads = [threading.Thread(target=create, args=(i,)) for i in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    created = responses[0].json()
+    updated = batched_client.patch(f"/api/tickets/{created['id']}", json={"status": "closed"})
+    stale = batched_client.patch(
+        f"/api/tickets/{created['id']}", json={"priority": 5}, headers={"If-Match": responses[0].headers["ETag"]}
+    )
+    missing = batched_client.patch("/api/tickets/999", json={"status": "closed"})
+
+    # Assert
+    assert [r.status_code for r in responses] == [status.HTTP_201_CREATED] * 10
+    assert len({r.json()["id"] for r in responses}) == 10
+    assert len(commits) < 10
+    assert updated.status_code == status.HTTP_200_OK
+    assert updated.json()["status"] == "closed"
+    assert updated.headers["ETag"] != responses[0].headers["ETag"]
+    assert stale.status_code == status.HTTP_412_PRECONDITION_FAILED
+    assert missing.status_code == status.HTTP_404_NOT_FOUND
+    assert len(batched_client.get("/api/tickets/").json()) == 10
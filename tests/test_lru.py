@@ -0,0 +1,47 @@
+import time
+from app.lru import TTLCache
+
+
+def test_lru_evicts_least_recently_used():
+    # Arrange
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    # Act - using "a" makes "b" the least recently used entry
+    cache.get("a")
+    cache.set("c", 3)
+
+    # Assert
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_entries_expire():
+    # Arrange - the per-entry ttl is shorter than the cache default
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1, ttl=0.05)
+
+    # Act
+    time.sleep(0.1)
+
+    # Assert
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["expirations"] == 1
+    assert stats["hits"] == 0
+    assert stats["misses"] == 1
+
+
+def test_lru_disabled_when_size_is_zero():
+    # Arrange
+    cache = TTLCache(maxsize=0, ttl=60)
+
+    # Act
+    cache.set("a", 1)
+
+    # Assert
+    assert cache.get("a") is None
+    assert len(cache) == 0
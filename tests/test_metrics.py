@@ -0,0 +1,114 @@
+import threading
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlmodel import text
+from starlette import status
+from app.db import build_engine, load_settings
+from app.metrics import POOL_CHECKOUT, QUERY_DURATION, REGISTRY, Counter, Histogram, render
+from conftest import register, login_token
+
+
+def sample(body: str, line_start: str) -> float:
+    """Returns the value of the first series starting with line_start."""
+
+    for line in body.splitlines():
+        if line.startswith(line_start):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{line_start} not found")
+
+
+def test_counter_sums_every_thread():
+    # Arrange
+    counter = Counter("test_threads_total", "Test counter.", ("kind",))
+    REGISTRY.remove(counter)
+
+    def work():
+        for _ in range(1000):
+            counter.inc("a")
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+
+    # Act
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Assert
+    assert counter.totals() == {("a",): 4000}
+
+
+def test_histogram_samples_are_cumulative():
+    # Arrange
+    histogram = Histogram("test_seconds", "Test histogram.", ("op",), buckets=(0.1, 1.0))
+    REGISTRY.remove(histogram)
+
+    # Act
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, 'say "hi"')
+
+    # Assert - 0.1 falls in the le="0.1" bucket, the label value is escaped
+    assert list(histogram.samples()) == [
+        ("_bucket", (("op", 'say "hi"'), ("le", "0.1")), 2),
+        ("_bucket", (("op", 'say "hi"'), ("le", "1")), 3),
+        ("_bucket", (("op", 'say "hi"'), ("le", "+Inf")), 4),
+        ("_sum", (("op", 'say "hi"'),), 3.65),
+        ("_count", (("op", 'say "hi"'),), 4),
+    ]
+
+
+def test_metrics_endpoint(client):
+    # Arrange
+    register(client, "metricsuser", "password123")
+    token = login_token(client, "metricsuser", "password123").json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    series = 'helpdesk_http_requests_total{method="GET",route="/api/tickets/{ticket_id}",status="404"}'
+    before = sample(render() + f"{series} 0\n", series)
+
+    # Act
+    client.get("/api/tickets/12345", headers=headers)
+    client.get("/api/tickets/67890", headers=headers)
+    response = client.get("/metrics")
+
+    # Assert - the two requests share one series, labelled with the route template
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert sample(body, series) == before + 2
+    assert "# TYPE helpdesk_http_request_duration_seconds histogram" in body
+    assert sample(body, "helpdesk_http_requests_in_flight") == 1  # the scrape itself
+    assert sample(body, 'helpdesk_password_hash_duration_seconds_count{operation="hash"}') >= 1
+    assert sample(body, 'helpdesk_password_hash_duration_seconds_count{operation="verify"}') >= 1
+
+
+def test_engine_records_queries_and_checkouts(tmp_path):
+    # Arrange
+    engine = build_engine(load_settings({"DATABASE_URL": f"sqlite:///{tmp_path / 'metrics.db'}"}))
+    queries_before = QUERY_DURATION.totals().get(("select",), [0])
+    checkouts_before = sum(POOL_CHECKOUT.totals().get((), [0])[:-1])
+
+    # Act
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        connection.execute(text("SELECT 2"))
+
+    # Assert
+    queries_after = QUERY_DURATION.totals()[("select",)]
+    assert sum(queries_after[:-1]) - sum(queries_before[:-1]) == 2
+    assert sum(POOL_CHECKOUT.totals()[()][:-1]) == checkouts_before + 1
+    engine.dispose()
+
+
+def test_failed_query_leaves_no_start_time(tmp_path):
+    # Arrange
+    engine = build_engine(load_settings({"DATABASE_URL": f"sqlite:///{tmp_path / 'metrics.db'}"}))
+
+    # Act
+    with engine.connect() as connection:
+        with pytest.raises(OperationalError):
+            connection.execute(text("SELECT * FROM missing_table"))
+        connection.execute(text("SELECT 1"))
+
+        # Assert - the failed statement's start time was dropped
+        assert connection.info["query_started"] == []
+    engine.dispose()
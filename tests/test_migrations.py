@@ -0,0 +1,143 @@
+import pytest
+from sqlalchemy import text
+from app import migrations
+from app.db import build_engine, load_settings
+from app.migrations import LATEST_VERSION, MIGRATIONS, Migration, check_schema, current_version, migrate
+
+"""
+Schema migrations: new databases, databases from before versions were
+recorded, and the startup check.
+"""
+
+
+@pytest.fixture
+def make_engine(tmp_path):
+    engines = []
+
+    def make(name: str):
+        engine = build_engine(load_settings({"DATABASE_URL": f"sqlite:///{tmp_path / name}"}))
+        engines.append(engine)
+        return engine
+
+    yield make
+    for engine in engines:
+        engine.dispose()
+
+
+def schema(engine) -> set[tuple[str, str]]:
+    with engine.connect() as connection:
+        return set(connection.execute(text("SELECT type, name FROM sqlite_master")).all())
+
+
+def version(engine) -> int | None:
+    with engine.connect() as connection:
+        return current_version(connection)
+
+
+def create_old_tables(engine) -> None:
+    # Tables as created before indexes, search and ticket versions existed
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE ticket (id INTEGER PRIMARY KEY, title VARCHAR, description VARCHAR, "
+            "priority INTEGER, status VARCHAR, created DATE, user_id INTEGER)"
+        )
+        connection.exec_driver_sql(
+            'CREATE TABLE "user" (id INTEGER PRIMARY KEY, username VARCHAR, hashed_password VARCHAR)'
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO ticket VALUES (1, 'Printer jam', 'D', 1, 'open', '2024-01-02', 1)"
+        )
+
+
+def test_new_database_gets_latest_schema(make_engine):
+    # Arrange
+    engine = make_engine("new.db")
+
+    # Act
+    applied = migrate(engine)
+
+    # Assert - created in one go, with the triggers from the after_create hooks
+    assert applied == []
+    assert version(engine) == LATEST_VERSION
+    names = {name for _, name in schema(engine)}
+    assert {"ticket_fts", "ticket_fts_insert", "ix_ticket_user_created"} <= names
+    assert "ticket_version_insert" not in names
+    assert migrate(engine) == []
+
+
+def test_migrates_database_from_before_versions(make_engine):
+    # Arrange
+    engine = make_engine("old.db")
+    create_old_tables(engine)
+
+    # Act
+    applied = migrate(engine)
+
+    # Assert - every migration ran, and the result matches a new database
+    assert applied == [migration.name for migration in MIGRATIONS]
+    assert version(engine) == LATEST_VERSION
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT version, modified FROM ticket")).one() == (1, "2024-01-02")
+        assert connection.execute(text("SELECT rowid FROM ticket_fts WHERE ticket_fts MATCH 'printer'")).all() == [(1,)]
+
+    new_engine = make_engine("new.db")
+    migrate(new_engine)
+    assert schema(engine) == schema(new_engine)
+
+
+def test_drops_row_version_triggers(make_engine):
+    # Arrange - a database at version 4 still has the per-row version triggers
+    engine = make_engine("v4.db")
+    migrate(engine)
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TRIGGER ticket_version_insert AFTER INSERT ON ticket BEGIN "
+            'UPDATE "user" SET tickets_version = tickets_version + 1 WHERE id = new.user_id; END'
+        )
+        connection.exec_driver_sql("UPDATE schema_version SET version = 4")
+
+    # Act
+    applied = migrate(engine)
+
+    # Assert
+    assert applied == ["m0005_drop_version_triggers"]
+    assert "ticket_version_insert" not in {name for _, name in schema(engine)}
+
+
+def test_failed_migration_leaves_previous_version(make_engine, monkeypatch):
+    # Arrange
+    engine = make_engine("failing.db")
+    migrate(engine)
+
+    def broken(connection):
+        connection.exec_driver_sql("CREATE TABLE half_done (id INTEGER)")
+        raise ValueError("boom")
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", [*MIGRATIONS, Migration(LATEST_VERSION + 1, "m9999_broken", broken)])
+    monkeypatch.setattr(migrations, "LATEST_VERSION", LATEST_VERSION + 1)
+
+    # Act
+    with pytest.raises(ValueError):
+        migrate(engine)
+
+    # Assert - the DDL was rolled back with the version bump
+    assert version(engine) == LATEST_VERSION
+    assert "half_done" not in {name for _, name in schema(engine)}
+
+
+def test_check_schema(make_engine, monkeypatch):
+    # Arrange
+    engine = make_engine("check.db")
+    create_old_tables(engine)
+
+    # Act / Assert - an outdated schema stops the worker, unless it may migrate
+    with pytest.raises(RuntimeError, match="app.cli migrate"):
+        check_schema(engine, migrate_if_behind=False)
+    check_schema(engine)
+    assert version(engine) == LATEST_VERSION
+    check_schema(engine, migrate_if_behind=False)
+
+    # A database migrated by newer code is never touched
+    monkeypatch.setattr(migrations, "LATEST_VERSION", LATEST_VERSION - 1)
+    with pytest.raises(RuntimeError, match="newer"):
+        check_schema(engine)
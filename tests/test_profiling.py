@@ -0,0 +1,107 @@
+import time
+from collections import Counter
+import pytest
+from starlette import status
+from app.export import iter_ticket_chunks
+from app.group_commit import GroupCommitWriter
+from app.profiling import call_tree, folded_stacks, profile_store
+
+
+@pytest.fixture(autouse=True)
+def empty_profile_store():
+    profile_store.clear()
+    yield
+    profile_store.clear()
+
+
+def test_call_tree_and_folded_stacks():
+    # Arrange - two samples in a query, one in encoding, 2 ms apart
+    stacks = Counter({
+        ("main", "read_tickets", "Session.exec (sqlalchemy/orm/session.py:1)"): 2,
+        ("main", "read_tickets", "encode_json (app/responses.py:1)"): 1,
+    })
+
+    # Act
+    tree = call_tree(stacks, interval_ms=2)
+    folded = folded_stacks({"stacks": stacks})
+
+    # Assert
+    assert tree["ms"] == 6
+    read_tickets = tree["children"][0]["children"][0]
+    assert [(child["name"], child["ms"]) for child in read_tickets["children"]] == [
+        ("Session.exec (sqlalchemy/orm/session.py:1)", 4),
+        ("encode_json (app/responses.py:1)", 2),
+    ]
+    assert "main;read_tickets;encode_json (app/responses.py:1) 1\n" in folded
+
+
+def slow_chunks(chunks):
+    # Sleeps between chunks, so the export takes a while without holding the GIL
+    for chunk in chunks:
+        time.sleep(0.02)
+        yield chunk
+
+
+def test_admin_can_profile_a_request(auth_client, engine, monkeypatch):
+    # Arrange
+    monkeypatch.setattr("app.routes.auth.ADMIN_USERNAMES", {"bob"})
+    monkeypatch.setattr("app.export.EXPORT_CHUNK_SIZE", 50)
+    monkeypatch.setattr(
+        "app.routes.tickets.iter_ticket_chunks",
+        lambda *args, **kwargs: slow_chunks(iter_ticket_chunks(*args, **kwargs))
+    )
+    tickets = [{"title": f"Ticket {i}", "description": "Printer is jammed", "priority": 3} for i in range(300)]
+    auth_client.post("/api/tickets/bulk", json=tickets)
+    # A thread that sits in app code the whole time, like another request would
+    writer = GroupCommitWriter(engine, window=0.05, max_batch=1)
+
+    # Act
+    try:
+        r = auth_client.get("/api/tickets/export?format=csv", headers={"X-Profile": "1"})
+    finally:
+        writer.shutdown()
+    profile_id = r.headers["X-Profile-Id"]
+    listed = auth_client.get("/admin/profiles").json()
+    profile = auth_client.get(f"/admin/profiles/{profile_id}").json()
+    download = auth_client.get(f"/admin/profiles/{profile_id}/download")
+
+    # Assert - the request itself is unchanged
+    assert r.status_code == status.HTTP_200_OK
+    assert len(r.text.splitlines()) == 301
+    assert [item["id"] for item in listed] == [profile_id]
+    assert profile["route"] == "/api/tickets/export"
+    assert profile["status"] == status.HTTP_200_OK
+    assert profile["samples"] > 0
+    assert profile["interval_ms"] > 0
+    assert set(profile["breakdown_ms"]) == {"auth", "db", "serialization", "other"}
+    assert profile["tree"]["ms"] == pytest.approx(sum(profile["breakdown_ms"].values()), abs=0.01)
+    assert download.status_code == status.HTTP_200_OK
+    assert "attachment" in download.headers["Content-Disposition"]
+    # One "frame;frame;frame count" line per distinct stack
+    lines = download.text.splitlines()
+    assert len(lines) == len({line.rsplit(" ", 1)[0] for line in lines})
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == profile["samples"]
+    # Only the request's own threads were sampled: its export, not the writer
+    assert any("csv_chunks" in line for line in lines)
+    assert not any("group_commit" in line for line in lines)
+
+
+def test_profile_header_ignored_for_non_admins(auth_client):
+    # Act - "bob" is not an admin
+    r = auth_client.get("/api/tickets/", headers={"X-Profile": "1"})
+
+    # Assert
+    assert r.status_code == status.HTTP_200_OK
+    assert "X-Profile-Id" not in r.headers
+    assert profile_store.recent() == []
+
+
+def test_unknown_profile(auth_client, monkeypatch):
+    # Arrange
+    monkeypatch.setattr("app.routes.auth.ADMIN_USERNAMES", {"bob"})
+
+    # Act
+    r = auth_client.get("/admin/profiles/nope")
+
+    # Assert
+    assert r.status_code == status.HTTP_404_NOT_FOUND
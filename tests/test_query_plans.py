@@ -0,0 +1,100 @@
+import re
+import pytest
+from sqlalchemy import event
+from starlette import status
+
+"""
+Every ticket route must reach its rows through an index.
+
+The statements each route sends to SQLite are recorded, then run again under
+EXPLAIN QUERY PLAN. A plan step like "SCAN ticket" means SQLite is walking the
+whole table (every user's tickets), which is what these tests guard against.
+"""
+
+# "SCAN ticket" or "SCAN ticket USING INDEX ..." both walk every row.
+# (\b stops this from matching the full-text table "ticket_fts".)
+FULL_SCAN = re.compile(r"\bSCAN (ticket|user)\b")
+
+
+@pytest.fixture
+def recorded_statements(engine, read_engine):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            statements.append((statement, parameters))
+
+    # GET routes read through the read-only engine
+    for recorded_engine in (engine, read_engine):
+        event.listen(recorded_engine, "before_cursor_execute", record)
+    yield statements
+    for recorded_engine in (engine, read_engine):
+        event.remove(recorded_engine, "before_cursor_execute", record)
+
+
+def query_plan(engine, statement, parameters) -> list[str]:
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return [row[-1] for row in rows]
+
+
+def assert_no_full_scans(engine, statements):
+    assert statements, "no statements were recorded"
+    for statement, parameters in statements:
+        plan = query_plan(engine, statement, parameters)
+        scans = [step for step in plan if FULL_SCAN.search(step)]
+        assert not scans, f"full table scan in:\n{statement}\nplan: {plan}"
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/api/tickets/",
+        "/api/tickets/?sort=created",
+        "/api/tickets/?sort=priority",
+        "/api/tickets/?limit=1",
+        "/api/tickets/search?priority=3",
+        "/api/tickets/search?status=open",
+        "/api/tickets/search?status=open&priority=3",
+        "/api/tickets/search?status=open&sort=priority",
+        "/api/tickets/search?q=computer",
+        "/api/tickets/search?title=comp&status=open&sort=created",
+        "/api/tickets/1",
+    ]
+)
+def test_read_routes_use_indexes(auth_client, ticket, engine, recorded_statements, url):
+    # Arrange
+    auth_client.post("/api/tickets/", json={"title": "Second", "description": "Second", "priority": 3})
+    recorded_statements.clear()
+    separator = "&" if "?" in url else "?"
+
+    # Act - fetch a page, then the page after it so the keyset query is checked too
+    r = auth_client.get(f"{url}{separator}limit=1")
+    cursor = r.headers.get("X-Next-Cursor")
+    if cursor is not None:
+        auth_client.get(f"{url}{separator}limit=1&after={cursor}")
+
+    # Assert
+    assert r.status_code == status.HTTP_200_OK
+    assert_no_full_scans(engine, recorded_statements)
+
+
+def test_write_routes_use_indexes(auth_client, ticket, engine, recorded_statements):
+    # Act
+    r1 = auth_client.patch(f"/api/tickets/{ticket['id']}", json={"status": "closed"})
+    r2 = auth_client.delete(f"/api/tickets/{ticket['id']}")
+
+    # Assert
+    assert r1.status_code == status.HTTP_200_OK
+    assert r2.status_code == status.HTTP_200_OK
+    assert_no_full_scans(engine, recorded_statements)
+
+
+def test_login_uses_indexes(client, engine, recorded_statements):
+    # Act
+    client.post("/auth/", json={"username": "bob", "password": "abc123"})
+    r = client.post("/auth/token", json={"username": "bob", "password": "abc123"})
+
+    # Assert
+    assert r.status_code == status.HTTP_200_OK
+    assert_no_full_scans(engine, recorded_statements)
@@ -0,0 +1,134 @@
+import json
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlmodel import text
+from starlette import status
+from app.db import build_engine, load_settings
+from app.slow_queries import SlowQueryLog, build_slow_query_log, fingerprint, parameter_shape
+
+
+def test_fingerprint_groups_query_shapes():
+    # Act
+    one, _ = fingerprint("SELECT * FROM ticket WHERE id IN (?, ?) AND priority = 3")
+    two, normalized = fingerprint("select *  from ticket\nWHERE id IN (?, ?, ?, ?) AND priority = 5")
+    other, _ = fingerprint("SELECT * FROM ticket WHERE id IN (?) AND status = 'open'")
+
+    # Assert
+    assert one == two
+    assert normalized == "select * from ticket where id in (?...) and priority = ?"
+    assert other != one
+
+
+def test_parameter_shape_hides_values():
+    # Act / Assert
+    assert parameter_shape((1, "secret", None), False) == ["int", "str", "NoneType"]
+    assert parameter_shape({"title": "secret"}, False) == {"title": "str"}
+    assert parameter_shape([(1, "a"), (2, "b")], True) == {"rows": 2, "row": ["int", "str"]}
+
+
+def test_slow_query_log_writes_jsonl_with_plan(tmp_path):
+    # Arrange - a threshold of 0 records every statement
+    path = tmp_path / "slow.jsonl"
+    log = SlowQueryLog(0, path=str(path))
+    engine = build_engine(load_settings({"DATABASE_URL": f"sqlite:///{tmp_path / 'slow.db'}"}))
+    log.instrument(engine)
+
+    # Act
+    with engine.connect() as connection:
+        connection.execute(text("CREATE TABLE item (id INTEGER PRIMARY KEY, name TEXT)"))
+        connection.execute(text("SELECT name FROM item WHERE id = :id"), {"id": 1})
+        connection.execute(text("SELECT name FROM item WHERE id = :id"), {"id": 2})
+    log.close()
+    engine.dispose()
+
+    # Assert - one line per statement, one group per shape
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    selects = [record for record in records if record["sql"].startswith("SELECT name")]
+    assert len(selects) == 2
+    assert selects[0]["parameters"] == ["int"]
+    assert selects[0]["route"] is None
+    assert any("item" in step for step in selects[0]["plan"])
+
+    top = {group["sql"]: group for group in log.top()}
+    assert top["select name from item where id = ?"]["count"] == 2
+
+
+def test_slow_query_log_failed_statement(tmp_path):
+    # Arrange
+    log = SlowQueryLog(0, path=None)
+    engine = build_engine(load_settings({"DATABASE_URL": f"sqlite:///{tmp_path / 'slow.db'}"}))
+    log.instrument(engine)
+
+    # Act
+    with engine.connect() as connection:
+        with pytest.raises(OperationalError):
+            connection.execute(text("SELECT * FROM missing_table"))
+        connection.execute(text("SELECT 1"))
+
+        # Assert - the failed statement's start time was dropped
+        assert connection.info["slow_query_started"] == []
+    engine.dispose()
+
+
+def test_slow_query_log_rotates(tmp_path):
+    # Arrange
+    path = tmp_path / "slow.jsonl"
+    log = SlowQueryLog(0, path=str(path), max_bytes=500, backups=2)
+
+    # Act
+    for i in range(20):
+        log.record(f"SELECT {i} FROM ticket", [], 0.1, None)
+    log.close()
+
+    # Assert - the file never grows far past max_bytes, and old ones are kept
+    assert path.stat().st_size <= 500
+    assert (tmp_path / "slow.jsonl.1").exists()
+    assert (tmp_path / "slow.jsonl.2").exists()
+    assert not (tmp_path / "slow.jsonl.3").exists()
+    # Every statement has the same shape once literals are normalized
+    assert log.top()[0]["count"] == 20
+
+
+def test_build_slow_query_log():
+    # Act / Assert
+    assert build_slow_query_log({}) is None
+    log = build_slow_query_log({"SLOW_QUERY_MS": "50", "SLOW_QUERY_LOG": ""})
+    assert log.threshold == 0.05
+    assert log.path is None
+
+
+def test_admin_slow_queries(auth_client, read_engine, monkeypatch):
+    # Arrange - searches read through the read-only engine
+    log = SlowQueryLog(0)
+    log.instrument(read_engine)
+    monkeypatch.setattr("app.routes.admin.slow_query_log", log)
+    monkeypatch.setattr("app.routes.auth.ADMIN_USERNAMES", {"bob"})
+
+    # Act
+    auth_client.get("/api/tickets/search?priority=3")
+    auth_client.get("/api/tickets/search?priority=4")
+    response = auth_client.get("/admin/slow-queries?sort=count&limit=100")
+
+    # Assert - both searches share a shape, attributed to the search route
+    assert response.status_code == status.HTTP_200_OK
+    body = response.json()
+    assert body["threshold_ms"] == 0
+    searches = [
+        query for query in body["queries"]
+        if "GET /api/tickets/search" in query["routes"] and "from ticket" in query["sql"]
+    ]
+    assert searches
+    assert searches[0]["count"] >= 2
+    assert searches[0]["plan"]
+
+
+def test_admin_slow_queries_off(auth_client, monkeypatch):
+    # Arrange
+    monkeypatch.setattr("app.routes.admin.slow_query_log", None)
+    monkeypatch.setattr("app.routes.auth.ADMIN_USERNAMES", {"bob"})
+
+    # Act
+    response = auth_client.get("/admin/slow-queries")
+
+    # Assert
+    assert response.status_code == status.HTTP_404_NOT_FOUND
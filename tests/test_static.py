@@ -0,0 +1,101 @@
+import re
+from starlette import status
+from app.assets import IMMUTABLE, accepted_encodings, build_assets
+
+"""
+Static assets: fingerprinted names in the pages, precompressed bodies and cache headers.
+"""
+
+
+def asset_url(page: str, original: str) -> str:
+    # The fingerprinted URL a page uses for one of its assets
+    stem, suffix = original.rsplit(".", 1)
+    return re.search(rf'"(/static/{re.escape(stem)}\.[0-9a-f]{{10}}\.{suffix})"', page).group(1)
+
+
+def test_build_assets_rewrites_page_references(tmp_path):
+    # Arrange
+    (tmp_path / "js").mkdir()
+    (tmp_path / "js" / "app.js").write_text("console.log('hi');")
+    (tmp_path / "page.html").write_text(
+        '<script src="/static/js/app.js"></script><script src="js/app.js"></script>'
+        '<a href="/static/other.html">Other</a><a href="/docs">Docs</a>'
+    )
+
+    # Act
+    assets = build_assets(tmp_path)
+
+    # Assert - both the absolute and the relative reference point at the fingerprinted file
+    page = assets["page.html"].body.decode()
+    fingerprinted = asset_url(page, "js/app.js")
+    assert page.count(fingerprinted) == 2
+    assert '"/static/other.html"' in page and '"/docs"' in page
+    assert assets[fingerprinted.removeprefix("/static/")].body == b"console.log('hi');"
+    assert assets[fingerprinted.removeprefix("/static/")].cache_control == IMMUTABLE
+
+
+def test_accepted_encodings():
+    # Act / Assert
+    assert accepted_encodings("gzip, deflate, br;q=0.5") == {"gzip", "deflate", "br"}
+    assert accepted_encodings("gzip;q=0, identity") == {"identity"}
+    assert accepted_encodings("") == set()
+
+
+def test_fingerprinted_asset_is_compressed_and_immutable(client):
+    # Arrange
+    page = client.get("/static/tickets.html").text
+    url = asset_url(page, "js/tickets.js")
+
+    # Act
+    r = client.get(url, headers={"Accept-Encoding": "gzip"})
+    raw = client.get(url, headers={"Accept-Encoding": "identity"})
+
+    # Assert
+    assert r.status_code == status.HTTP_200_OK
+    assert r.headers["Content-Encoding"] == "gzip"
+    assert r.headers["Cache-Control"] == IMMUTABLE
+    assert r.headers["Vary"] == "Accept-Encoding"
+    assert r.headers["Content-Type"].startswith("text/javascript")
+    assert "Content-Encoding" not in raw.headers
+    assert r.content == raw.content
+    assert int(r.headers["Content-Length"]) < len(raw.content)
+
+
+def test_every_page_reference_is_fingerprinted(client):
+    # Act - update_ticket.html uses a relative path to its script
+    page = client.get("/static/update_ticket.html").text
+
+    # Assert
+    references = re.findall(r'(?:src|href)="([^"]+\.(?:js|css))"', page)
+    assert references == [
+        asset_url(page, "css/styles.css"),
+        asset_url(page, "js/api.js"),
+        asset_url(page, "js/patch.js"),
+    ]
+
+
+def test_pages_are_revalidated(client):
+    # Arrange
+    r = client.get("/")
+
+    # Act
+    revalidated = client.get("/", headers={"If-None-Match": r.headers["ETag"]})
+
+    # Assert
+    assert r.status_code == status.HTTP_200_OK
+    assert r.headers["Cache-Control"] == "no-cache"
+    assert revalidated.status_code == status.HTTP_304_NOT_MODIFIED
+    assert revalidated.content == b""
+
+
+def test_original_names_and_missing_files(client):
+    # Act
+    original = client.get("/static/css/styles.css")
+    index = client.get("/static/")
+    missing = client.get("/static/js/nope.js")
+
+    # Assert
+    assert original.status_code == status.HTTP_200_OK
+    assert original.headers["Cache-Control"] == "no-cache"
+    assert index.text == client.get("/").text
+    assert missing.status_code == status.HTTP_404_NOT_FOUND
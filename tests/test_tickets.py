@@ -1,4 +1,12 @@
+import base64
+import csv
+import io
+import json
+from datetime import UTC, date, datetime, timedelta
+from sqlmodel import Session, select
 from starlette import status
+from app.models import RevokedToken, Ticket
+from app.revocation import RevokedTokens
 from conftest import register, login_token
 
 """
@@ -283,6 +291,20 @@ def test_search_for_ticket_no_results(auth_client, ticket):
     assert len(data) == 0
 
 
+def test_search_without_words_matches_nothing(auth_client, ticket):
+    # Act - "!!!" has nothing to search for; it must not widen to every ticket
+    r = auth_client.get("/api/tickets/search?title=!!!")
+    export = auth_client.get("/api/tickets/export?q=***")
+    blank = auth_client.get("/api/tickets/search?title=")
+
+    # Assert
+    assert r.status_code == status.HTTP_200_OK
+    assert r.json() == []
+    assert export.text == ""
+    # A blank value still means "not given"
+    assert [t["id"] for t in blank.json()] == [ticket["id"]]
+
+
 def test_create_ticket_unauthorized(client):
     # Act
     r = client.post(
@@ -467,4 +489,696 @@ def test_delete_ticket_ownership_enforced(client, two_users_headers):
 
     rs = client.get(f"/api/tickets/{sam_ticket['id']}", headers=sam)
     # Owner can still retrieve their own ticket after the other user's delete attempt.
-    assert rs.status_code == status.HTTP_200_OK
\ No newline at end of file
+    assert rs.status_code == status.HTTP_200_OK
+
+def create_tickets(client, count: int, headers: dict | None = None) -> list[dict]:
+    tickets = []
+    for i in range(count):
+        r = client.post(
+            "/api/tickets/",
+            json={"title": f"Ticket {i}", "description": f"Description {i}", "priority": i % 5 + 1},
+            headers=headers
+        )
+        assert r.status_code == status.HTTP_201_CREATED
+        tickets.append(r.json())
+    return tickets
+
+
+def test_cursor_pagination_walks_every_ticket(auth_client):
+    # Arrange
+    created = create_tickets(auth_client, 7)
+
+    # Act - follow the X-Next-Cursor header until there are no more pages
+    seen = []
+    r = auth_client.get("/api/tickets/?limit=3&sort=priority")
+    while True:
+        assert r.status_code == status.HTTP_200_OK
+        seen.extend(r.json())
+        cursor = r.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        r = auth_client.get(f"/api/tickets/?limit=3&sort=priority&after={cursor}")
+
+    # Assert - every ticket is returned exactly once, ordered by (priority, id)
+    assert len(seen) == len(created)
+    assert seen == sorted(created, key=lambda t: (t["priority"], t["id"]))
+
+
+def test_created_cursor_pagination_walks_every_ticket(auth_client, engine):
+    # Arrange - two dates, with several tickets on each, so pages split ties
+    create_tickets(auth_client, 7)
+    yesterday = date.today() - timedelta(days=1)
+    with Session(engine) as session:
+        for ticket in session.exec(select(Ticket).where(Ticket.id.in_([2, 4, 5, 7]))):
+            ticket.created = yesterday
+            session.add(ticket)
+        session.commit()
+
+    # Act - follow the X-Next-Cursor header until there are no more pages
+    seen = []
+    r = auth_client.get("/api/tickets/?limit=2&sort=created")
+    while True:
+        assert r.status_code == status.HTTP_200_OK
+        seen.extend(t["id"] for t in r.json())
+        cursor = r.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        r = auth_client.get(f"/api/tickets/?limit=2&sort=created&after={cursor}")
+
+    # Assert - no ticket is repeated or skipped, ordered by (created, id)
+    assert seen == [2, 4, 5, 7, 1, 3, 6]
+
+
+def test_search_cursor_pagination(auth_client):
+    # Arrange
+    create_tickets(auth_client, 5)
+
+    # Act
+    r1 = auth_client.get("/api/tickets/search?limit=2")
+    r2 = auth_client.get(f"/api/tickets/search?limit=2&after={r1.headers['X-Next-Cursor']}")
+
+    # Assert - the second page starts right after the first one
+    assert [t["id"] for t in r1.json()] == [1, 2]
+    assert [t["id"] for t in r2.json()] == [3, 4]
+
+
+def test_offset_pagination_still_supported(auth_client):
+    # Arrange
+    create_tickets(auth_client, 4)
+
+    # Act
+    r = auth_client.get("/api/tickets/?offset=2&limit=10")
+
+    # Assert - old clients can still skip tickets with offset
+    assert r.status_code == status.HTTP_200_OK
+    assert [t["id"] for t in r.json()] == [3, 4]
+    # This is the last page, so there is no cursor for a next one.
+    assert "X-Next-Cursor" not in r.headers
+
+
+def test_cursor_invalid(auth_client):
+    # Arrange - a cursor made for one sort cannot be used with another
+    create_tickets(auth_client, 2)
+    cursor = auth_client.get("/api/tickets/?limit=1").headers["X-Next-Cursor"]
+
+    # Act
+    r1 = auth_client.get("/api/tickets/?after=not-a-cursor")
+    r2 = auth_client.get(f"/api/tickets/?sort=created&after={cursor}")
+    r3 = auth_client.get(f"/api/tickets/?offset=1&after={cursor}")
+
+    # Assert - 400 means the cursor was rejected
+    assert r1.status_code == status.HTTP_400_BAD_REQUEST
+    assert r2.status_code == status.HTTP_400_BAD_REQUEST
+    assert r3.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_cursor_tampered_key(auth_client):
+    # Arrange - cursors edited by hand, with a sort key of the wrong type
+    create_tickets(auth_client, 2)
+
+    def cursor(*parts) -> str:
+        raw = json.dumps(list(parts)).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    # Act
+    responses = [
+        auth_client.get(f"/api/tickets/?sort=priority&after={cursor('priority', [1, 2], 1)}"),
+        auth_client.get(f"/api/tickets/?sort=priority&after={cursor('priority', True, 1)}"),
+        auth_client.get(f"/api/tickets/?sort=created&after={cursor('created', 20240102, 1)}"),
+        auth_client.get(f"/api/tickets/?sort=created&after={cursor('created', 'yesterday', 1)}"),
+        auth_client.get(f"/api/tickets/search?q=ticket&after={cursor('rank', {'a': 1}, 1)}"),
+        auth_client.get(f"/api/tickets/?after={cursor('id', 1, '1')}"),
+    ]
+
+    # Assert - the same 400 as any other bad cursor, never a 500
+    assert [r.status_code for r in responses] == [status.HTTP_400_BAD_REQUEST] * len(responses)
+    assert {r.json()["detail"] for r in responses} == {"Invalid cursor"}
+
+
+def test_full_text_search_ranked_prefix(auth_client):
+    # Arrange
+    for title, description in [
+        ("Printer jam", "The printer near the computer lab is jammed"),
+        ("Computer problems", "Computer turns off randomly"),
+        ("Email", "Cannot send email"),
+    ]:
+        r = auth_client.post(
+            "/api/tickets/",
+            json={"title": title, "description": description, "priority": 1}
+        )
+        assert r.status_code == status.HTTP_201_CREATED
+
+    # Act - "comp" is a prefix of "computer"
+    r = auth_client.get("/api/tickets/search?q=comp")
+
+    # Assert - both computer tickets match, the one that mentions it most is ranked first
+    assert r.status_code == status.HTTP_200_OK
+    assert [t["title"] for t in r.json()] == ["Computer problems", "Printer jam"]
+
+
+def test_full_text_search_follows_updates_and_deletes(auth_client, ticket):
+    # Act - rename the ticket, then search for the old and new titles
+    r = auth_client.patch(f"/api/tickets/{ticket['id']}", json={"title": "Keyboard broken"})
+    assert r.status_code == status.HTTP_200_OK
+    old = auth_client.get("/api/tickets/search?title=computer")
+    new = auth_client.get("/api/tickets/search?title=keyb")
+
+    # Assert - the index was updated along with the ticket
+    assert old.json() == []
+    assert [t["id"] for t in new.json()] == [ticket["id"]]
+
+    # Act - delete the ticket
+    auth_client.delete(f"/api/tickets/{ticket['id']}")
+    r = auth_client.get("/api/tickets/search?q=keyboard")
+
+    # Assert - deleted tickets are removed from the index
+    assert r.json() == []
+
+
+def test_register_when_hashing_pool_saturated(client, monkeypatch):
+    # Arrange - pretend every worker is busy and the wait queue is full
+    from app.hashing import password_hasher
+    monkeypatch.setattr(password_hasher, "_in_flight", password_hasher.workers + password_hasher.queue_limit)
+
+    # Act
+    r = register(client, "bob", "abc123")
+
+    # Assert - 503 tells the client to back off instead of queuing forever
+    assert r.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert r.headers["Retry-After"] == "1"
+
+
+def test_admin_stats(auth_client, monkeypatch):
+    # Act - "bob" is not an admin yet
+    r1 = auth_client.get("/admin/stats")
+    monkeypatch.setattr("app.routes.auth.ADMIN_USERNAMES", {"bob"})
+    r2 = auth_client.get("/admin/stats")
+
+    # Assert - 403 means the user is logged in but not allowed
+    assert r1.status_code == status.HTTP_403_FORBIDDEN
+    assert r2.status_code == status.HTTP_200_OK
+    hashing = r2.json()["password_hashing"]
+    # The auth_client fixture registered (hash) and logged in (verify) once
+    assert hashing["hash"]["count"] >= 1
+    assert hashing["verify"]["count"] >= 1
+    assert hashing["queue_depth"] == 0
+
+
+def test_refresh_token_flow(client):
+    # Arrange
+    register(client, "bob", "abc123")
+    login = login_token(client, "bob", "abc123").json()
+
+    # Act - exchange the refresh token for new tokens, then reuse the old one
+    r1 = client.post("/auth/refresh", json={"refresh_token": login["refresh_token"]})
+    r2 = client.post("/auth/refresh", json={"refresh_token": login["refresh_token"]})
+
+    # Assert - the new access token works
+    assert r1.status_code == status.HTTP_200_OK
+    refreshed = r1.json()
+    me = client.get("/user", headers={"Authorization": f"Bearer {refreshed['access_token']}"})
+    assert me.json()["username"] == "bob"
+    # Refresh tokens are single use, so replaying the old one is rejected
+    assert r2.status_code == status.HTTP_401_UNAUTHORIZED
+    assert refreshed["refresh_token"] != login["refresh_token"]
+
+
+def test_logout_revokes_refresh_token(client):
+    # Arrange
+    register(client, "bob", "abc123")
+    login = login_token(client, "bob", "abc123").json()
+
+    # Act
+    out = client.post("/auth/logout", json={"refresh_token": login["refresh_token"]})
+    r = client.post("/auth/refresh", json={"refresh_token": login["refresh_token"]})
+
+    # Assert
+    assert out.status_code == status.HTTP_204_NO_CONTENT
+    assert r.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_revoked_tokens_drop_expired_entries(engine):
+    # Arrange - clean up once more than 3 tokens are held in memory
+    tokens = RevokedTokens(compact_at=3)
+    now = datetime.now(UTC).replace(tzinfo=None)
+    expired = now - timedelta(minutes=1)
+    valid = now + timedelta(days=1)
+
+    # Act - long-running refreshes, most of whose tokens have since expired
+    with Session(engine) as session:
+        for i in range(4):
+            tokens.revoke(f"old-{i}", expired, session)
+        tokens.revoke("current", valid, session)
+
+        # Assert - the expired ones left memory and the table; the valid one stays revoked
+        assert session.exec(select(RevokedToken.jti)).all() == ["current"]
+        assert len(tokens._revoked) == 1
+        assert tokens.is_revoked("current", session)
+        assert not tokens.is_revoked("old-0", session)
+
+
+def test_refresh_token_is_not_an_access_token(client):
+    # Arrange
+    register(client, "bob", "abc123")
+    login = login_token(client, "bob", "abc123").json()
+
+    # Act - use each token where the other one belongs
+    r1 = client.get("/api/tickets/", headers={"Authorization": f"Bearer {login['refresh_token']}"})
+    r2 = client.post("/auth/refresh", json={"refresh_token": login["access_token"]})
+
+    # Assert
+    assert r1.status_code == status.HTTP_401_UNAUTHORIZED
+    assert r2.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_token_cache_hits(auth_client):
+    # Arrange
+    from app.routes.auth import token_cache
+    hits = token_cache.hits
+
+    # Act - the same token is sent twice
+    auth_client.get("/api/tickets/")
+    auth_client.get("/api/tickets/")
+
+    # Assert - at least the second request was answered from the cache
+    assert token_cache.hits >= hits + 1
+
+
+def test_token_cache_respects_token_expiry(client):
+    # Arrange - a token that expires in one second. jose compares "exp"
+    # with the current whole second, so it is accepted for up to 2 seconds.
+    import time
+    from datetime import timedelta
+    from app.routes.auth import create_access_token
+    token = create_access_token("bob", 1, timedelta(seconds=1))
+    headers = {"Authorization": f"Bearer {token}"}
+
+    # Act
+    r1 = client.get("/user", headers=headers)
+    time.sleep(2.1)
+    r2 = client.get("/user", headers=headers)
+
+    # Assert - once the token expires the cached entry is not used either
+    assert r1.status_code == status.HTTP_200_OK
+    assert r2.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_bulk_create_tickets(auth_client):
+    # Arrange
+    payload = [
+        {"title": f"Alert {i}", "description": "Disk almost full", "priority": 3}
+        for i in range(50)
+    ]
+
+    # Act
+    r = auth_client.post("/api/tickets/bulk", json=payload)
+
+    # Assert - every ticket is created, in the order it was sent
+    assert r.status_code == status.HTTP_201_CREATED
+    created = r.json()
+    assert [t["title"] for t in created] == [t["title"] for t in payload]
+    assert all(t["status"] == "open" for t in created)
+    # The created tickets are stored (and indexed for search)
+    assert len(auth_client.get("/api/tickets/").json()) == 50
+    assert len(auth_client.get("/api/tickets/search?q=disk").json()) == 50
+
+
+def test_bulk_create_all_or_nothing(auth_client):
+    # Arrange - the second ticket is invalid
+    payload = [
+        {"title": "Good", "description": "Good", "priority": 1},
+        {"title": "Bad", "description": "Bad", "priority": 9},
+    ]
+
+    # Act
+    r = auth_client.post("/api/tickets/bulk", json=payload)
+
+    # Assert - the error points at the invalid ticket and nothing is created
+    assert r.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+    assert r.json()["detail"][0]["loc"] == ["body", 1, "priority"]
+    assert auth_client.get("/api/tickets/").json() == []
+
+
+def test_bulk_create_batch_size_capped(auth_client):
+    # Arrange
+    payload = [{"title": "T", "description": "D", "priority": 1}] * 1001
+
+    # Act
+    r = auth_client.post("/api/tickets/bulk", json=payload)
+
+    # Assert
+    assert r.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+
+def test_bulk_update_by_ids(auth_client):
+    # Arrange
+    created = auth_client.post("/api/tickets/bulk", json=[
+        {"title": f"T{i}", "description": "D", "priority": 1} for i in range(3)
+    ]).json()
+    ids = [created[0]["id"], created[2]["id"]]
+
+    # Act
+    r = auth_client.patch("/api/tickets/bulk", json={
+        "ids": ids,
+        "changes": {"status": "closed"}
+    })
+
+    # Assert
+    assert r.status_code == status.HTTP_200_OK
+    assert r.json() == {"count": 2, "ids": ids}
+    statuses = {t["id"]: t["status"] for t in auth_client.get("/api/tickets/").json()}
+    assert statuses == {ids[0]: "closed", created[1]["id"]: "open", ids[1]: "closed"}
+
+
+def test_bulk_update_by_filter(auth_client):
+    # Arrange
+    auth_client.post("/api/tickets/bulk", json=[
+        {"title": "Printer jam", "description": "Tray 2", "priority": 2},
+        {"title": "Printer toner", "description": "Empty", "priority": 4},
+        {"title": "Laptop", "description": "Broken hinge", "priority": 2},
+    ])
+
+    # Act - close the priority 2 printer tickets
+    r = auth_client.patch("/api/tickets/bulk", json={
+        "q": "printer",
+        "priority": 2,
+        "changes": {"status": "closed"}
+    })
+
+    # Assert
+    assert r.json()["count"] == 1
+    closed = auth_client.get("/api/tickets/search?status=closed").json()
+    assert [t["title"] for t in closed] == ["Printer jam"]
+
+
+def test_bulk_update_requires_selection_and_changes(auth_client, ticket):
+    # Act
+    no_selection = auth_client.patch("/api/tickets/bulk", json={"changes": {"priority": 5}})
+    no_changes = auth_client.patch("/api/tickets/bulk", json={"ids": [ticket["id"]], "changes": {}})
+
+    # Assert - nothing is changed
+    assert no_selection.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+    assert no_changes.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+    assert auth_client.get(f"/api/tickets/{ticket['id']}").json() == ticket
+
+
+def test_bulk_delete_by_filter(auth_client):
+    # Arrange
+    auth_client.post("/api/tickets/bulk", json=[
+        {"title": "Old", "description": "D", "priority": 1},
+        {"title": "Keep", "description": "D", "priority": 3},
+    ])
+    auth_client.patch("/api/tickets/bulk", json={"priority": 1, "changes": {"status": "closed"}})
+
+    # Act
+    r = auth_client.request("DELETE", "/api/tickets/bulk", json={"status": "closed"})
+
+    # Assert
+    assert r.status_code == status.HTTP_200_OK
+    assert r.json()["count"] == 1
+    assert [t["title"] for t in auth_client.get("/api/tickets/").json()] == ["Keep"]
+    # The search index follows the delete
+    assert auth_client.get("/api/tickets/search?q=old").json() == []
+
+
+def test_bulk_filter_without_words_touches_nothing(auth_client):
+    # Arrange
+    auth_client.post("/api/tickets/bulk", json=[
+        {"title": "Printer jam", "description": "D", "priority": 1},
+        {"title": "Laptop", "description": "D", "priority": 2},
+    ])
+    before = auth_client.get("/api/tickets/").json()
+
+    # Act - "***" has no words, so it must not be ignored (and select every open ticket)
+    updated = auth_client.patch(
+        "/api/tickets/bulk", json={"title": "***", "status": "open", "changes": {"status": "closed"}}
+    )
+    deleted = auth_client.request("DELETE", "/api/tickets/bulk", json={"title": "***", "status": "open"})
+
+    # Assert
+    assert updated.json() == {"count": 0, "ids": []}
+    assert deleted.json() == {"count": 0, "ids": []}
+    assert auth_client.get("/api/tickets/").json() == before
+
+
+def test_bulk_ownership_enforced(client, two_users_headers):
+    # Arrange - bob owns a ticket
+    bob = two_users_headers["bob"]
+    sam = two_users_headers["sam"]
+    bob_ticket = client.post(
+        "/api/tickets/",
+        json={"title": "Bob", "description": "D", "priority": 1},
+        headers=bob
+    ).json()
+
+    # Act - sam targets bob's ticket by id and by filter
+    updated = client.patch(
+        "/api/tickets/bulk",
+        json={"ids": [bob_ticket["id"]], "changes": {"status": "closed"}},
+        headers=sam
+    )
+    deleted = client.request("DELETE", "/api/tickets/bulk", json={"priority": 1}, headers=sam)
+
+    # Assert - nothing of bob's is touched
+    assert updated.json() == {"count": 0, "ids": []}
+    assert deleted.json() == {"count": 0, "ids": []}
+    assert client.get(f"/api/tickets/{bob_ticket['id']}", headers=bob).json() == bob_ticket
+
+
+def test_export_ndjson_streams_every_ticket(auth_client, monkeypatch):
+    # Arrange - small chunks, so the export takes several queries
+    monkeypatch.setattr("app.export.EXPORT_CHUNK_SIZE", 7)
+    auth_client.post("/api/tickets/bulk", json=[
+        {"title": f"T{i}", "description": "D", "priority": 1 + i % 5} for i in range(150)
+    ])
+
+    # Act
+    r = auth_client.get("/api/tickets/export")
+
+    # Assert - more than the largest page, in id order
+    assert r.status_code == status.HTTP_200_OK
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    tickets = [json.loads(line) for line in r.text.splitlines()]
+    assert [t["title"] for t in tickets] == [f"T{i}" for i in range(150)]
+    assert tickets[0]["status"] == "open"
+
+
+def test_export_csv_with_filters(auth_client):
+    # Arrange
+    auth_client.post("/api/tickets/bulk", json=[
+        {"title": "Printer jam", "description": "Tray 2", "priority": 2},
+        {"title": "Printer, toner", "description": "Empty", "priority": 4},
+        {"title": "Laptop", "description": "Broken hinge", "priority": 2},
+    ])
+
+    # Act
+    r = auth_client.get("/api/tickets/export?format=csv&q=printer")
+
+    # Assert
+    assert r.status_code == status.HTTP_200_OK
+    assert r.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(r.text)))
+    assert [row["title"] for row in rows] == ["Printer jam", "Printer, toner"]
+    assert rows[0]["priority"] == "2"
+
+
+def test_export_empty(auth_client):
+    # Act
+    ndjson = auth_client.get("/api/tickets/export")
+    csv_r = auth_client.get("/api/tickets/export?format=csv")
+
+    # Assert
+    assert ndjson.text == ""
+    assert csv_r.text.strip() == "id,title,description,priority,status,created,user_id"
+
+
+def test_import_ndjson_reports_bad_rows(auth_client):
+    # Arrange - rows 2 and 4 are invalid, row 3 is blank
+    body = "\n".join([
+        json.dumps({"title": "One", "description": "D", "priority": 1}),
+        json.dumps({"title": "Two", "description": "D", "priority": 9}),
+        "",
+        "{not json",
+        json.dumps({"title": "Three", "description": "D", "priority": 3}),
+    ])
+
+    # Act
+    r = auth_client.post(
+        "/api/tickets/import?chunk_size=1",
+        files={"file": ("tickets.ndjson", body.encode())}
+    )
+
+    # Assert
+    assert r.status_code == status.HTTP_200_OK
+    data = r.json()
+    assert (data["rows"], data["imported"], data["failed"]) == (4, 2, 2)
+    assert [e["row"] for e in data["errors"]] == [2, 4]
+    assert "priority" in data["errors"][0]["message"]
+    titles = [t["title"] for t in auth_client.get("/api/tickets/").json()]
+    assert titles == ["One", "Three"]
+
+
+def test_import_csv_round_trips_export(auth_client):
+    # Arrange - export two tickets as CSV
+    auth_client.post("/api/tickets/bulk", json=[
+        {"title": "Printer, jammed", "description": "Tray 2", "priority": 2},
+        {"title": "Laptop", "description": "Broken hinge", "priority": 4},
+    ])
+    exported = auth_client.get("/api/tickets/export?format=csv").content
+
+    # Act - import the export again
+    r = auth_client.post("/api/tickets/import", files={"file": ("tickets.csv", exported)})
+
+    # Assert - each ticket now exists twice
+    assert r.json()["imported"] == 2
+    titles = sorted(t["title"] for t in auth_client.get("/api/tickets/").json())
+    assert titles == ["Laptop", "Laptop", "Printer, jammed", "Printer, jammed"]
+
+
+def test_import_rejects_unreadable_file(auth_client):
+    # Act
+    r = auth_client.post(
+        "/api/tickets/import?format=ndjson",
+        files={"file": ("tickets.txt", b"\xff\xfe\x00bad")}
+    )
+
+    # Assert
+    assert r.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_get_ticket_not_modified(auth_client, ticket):
+    # Arrange
+    r1 = auth_client.get(f"/api/tickets/{ticket['id']}")
+    etag = r1.headers["ETag"]
+
+    # Act
+    r2 = auth_client.get(f"/api/tickets/{ticket['id']}", headers={"If-None-Match": etag})
+    auth_client.patch(f"/api/tickets/{ticket['id']}", json={"priority": 5})
+    r3 = auth_client.get(f"/api/tickets/{ticket['id']}", headers={"If-None-Match": etag})
+
+    # Assert - 304 with no body until the ticket changes
+    assert r2.status_code == status.HTTP_304_NOT_MODIFIED
+    assert r2.content == b""
+    assert r2.headers["ETag"] == etag
+    assert r3.status_code == status.HTTP_200_OK
+    assert r3.json()["priority"] == 5
+    assert r3.headers["ETag"] != etag
+
+
+def test_list_not_modified_until_any_ticket_changes(auth_client, ticket):
+    # Arrange
+    r1 = auth_client.get("/api/tickets/")
+    etag = r1.headers["ETag"]
+    assert "Last-Modified" in r1.headers
+
+    # Act
+    unchanged = auth_client.get("/api/tickets/", headers={"If-None-Match": etag})
+    search_unchanged = auth_client.get("/api/tickets/search?q=computer", headers={"If-None-Match": etag})
+    auth_client.post("/api/tickets/bulk", json=[{"title": "New", "description": "D", "priority": 1}])
+    changed = auth_client.get("/api/tickets/", headers={"If-None-Match": etag})
+
+    # Assert
+    assert unchanged.status_code == status.HTTP_304_NOT_MODIFIED
+    assert search_unchanged.status_code == status.HTTP_304_NOT_MODIFIED
+    assert changed.status_code == status.HTTP_200_OK
+    assert len(changed.json()) == 2
+
+
+def test_list_etag_is_per_user(client, two_users_headers):
+    # Arrange
+    bob = two_users_headers["bob"]
+    sam = two_users_headers["sam"]
+    etag = client.get("/api/tickets/", headers=bob).headers["ETag"]
+
+    # Act
+    r = client.get("/api/tickets/", headers={**sam, "If-None-Match": etag})
+
+    # Assert - bob's ETag never validates sam's list
+    assert r.status_code == status.HTTP_200_OK
+
+
+def test_list_etag_changes_once_per_write(auth_client, ticket):
+    # Arrange
+    etags = [auth_client.get("/api/tickets/").headers["ETag"]]
+
+    def write(method: str, url: str, **kwargs):
+        assert auth_client.request(method, url, **kwargs).status_code < 400
+        etags.append(auth_client.get("/api/tickets/").headers["ETag"])
+
+    # Act - single and bulk writes of several tickets at a time
+    write("POST", "/api/tickets/", json={"title": "One", "description": "D", "priority": 1})
+    write("POST", "/api/tickets/bulk", json=[{"title": f"T{i}", "description": "D", "priority": 2} for i in range(5)])
+    write("PATCH", f"/api/tickets/{ticket['id']}", json={"priority": 5})
+    write("PATCH", "/api/tickets/bulk", json={"priority": 2, "changes": {"status": "closed"}})
+    write("DELETE", "/api/tickets/bulk", json={"status": "closed"})
+    write("DELETE", f"/api/tickets/{ticket['id']}")
+    write("POST", "/api/tickets/import?format=ndjson", files={"file": ("t.ndjson", '{"title": "I", "description": "D", "priority": 1}\n')})
+    # Selects nothing, so nothing changes
+    write("DELETE", "/api/tickets/bulk", json={"status": "closed"})
+
+    # Assert - the user's tickets_version went up by one per write, not per ticket
+    versions = [int(etag.strip('"').rsplit(".", 1)[1]) for etag in etags]
+    assert [b - a for a, b in zip(versions, versions[1:])] == [1, 1, 1, 1, 1, 1, 1, 0]
+
+
+def test_update_with_stale_if_match(auth_client, ticket):
+    # Arrange - two editors read the same version
+    etag = auth_client.get(f"/api/tickets/{ticket['id']}").headers["ETag"]
+    first = auth_client.patch(
+        f"/api/tickets/{ticket['id']}",
+        json={"status": "in_progress"},
+        headers={"If-Match": etag}
+    )
+
+    # Act - the second editor still has the old ETag
+    second = auth_client.patch(
+        f"/api/tickets/{ticket['id']}",
+        json={"status": "closed"},
+        headers={"If-Match": etag}
+    )
+    stale_delete = auth_client.delete(f"/api/tickets/{ticket['id']}", headers={"If-Match": etag})
+
+    # Assert
+    assert first.status_code == status.HTTP_200_OK
+    assert second.status_code == status.HTTP_412_PRECONDITION_FAILED
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert stale_delete.status_code == status.HTTP_412_PRECONDITION_FAILED
+    assert auth_client.get(f"/api/tickets/{ticket['id']}").json()["status"] == "in_progress"
+
+
+def test_read_cache_serves_repeat_reads(auth_client, ticket, monkeypatch):
+    # Arrange
+    monkeypatch.setattr("app.routes.auth.ADMIN_USERNAMES", {"bob"})
+    first = auth_client.get("/api/tickets/")
+
+    # Act
+    second = auth_client.get("/api/tickets/")
+    revalidated = auth_client.get("/api/tickets/", headers={"If-None-Match": first.headers["ETag"]})
+    auth_client.patch(f"/api/tickets/{ticket['id']}", json={"priority": 1})
+    after_write = auth_client.get("/api/tickets/")
+
+    # Assert - the cached page is the same page, until a write replaces it
+    assert second.json() == first.json()
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert revalidated.status_code == status.HTTP_304_NOT_MODIFIED
+    assert after_write.json()[0]["priority"] == 1
+    stats = auth_client.get("/admin/stats").json()["read_cache"]
+    assert stats["hits"] >= 2
+    assert stats["invalidations"] >= 1
+
+
+def test_lean_responses_match_ticket_public(auth_client, ticket):
+    # Arrange
+    from app.models import TicketPublic
+    expected = TicketPublic.model_validate(ticket).model_dump(mode="json")
+
+    # Act - the read routes skip response_model validation
+    listed = auth_client.get("/api/tickets/")
+    searched = auth_client.get("/api/tickets/search?q=computer")
+    fetched = auth_client.get(f"/api/tickets/{ticket['id']}")
+
+    # Assert - same fields and values as the validated create response
+    assert listed.headers["content-type"] == "application/json"
+    assert listed.json() == [expected]
+    assert searched.json() == [expected]
+    assert fetched.json() == expected